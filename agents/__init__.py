@@ -1,14 +1,38 @@
-from .competetive_switcher import CompetitiveSwitcherDetector
-from .crmsync import CRMSyncAgent
-from .dark_funnel import DarkFunnelAgent
-from .delivery import DeliveryAgent
-from .enrichment import EnrichmentAgent
-from .feedbackloop import FeedbackLoopAgent
-from .hyperpersonalization import HyperPersonalizationAgent
-from .intent_prediction import IntentPredictionAgent
-from .messaging import MessagingAgent
-from .multithreading import MultiThreadingAgent
-from .scoring import ScoringAgent
-from .signaldetection import SignalDetectionAgent
-from .visualpersonalization import VisualPersonalizationAgent
-from .creative_outreach import CreativeOutreachAgent
\ No newline at end of file
+"""Agent classes, imported lazily on first attribute access.
+
+Keeps `import agents` cheap: CLI paths that never touch media generation don't pay
+for creative_outreach (LLM, D-ID and TTS clients) or any other unused agent.
+"""
+import importlib
+
+_AGENTS = {
+    "CompetitiveSwitcherDetector": ".competetive_switcher",
+    "CRMSyncAgent": ".crmsync",
+    "DarkFunnelAgent": ".dark_funnel",
+    "DeliveryAgent": ".delivery",
+    "EnrichmentAgent": ".enrichment",
+    "FeedbackLoopAgent": ".feedbackloop",
+    "HyperPersonalizationAgent": ".hyperpersonalization",
+    "IntentPredictionAgent": ".intent_prediction",
+    "MessagingAgent": ".messaging",
+    "MultiThreadingAgent": ".multithreading",
+    "ScoringAgent": ".scoring",
+    "SignalDetectionAgent": ".signaldetection",
+    "VisualPersonalizationAgent": ".visualpersonalization",
+    "CreativeOutreachAgent": ".creative_outreach",
+}
+
+__all__ = list(_AGENTS)
+
+
+def __getattr__(name):
+    module = _AGENTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # cache: later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,53 +1,40 @@
 import os
 import json
 import logging
-import re
 import time
-import random
+import uuid
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict
 import subprocess
-import requests
-from torch.serialization import safe_globals
-import numpy as np
-
-from bark import SAMPLE_RATE, generate_audio, preload_models
-from scipy.io.wavfile import write as write_wav
-from config import D_ID_KEY
+from config import D_ID_KEY, TTS_ENABLED, TTS_TIMEOUT
+from llm import CachedLLM
+from metrics import METRICS
+from videojobs import VideoJobScheduler
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class CreativeOutreachAgent:
+    # bump when the prompt text in generate_script / generate_linkedin_email changes
+    SCRIPT_PROMPT_VERSION = "script-v1"
+    COPY_PROMPT_VERSION = "copy-v1"
 
     def __init__(self, storage, db_path: str):
         self.storage = storage
+        self.llm = CachedLLM(storage)
         self.output_dir = Path(os.path.dirname(os.path.abspath(db_path))) / "creative_outreach"
         self.output_dir.mkdir(exist_ok=True, parents=True)
         
-        self._bark_initialized = False
-        
         self.d_id_api_key = D_ID_KEY
         if self.d_id_api_key:
             logger.info("D-ID API key loaded from environment")
         else:
             logger.warning("D-ID API key not found. Add D_ID_API_KEY to your .env file")
+        self.videos = VideoJobScheduler(storage, api_key=self.d_id_api_key)
         
         self.ffmpeg_available = self.check_ffmpeg()
         logger.info(f"FFmpeg available: {self.ffmpeg_available}")
 
-    def _initialize_bark(self):
-        if not self._bark_initialized:
-            logger.info("Initializing Bark TTS models...")
-            with safe_globals([
-                np.core.multiarray.scalar,
-                np.dtype,
-                np.dtypes.Float64DType
-            ]):
-                preload_models()
-                logger.info("Bark TTS models loaded successfully")
-                self._bark_initialized = True
-
     def check_ffmpeg(self):
         try:
             subprocess.run(["ffmpeg", "-version"], capture_output=True, check=True)#, timeout=5)
@@ -99,22 +86,13 @@ class CreativeOutreachAgent:
         try:
             models_to_try = ['llama3.2:3b', 'llama2:7b-chat', 'llama2']
             
-            for model in models_to_try:
-                try:
-                    result = subprocess.run(
-                        ["ollama", "run", model, prompt],
-                        capture_output=True,
-                        text=True,
-                        encoding="utf-8",
-                        # timeout=65,
-                        check=True
-                    )
-                    script = result.stdout.strip()
-                    if len(script) > 20 and len(script.split()) > 10:
-                        logger.info(f"Generated script for {company} using {model}")
-                        return self._clean_script(script)
-                except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
-                    continue
+            generated = self.llm.generate_first(
+                prompt, models_to_try, self.SCRIPT_PROMPT_VERSION,
+                accept=lambda s: len(s) > 20 and len(s.split()) > 10)
+            if generated:
+                model, script = generated
+                logger.info(f"Generated script for {company} using {model}")
+                return self._clean_script(script)
                     
             logger.warning(f"All Ollama models failed for {company}...using contextual fallback ;-;")
             return self.get_contextual_fallback_script(lead, context_type)
@@ -166,102 +144,17 @@ class CreativeOutreachAgent:
         }
         return scripts.get(context_type, scripts['general'])
 
-    def create_d_id_video(self, script: str, video_path: Path):
-        if not self.d_id_api_key:
-            logger.warning("D-ID API key not configured - skipping AI avatar")
+    def create_d_id_video(self, script: str, video_path: Path, signal_url: str = ""):
+        """Submit one talk and block until it is rendered (see submit_d_id_video for the async path)."""
+        job_id = self.submit_d_id_video(script, video_path, signal_url)
+        if job_id is None:
             return None
-        
-        clean_script = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', script[:350])
+        return self.videos.wait([job_id], timeout=self.videos.job_timeout).get(job_id)
 
+    def submit_d_id_video(self, script: str, video_path: Path, signal_url: str = ""):
         try:
-            url = "https://api.d-id.com/talks"
-
-            default_avatars = [
-                "amy-jBaWBj6FYr",
-                "mark-vwX6VXB4Kk",
-                "sarah-Lm8XnQ3jKp",
-            ]
-            source_url = f"https://create-images-results.d-id.com/DefaultPresenters/{random.choice(default_avatars)}/image.jpeg"
-
-            payload = {
-                "script": {
-                    "type": "text",
-                    "input": clean_script,
-                    "provider": {
-                        "type": "microsoft",
-                        "voice_id": "en-US-GuyNeural"
-                    }
-                },
-                "source_url": source_url,
-                "config": {
-                    "result_format": "mp4",
-                    "fluent": True,
-                    "pad_audio": 0.2,
-                    "stitch": True
-                }
-            }
-
-            headers = {
-                "accept": "application/json",
-                "content-type": "application/json",
-                "authorization": f"Basic {self.d_id_api_key}"
-            }
-
-            def make_json_safe(obj):
-                if isinstance(obj, dict):
-                    return {k: make_json_safe(v) for k, v in obj.items()}
-                elif isinstance(obj, list):
-                    return [make_json_safe(x) for x in obj]
-                elif isinstance(obj, (str, int, float, bool, type(None))):
-                    return obj
-                else:
-                    return str(obj)
-
-            logger.debug(f"D-ID payload: {json.dumps(payload)}")
             logger.info("Creating D-ID video...")
-            response = requests.post(url, json=payload, headers=headers)
-
-
-            if response.status_code != 201:
-                logger.error(f"D-ID request failed: {response.status_code} - {response.text}")
-                return None
-
-            talk_id = response.json()['id']
-            logger.info(f"D-ID video creation started: {talk_id}")
-
-            max_wait_time = 300
-            poll_interval = 3
-            start_time = time.time()
-
-            while (time.time() - start_time) < max_wait_time:
-                time.sleep(poll_interval)
-                try:
-                    status_response = requests.get(f"{url}/{talk_id}", headers=headers, timeout=10)
-                    if status_response.status_code == 200:
-                        status_data = status_response.json()
-                        status = status_data.get('status')
-                        if status == 'done':
-                            video_url = status_data['result_url']
-                            logger.info(f"Downloading D-ID video to {video_path}")
-                            video_resp = requests.get(video_url, stream=True, timeout=60)
-                            video_resp.raise_for_status()
-                            with open(video_path, 'wb') as f:
-                                for chunk in video_resp.iter_content(chunk_size=8192):
-                                    f.write(chunk)
-                            logger.info(f"D-ID video completed: {video_path}")
-                            return video_path
-                        elif status == 'error':
-                            error_msg = status_data.get('error', {}).get('message', 'Unknown error')
-                            logger.error(f"D-ID video failed: {error_msg}")
-                            return None
-                        poll_interval = min(poll_interval * 1.2, 10)
-                except requests.exceptions.RequestException as e:
-                    logger.warning(f"D-ID status check failed: {e}")
-                    continue
-
-            logger.warning("D-ID video timed out")
-            return None
-
+            return self.videos.submit(script, video_path, signal_url)
         except Exception as e:
             logger.error(f"D-ID video creation error: {e}")
             return None
@@ -281,36 +174,26 @@ class CreativeOutreachAgent:
 
                     JSON only:"""
         
+        response = self.llm.generate(prompt, "llama3.2:3b", self.COPY_PROMPT_VERSION)
+        if response is None:
+            logger.warning("LinkedIn/email generation failed: no response from Ollama")
+            return self.get_fallback_copies(script, company)
+
         try:
-            result = subprocess.run(
-                ["ollama", "run", "llama3.2:3b", prompt],
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                # timeout=12,
-                check=True
-            )
+            json_start = response.find('{')
+            json_end = response.rfind('}') + 1
+            if json_start >= 0 and json_end > json_start:
+                json_str = response[json_start:json_end]
+                parsed = json.loads(json_str)
+                logger.debug(f"LinkedIn message generated: {parsed}")
+                if all(key in parsed for key in ['linkedin', 'email_subject', 'email_body']):
+                    return parsed
+                logger.debug(f"LinkedIn message generated but Failed: {parsed}")
+                    
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.warning(f"LinkedIn message generation failed (1): {e}" )
             
-            response = result.stdout.strip()
-            try:
-                json_start = response.find('{')
-                json_end = response.rfind('}') + 1
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response[json_start:json_end]
-                    parsed = json.loads(json_str)
-                    logger.debug(f"LinkedIn message generated: {parsed}")
-                    if all(key in parsed for key in ['linkedin', 'email_subject', 'email_body']):
-                        return parsed
-                    logger.debug(f"LinkedIn message generated but Failed: {parsed}")
-                        
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.warning(f"LinkedIn message generation failed (1): {e}" )
-                
-            return self.get_fallback_copies(script, company)
-                
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError) as e:
-            logger.warning(f"LinkedIn/email generation failed: {e}")
-            return self.get_fallback_copies(script, company)
+        return self.get_fallback_copies(script, company)
 
     def get_fallback_copies(self, script: str, company: str):
         return {
@@ -319,7 +202,9 @@ class CreativeOutreachAgent:
             "email_body": script
         }
 
-    def create_assets_for_lead(self, lead: Dict):
+    def create_assets_for_lead(self, lead: Dict, wait_video: bool = True):
+        """Script, video and copy for one lead. With wait_video=False the D-ID talk is only
+        submitted: `video` stays None and `video_job` carries the job id to wait on."""
         company = self.extract_company_name(lead)
         safe_domain = lead.get("detected_domain", "unknown").replace(".", "_").replace("/", "_")[:50]
         
@@ -329,12 +214,23 @@ class CreativeOutreachAgent:
         script = self.generate_script(lead)
         logger.info(f"Generated script ({len(script)} chars)")
         
-        # File paths
-        timestamp = int(time.time())
-        video_file = self.output_dir / f"{safe_domain}_{timestamp}_video.mp4"
+        # File paths; the uuid part keeps leads on the same domain (all GitHub signals are
+        # github_com) submitted within one second from writing the same files
+        stem = f"{safe_domain}_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        video_file = self.output_dir / f"{stem}_video.mp4"
         
-        # Generate video
-        video_path = self.create_d_id_video(script, video_file)
+        audio_file = self.output_dir / f"{stem}_audio.wav"
+
+        # Generate video (rendered in the background by the job scheduler)
+        video_job = self.submit_d_id_video(script, video_file, lead.get("url", ""))
+        video_path = None
+        audio_path = None
+        if wait_video:
+            if video_job is not None:
+                video_path = self.videos.wait([video_job], timeout=self.videos.job_timeout).get(video_job)
+            if TTS_ENABLED:
+                from tts import get_tts_pool
+                audio_path = get_tts_pool().synthesize([(script, audio_file)], timeout=TTS_TIMEOUT)[0]
         
         # Generate LinkedIn/email copies
         copies = self.generate_linkedin_email(script, lead)
@@ -343,20 +239,28 @@ class CreativeOutreachAgent:
             "company": company,
             "script": script,
             "video": str(video_path) if video_path and video_path.exists() else None,
+            "video_job": video_job,
+            "audio": str(audio_path) if audio_path and audio_path.exists() else None,
+            "audio_file": str(audio_file),
             "linkedin": copies.get("linkedin"),
             "email_subject": copies.get("email_subject"),
             "email_body": copies.get("email_body")
         }
         
-        # Log asset creation summary
-        assets_created = sum(1 for v in [result['video']] if v)
-        logger.info(f"-----  Created {assets_created}/2 media assets for {company}  -----")
-        
+        if wait_video:
+            self._log_assets(result)
         return result
 
+    def _log_assets(self, result: Dict):
+        assets_created = sum(1 for v in [result['video'], result.get('audio')] if v)
+        logger.info(f"-----  Created {assets_created}/2 media assets for {result['company']}  -----")
+
     def run_for_top_leads(self, top_n=5):
+        return self.run_for_leads(list(self.storage.iter_leads(limit=top_n)))
+
+    def run_for_leads(self, leads):
+        """Create assets for each lead, in order; one result dict per lead."""
         try:
-            leads = self.storage.fetch_joined()[:top_n]
             if not leads:
                 logger.warning("No leads found")
                 return []
@@ -373,8 +277,9 @@ class CreativeOutreachAgent:
                 
                 try:
                     lead_start = time.time()
-                    assets = self.create_assets_for_lead(lead)
+                    assets = self.create_assets_for_lead(lead, wait_video=False)
                     lead_time = time.time() - lead_start
+                    METRICS.observe("gtm_creative_lead_seconds", lead_time)
                     
                     results.append({**lead, **assets})
                     logger.info(f"Completed lead {i}: {company} ({lead_time:.1f}s)")
@@ -391,17 +296,51 @@ class CreativeOutreachAgent:
                         "email_body": f"Hi there! I'd love to discuss how we can help {company} optimize your authentication systems."
                     })
                     continue
-                    
+
+            # narrate every script in one batch on the warm TTS pool while videos render
+            audio = {}
+            tts_deadline = time.monotonic() + TTS_TIMEOUT  # one deadline for the whole batch
+            if TTS_ENABLED:
+                todo = [r for r in results if r.get("audio_file")]
+                from tts import get_tts_pool  # deferred: spawns worker processes on first use
+                pool = get_tts_pool()
+                audio = dict(zip((id(r) for r in todo),
+                                 pool.submit([(r["script"], Path(r["audio_file"])) for r in todo])))
+
+            # all talks were submitted up front; wait once for the whole batch
+            videos = self.videos.wait([r.get("video_job") for r in results], timeout=self.videos.job_timeout)
+            for r in results:
+                path = videos.get(r.get("video_job"))
+                if r.get("video_job") is not None:
+                    r["video"] = str(path) if path and path.exists() else None
+                if id(r) in audio:
+                    try:
+                        wav = audio[id(r)].result(timeout=max(0.0, tts_deadline - time.monotonic()))
+                    except Exception as e:
+                        logger.warning(f"TTS audio failed for {r.get('company')}: {e}")
+                        wav = None
+                    r["audio"] = str(wav) if wav and wav.exists() else None
+                if "company" in r and "Failed to generate" not in (r.get("script") or ""):
+                    self._log_assets(r)
+
             total_time = time.time() - start_time
             successful_leads = len([r for r in results if r.get('script') and 'Failed to generate' not in r.get('script', '')])
             successful_videos = len([r for r in results if r.get('video')])
+            successful_audio = len([r for r in results if r.get('audio')])
 
             logger.info(f"""
                             Creative Outreach Process Complete:
                             Total Time: {total_time:.1f}s
                             Successful Leads: {successful_leads}/{total_leads}
                             Video Files: {successful_videos}
-                            Average Time/Lead: {total_time/total_leads:.1f}s""")
+                            Audio Files: {successful_audio}
+                            Average Time/Lead: {total_time/total_leads:.1f}s
+                            LLM cache: {self.llm.stats['hits']} hits / {self.llm.stats['misses']} misses""")
+            if TTS_ENABLED:
+                from tts import get_tts_pool
+                tts = get_tts_pool().stats()
+                logger.info(f"TTS: {tts['audio_seconds']:.1f}s audio in {tts['wall_seconds']:.1f}s wall "
+                            f"({tts['audio_per_wall_second']:.2f} audio s/wall s, {tts['failed']} failed)")
             
             return results
             
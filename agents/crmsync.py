@@ -1,8 +1,88 @@
-from typing import List, Any, Dict
+from itertools import islice
+from typing import List, Any, Dict, Iterable, Iterator, Optional
+import datetime as dt
+import gzip
 import json
+import os
+
+from config import CRM_EXPORT_GZIP, CRM_SYNC_DIR
+
 
 class CRMSyncAgent:
+    """NOTE:
+        export_json writes one pretty-printed list (kept for small ad hoc dumps).
+        export_ndjson streams one lead per line (optionally gzip) from any iterator.
+        sync() exports only leads whose signal/enrichment/score/outreach changed since
+        the last successful sync; files are written to a temp name and renamed into
+        place once complete, so a reader never sees a partial export.
+    """
+    STAGE = "crm_sync"
+
+    def __init__(self, storage=None, sync_dir: str = CRM_SYNC_DIR, compress: bool = CRM_EXPORT_GZIP):
+        self.storage = storage
+        self.sync_dir = sync_dir
+        self.compress = compress
+
     def export_json(self, leads: List[Dict[str, Any]], path: str = "crm_export.json") -> str:
         with open(path, "w", encoding="utf-8") as f:
             json.dump(leads, f, indent=2)
-        return path
\ No newline at end of file
+        return path
+
+    def export_ndjson(self, leads: Iterable[Dict[str, Any]], path: str,
+                      compress: Optional[bool] = None) -> int:
+        """Write `leads` as NDJSON to `path` (gzip when compress, or when path ends in .gz); returns rows."""
+        if compress is None:
+            compress = path.endswith(".gz")
+        tmp = f"{path}.part"
+        opener = gzip.open if compress else open
+        n = 0
+        try:
+            with opener(tmp, "wt", encoding="utf-8", newline="\n") as f:
+                for lead in leads:
+                    f.write(json.dumps(lead, separators=(",", ":"), default=str))
+                    f.write("\n")
+                    n += 1
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return n
+
+    @staticmethod
+    def _record(lead: Dict[str, Any], outreach: List[Dict[str, Any]]) -> Dict[str, Any]:
+        rec = dict(lead)
+        rec["tech_hints"] = json.loads(lead.get("tech_hints") or "{}")
+        rec["hiring_roles"] = [r for r in (lead.get("hiring_roles") or "").split(", ") if r]
+        rec["reasons"] = json.loads(lead.get("reasons") or "[]")
+        # latest draft per channel
+        rec["outreach"] = list({o["channel"]: o for o in outreach}.values())
+        return rec
+
+    def iter_crm_leads(self, since: Optional[str] = None, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        leads = self.storage.iter_changed_leads(since=since, page_size=page_size)
+        while True:
+            page = list(islice(leads, page_size))
+            if not page:
+                return
+            outreach = self.storage.fetch_outreach_for([ld["url"] for ld in page])
+            for ld in page:
+                yield self._record(ld, outreach.get(ld["url"], []))
+
+    def sync(self, full: bool = False, path: Optional[str] = None) -> Dict[str, Any]:
+        """Export changed leads (everything with full=True) and advance the sync watermark.
+
+        The watermark is the start time of the last completed sync, so rows written while
+        an export runs are picked up by the next one.
+        """
+        started = dt.datetime.now(dt.timezone.utc)
+        state = self.storage.get_stage_state(self.STAGE)
+        since = None if full or not state else state["watermark"]
+        if path is None:
+            os.makedirs(self.sync_dir, exist_ok=True)
+            name = f"crm_sync_{started:%Y%m%dT%H%M%S.%f}{'_full' if since is None else ''}.ndjson"
+            path = os.path.join(self.sync_dir, name + (".gz" if self.compress else ""))
+        n = self.export_ndjson(self.iter_crm_leads(since), path)
+        self.storage.set_stage_state(self.STAGE, started.isoformat(), rows_processed=n)
+        print(f"[CRM] {n} leads ({'delta since ' + since if since else 'full'}) -> {path}")
+        return {"path": path, "rows": n, "since": since}
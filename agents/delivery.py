@@ -27,6 +27,6 @@ class DeliveryAgent:
             print("Slack webhook error:", e)
 
     def run(self, min_score: int = 20, top_n: int = 5):
-        leads = self.storage.fetch_joined(min_score=min_score)[:top_n]
+        leads = self.storage.iter_leads(min_score=min_score, limit=top_n)
         for ld in leads:
             self.notify_slack(ld)
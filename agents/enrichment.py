@@ -1,21 +1,35 @@
-from bs4 import BeautifulSoup
+from config import DOMAIN_PROFILE_MAX_ROWS, DOMAIN_PROFILE_TTL, PAGE_TEXT_MAX_BYTES
+from crawlplan import CrawlPlan
 from storage import Storage
-from typing import List
-import time
+from typing import Any, Dict, List, Optional
 
-from webstuff import http_get, extract_domain, scan_website_for_tech
+from webstuff import TECH_PATHS, extract_domain, scan_website_for_tech
 
 class EnrichmentAgent:
-    def __init__(self, storage: Storage):
+    CAREER_PATHS = ["/careers", "/jobs", "/about", "/team"]
+    SIZE_PATHS = ["/team", "/about"]
+
+    def __init__(self, storage: Storage, ttl: int = DOMAIN_PROFILE_TTL, max_profiles: int = DOMAIN_PROFILE_MAX_ROWS,
+                 plan: Optional[CrawlPlan] = None):
         self.storage = storage
+        self.ttl = ttl
+        self.max_profiles = max_profiles
+        self.cache_stats = {"hits": 0, "misses": 0}
+        # pages come from the run's shared crawl plan (one fetch per URL per run)
+        self.plan = plan or CrawlPlan()
+
+    def _plan(self, domain: str):
+        self.plan.need(domain, TECH_PATHS)
+        self.plan.need(domain, self.CAREER_PATHS, PAGE_TEXT_MAX_BYTES)
+        self.plan.need(domain, self.SIZE_PATHS, PAGE_TEXT_MAX_BYTES)
 
     def _guess_careers(self, domain: str) -> List[str]:
         roles = []
-        for path in ["/careers", "/jobs", "/about", "/team"]:
-            html = http_get(f"https://{domain}{path}")
-            if not html:
+        for path in self.CAREER_PATHS:
+            text = self.plan.text(f"https://{domain}{path}")
+            if not text:
                 continue
-            text = BeautifulSoup(html, "html.parser").get_text(" ").lower()
+            text = text.lower()
             for role in ["security", "identity", "backend", "platform", "mobile", "sre", "devops"]:
                 if role in text:
                     roles.append(role)
@@ -23,11 +37,12 @@ class EnrichmentAgent:
 
     def _size_hint(self, domain: str) -> str:
         # infer size by number of employees visible on team page
-        html = http_get(f"https://{domain}/team") or http_get(f"https://{domain}/about")
-        if not html:
+        # the first of /team, /about that has a page
+        url = next((u for u in (f"https://{domain}{p}" for p in self.SIZE_PATHS) if self.plan.html(u)), None)
+        if not url:
             return "unknown"
         # naive heuristic -> count occurrences of common job titles as a proxy
-        text = BeautifulSoup(html, "html.parser").get_text(" ").lower()
+        text = self.plan.text(url).lower()
         count = 0
         for kw in ["engineer", "product", "sales", "marketing", "designer", "finance", "hr"]:
             count += text.count(kw)
@@ -38,16 +53,74 @@ class EnrichmentAgent:
         if count > 3: return "2-10"
         return "1"
 
-    def run(self):
-        signals = self.storage.fetch_signals(limit=100)
+    def _crawl(self, domain: str) -> Dict[str, Any]:
+        return dict(tech_hints=scan_website_for_tech(domain, self.plan.body),
+                    hiring_roles=self._guess_careers(domain),
+                    company_size_hint=self._size_hint(domain))
+
+    STAGE = "enrichment"
+
+    def run(self, concurrency: Optional[int] = None, backlog: bool = False,
+            batch_size: int = 100) -> Dict[str, Any]:
+        """Enrich un-enriched signals in batches of `batch_size`.
+
+        By default only signals newer than the stage watermark (last signal id enriched
+        by a successful batch) are read. `backlog=True` starts from the oldest signal and
+        drains every un-enriched one. The watermark advances after each committed batch.
+        """
+        state = self.storage.get_stage_state(self.STAGE)
+        watermark = int(state["watermark"]) if state and state["watermark"] else 0
+        after_id = 0 if backlog else watermark
+        totals = {"signals": 0, "domains": 0, "hits": 0, "misses": 0}
+        while True:
+            signals = self.storage.fetch_unenriched_signals(after_id=after_id, limit=batch_size)
+            if not signals:
+                break
+            stats = self._enrich_batch(signals, concurrency)
+            for k in totals:
+                totals[k] += stats[k]
+            after_id = signals[-1]["id"]
+            watermark = max(watermark, after_id)
+            self.storage.set_stage_state(self.STAGE, watermark, rows_processed=stats["signals"])
+        totals["hit_rate"] = round(totals["hits"] / totals["domains"], 3) if totals["domains"] else 0.0
+        print(f"[ENRICH] {totals['signals']} signals over {totals['domains']} domains, cache hits={totals['hits']} "
+              f"misses={totals['misses']} hit_rate={totals['hit_rate']:.1%}")
+        return totals
+
+    def _enrich_batch(self, signals: List[Dict[str, Any]], concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Crawl each distinct domain at most once per TTL window, `concurrency` pages at a time.
+
+        Fresh results come from the domain_profiles cache; only stale or unseen domains
+        are crawled. Their pages are declared on the crawl plan and fetched in one parallel
+        pass (each URL once, politeness per host in webstuff.HOST_LIMITER), then parsed on
+        this thread, which also does the writes. Returns this batch's cache stats.
+        """
+        by_domain: Dict[str, List[str]] = {}
         for s in signals:
             domain = s.get("detected_domain") or extract_domain(s.get("url", ""))
             if not domain:
                 continue
-            tech_hints = scan_website_for_tech(domain)
-            roles = self._guess_careers(domain)
-            size = self._size_hint(domain)
-            self.storage.upsert_enrichment(signal_url=s["url"], domain=domain,
-                                           tech_hints=tech_hints, company_size_hint=size,
-                                           hiring_roles=roles)
-            time.sleep(0.3)
+            by_domain.setdefault(domain, []).append(s["url"])
+
+        profiles = self.storage.fetch_domain_profiles(by_domain, max_age=self.ttl)
+        hits = len(profiles)
+        misses = [d for d in by_domain if d not in profiles]
+        if misses:
+            for domain in misses:
+                self._plan(domain)
+            self.plan.fetch(concurrency)
+            for domain in misses:
+                profiles[domain] = self._crawl(domain)
+            self.storage.upsert_domain_profiles_many(dict(domain=d, **profiles[d]) for d in misses)
+            self.plan.release(misses)  # profiles are written; their pages are not read again
+            self.storage.evict_domain_profiles(max_rows=self.max_profiles)
+
+        rows = []
+        for domain, urls in by_domain.items():
+            for url in urls:
+                rows.append(dict(signal_url=url, domain=domain, **profiles[domain]))
+        self.storage.upsert_enrichments_many(rows)
+
+        self.cache_stats["hits"] += hits
+        self.cache_stats["misses"] += len(misses)
+        return {"signals": len(rows), "domains": len(by_domain), "hits": hits, "misses": len(misses)}
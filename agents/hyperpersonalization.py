@@ -1,16 +1,57 @@
-from bs4 import BeautifulSoup
-from webstuff import http_get
+from typing import Iterable, List, Optional
+
+from config import PAGE_TEXT_MAX_BYTES
+from crawlplan import CrawlPlan
+from pagetext import first_heading
 
 
 class HyperPersonalizationAgent:
+    PATHS = ["/blog", "/news", "/changelog"]
+
+    def __init__(self, plan: Optional[CrawlPlan] = None):
+        self._hooks = {}  # domain -> hook, so each domain is crawled once per agent
+        self.plan = plan or CrawlPlan()
+
+    def recent_hooks(self, domains: Iterable[str]) -> List[str]:
+        """Hooks for many domains, one parallel fetch pass per path.
+
+        A path is only requested for the domains the earlier paths gave no hook for,
+        so each domain costs the same requests as recent_hook(), just not one by one.
+        """
+        domains = list(domains)
+        pending = [d for d in dict.fromkeys(domains) if d and d not in self._hooks]
+        for path in self.PATHS:
+            if not pending:
+                break
+            for domain in pending:
+                self.plan.need(domain, [path], PAGE_TEXT_MAX_BYTES)
+            self.plan.fetch()
+            missing = []
+            for domain in pending:
+                hook = self._hook_at(domain, path)
+                if hook:
+                    self._hooks[domain] = hook
+                else:
+                    missing.append(domain)
+            pending = missing
+        self._hooks.update(dict.fromkeys(pending, ""))
+        self.plan.release(d for d in domains if d)
+        return [self.recent_hook(d) for d in domains]
+
     def recent_hook(self, domain: str) -> str:
+        if domain not in self._hooks:
+            self._hooks[domain] = self._find_hook(domain) if domain else ""
+        return self._hooks[domain]
+
+    def _find_hook(self, domain: str) -> str:
         # Try a /blog or /news page and grab latest title
-        for path in ["/blog", "/news", "/changelog"]:
-            html = http_get(f"https://{domain}{path}")
-            if not html:
-                continue
-            soup = BeautifulSoup(html, "html.parser")
-            h = soup.find(["h1", "h2", "h3"])
-            if h and h.get_text(strip=True):
-                return f"Saw your recent post: '{h.get_text(strip=True)}' — congrats on the launch."
+        for path in self.PATHS:
+            hook = self._hook_at(domain, path)
+            if hook:
+                return hook
         return ""
+
+    def _hook_at(self, domain: str, path: str) -> str:
+        html = self.plan.html(f"https://{domain}{path}")
+        heading = first_heading(html) if html else None
+        return f"Saw your recent post: '{heading}' — congrats on the launch." if heading else ""
@@ -1,17 +1,19 @@
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Union
 import datetime as dt
 
+from lead import Lead, as_lead
+
 
 class IntentPredictionAgent:
-    def predict(self, enriched_row: Dict[str, Any]) -> Tuple[int, str]:
+    def predict(self, enriched_row: Union[Lead, Dict[str, Any]]) -> Tuple[int, str]:
+        lead = as_lead(enriched_row)
         recency_bonus = 0
         # if created within last 14 days
         try:
-            created = dt.datetime.fromisoformat(enriched_row.get("created_at"))
+            created = dt.datetime.fromisoformat(lead.created_at)
             if (dt.datetime.now(dt.timezone.utc) - created).days <= 14:
                 recency_bonus = 10
         except Exception:
             pass
-        roles = (enriched_row.get("hiring_roles") or "").lower()
-        hiring_bonus = 8 if any(r in roles for r in ["security", "identity"]) else 0
+        hiring_bonus = 8 if lead.roles & {"security", "identity"} else 0
         return recency_bonus + hiring_bonus, "recent+relevant hiring"
@@ -1,14 +1,28 @@
-import json
-from typing import List
+import hashlib
+from typing import Dict, List
 
-import requests
 from config import OLLAMA_MODEL, SAFE_MODE
+from llm import CachedLLM
 from storage import Storage
 
 
 class MessagingAgent:
+    """NOTE:
+        Drafts are idempotent: each is keyed by (signal_url, channel, version, input hash),
+        where version names the template (plus refine prompt and model when the LLM is
+        used) and the hash covers the template inputs. Leads are checked against the
+        outreach table a page at a time, and a lead whose key is already there is
+        skipped before any template or LLM work. Bump
+        TEMPLATE_VERSION whenever _template_email's wording changes.
+    """
+    CHANNEL = "email"
+    PAGE_SIZE = 500  # leads checked against outreach, drafted and inserted per batch
+    TEMPLATE_VERSION = "email-v1"
+    REFINE_PROMPT_VERSION = "refine-v1"
+
     def __init__(self, storage: Storage):
         self.storage = storage
+        self.llm = CachedLLM(storage)
 
     def _template_email(self, company: str, pain: str, tech: List[str]) -> str:
         tech_str = ", ".join(tech) if tech else "modern auth"
@@ -22,29 +36,60 @@ class MessagingAgent:
             f"– Ananya\n"
         )
 
+    @staticmethod
+    def input_hash(*parts: str) -> str:
+        h = hashlib.sha256()
+        for part in parts:
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def version(self, use_llm: bool) -> str:
+        model = None if SAFE_MODE else OLLAMA_MODEL
+        if use_llm and model:
+            return f"{self.TEMPLATE_VERSION}+{self.REFINE_PROMPT_VERSION}:{model}"
+        return self.TEMPLATE_VERSION
+
     def _ollama_refine(self, text: str) -> str:
-        try:
-            resp = requests.post("http://localhost:11434/api/generate", json={
-                "model": None if SAFE_MODE else OLLAMA_MODEL,
-                "prompt": (
-                    "Rewrite the following cold email to be concise (80-120 words),\n"
-                    "personal yet professional, with a clear CTA for a 15-min chat.\n\n" + text
-                )
-            }, timeout=30)
-            if resp.status_code == 200:
-                out = resp.json().get("response", "").strip()
-                return out or text
-        except Exception:
-            pass
-        return text
-
-    def run(self, min_score: int = 10, use_llm: bool = False):
-        leads = self.storage.fetch_joined(min_score=min_score)
+        out = self.llm.generate(
+            "Rewrite the following cold email to be concise (80-120 words),\n"
+            "personal yet professional, with a clear CTA for a 15-min chat.\n\n" + text,
+            model=None if SAFE_MODE else OLLAMA_MODEL,
+            template_version=self.REFINE_PROMPT_VERSION,
+        )
+        return out or text
+
+    def run(self, min_score: int = 10, use_llm: bool = False) -> Dict[str, int]:
+        """Draft outreach for new or changed leads; returns {leads, drafted, skipped}."""
+        version = self.version(use_llm)
+        leads = self.storage.iter_leads(min_score=min_score, page_size=self.PAGE_SIZE, columns=[
+            "url", "title", "detected_company", "detected_domain", "tech_hints"])
+        totals = dict(leads=0, drafted=0, skipped=0)
+        page: List[tuple] = []
         for ld in leads:
-            company = (ld.get("detected_company") or ld.get("detected_domain") or "your team")
-            pain = ld.get("title") or "auth/SSO friction"
-            tech = list(json.loads(ld.get("tech_hints") or "{}").keys())
+            company = ld.detected_company or ld.detected_domain or "your team"
+            pain = ld.title or "auth/SSO friction"
+            tech = ld.tech_names
+            page.append((ld.url, self.input_hash(company, pain, *tech), company, pain, tech))
+            if len(page) >= self.PAGE_SIZE:
+                self._draft_page(page, version, use_llm, totals)
+                page = []
+        if page:
+            self._draft_page(page, version, use_llm, totals)
+        return totals
+
+    def _draft_page(self, page: List[tuple], version: str, use_llm: bool, totals: Dict[str, int]):
+        """Draft and insert the leads in `page` that have no draft yet, counting into `totals`."""
+        drafted = self.storage.drafted_outreach(self.CHANNEL, version, [(url, key) for url, key, *_ in page])
+        rows = []
+        for url, key, company, pain, tech in page:
+            if (url, key) in drafted:
+                continue
             msg = self._template_email(company, pain, tech)
             if use_llm:
                 msg = self._ollama_refine(msg)
-            self.storage.insert_outreach(signal_url=ld["url"], channel="email", message=msg, status="draft")
+            rows.append(dict(signal_url=url, channel=self.CHANNEL, message=msg, status="draft",
+                             version=version, input_hash=key))
+        totals["leads"] += len(page)
+        totals["skipped"] += len(page) - len(rows)
+        totals["drafted"] += self.storage.insert_outreach_many(rows)
@@ -1,7 +1,7 @@
-from typing import List
+from typing import AbstractSet, List, Union
 
 class MultiThreadingAgent:
-    def suggest_personas(self, size_hint: str, roles: str) -> List[str]:
+    def suggest_personas(self, size_hint: str, roles: Union[str, AbstractSet[str]]) -> List[str]:
         personas = ["CTO", "Head of Engineering", "Security Lead", "Platform Lead"]
         if size_hint in {"251-1000", ">1000"}:
             personas += ["IAM Architect", "Compliance Lead"]
@@ -1,44 +1,82 @@
-import json
+import datetime as dt
+from itertools import islice
 from config import AUTH_KEYWORDS
+from lead import Lead, tech_bit
 from storage import Storage
+from webstuff import AUTH_KEYWORD_DETECTOR
 
 
 class ScoringAgent:
     """NOTE: Scoring is very basic and uses extremely simple rules"""
-    def __init__(self, storage: Storage):
+    # Bump whenever the rules below change: every lead gets rescored on the next run.
+    # v2: keyword hits are token-prefix matches from the FTS index (was substring `in`)
+    RULES_VERSION = 2
+
+    def __init__(self, storage: Storage, batch_size: int = 1000, window: int = 20000):
         self.storage = storage
+        self.batch_size = batch_size
+        # leads per keyword-hit lookup: FTS prefix queries have a fixed setup cost
+        self.window = window
+
+    STAGE = "scoring"
+
+    TECH_WEIGHTS = [(tech_bit(name), pts, why) for name, pts, why in [
+        ("Descope", 5, "mentions Descope"), ("Auth0", 8, "Auth0 present"), ("Okta", 8, "Okta present"),
+        ("FirebaseAuth", 5, "Firebase Auth present"), ("SAML", 4, "SAML in stack"), ("OIDC", 4, "OIDC in stack"),
+    ]]
+    SIZE_WEIGHTS = {"51-250": 6, "251-1000": 10, ">1000": 12}
+    HIRING_ROLES = frozenset({"security", "identity", "backend", "platform", "devops"})
+
+    def _keyword_hits(self, page):
+        """signal id -> distinct AUTH_KEYWORDS hits, from the FTS index when there is one."""
+        if self.storage.fts:
+            return self.storage.keyword_hits(AUTH_KEYWORDS, [ld.id for ld in page])
+        return {ld.id: len(AUTH_KEYWORD_DETECTOR.scan(f"{ld.title or ''}\n{ld.snippet or ''}")) for ld in page}
+
+    def run(self, full: bool = False) -> int:
+        """Rescore new/changed leads only (or everything with full=True); returns rows written.
+
+        The stage watermark is the start time of the last successful run, so only rows
+        touched since then are scanned. A rules version change forces a full dirty scan.
+        Keyword hits come from indexed FTS MATCH queries, one lookup per window of leads.
+        """
+        started = dt.datetime.now(dt.timezone.utc).isoformat()
+        state = self.storage.get_stage_state(self.STAGE)
+        since = None
+        if state and state["version"] == self.RULES_VERSION:
+            since = state["watermark"]
+        joined = self.storage.iter_dirty_leads(self.RULES_VERSION, full=full, since=since)
+        written = 0
+        while True:
+            window = list(islice(joined, self.window))
+            if not window:
+                break
+            hits = self._keyword_hits(window)
+            for i in range(0, len(window), self.batch_size):
+                written += self.storage.upsert_scores_many(
+                    self._score(ld, hits.get(ld.id, 0)) for ld in window[i:i + self.batch_size])
+        self.storage.set_stage_state(self.STAGE, started, rows_processed=written, version=self.RULES_VERSION)
+        print(f"scored: {written} ({'full' if full else 'incremental'})")
+        return written
 
-    def run(self):
-        joined = self.storage.fetch_joined(min_score=0)  # pull all
-        print(f"joined: {joined}")
-        for row in joined:
-            text = f"{row.get('title','')}\n{row.get('snippet','')}".lower()
-            score = 0
-            reasons = []
-            # keyword strength
-            for kw in AUTH_KEYWORDS:
-                if kw in text:
-                    score += 3
-            # tech hints weight
-            tech = json.loads(row.get("tech_hints") or "{}")
-            if tech.get("Descope"): score += 5; reasons.append("mentions Descope")
-            if tech.get("Auth0"): score += 8; reasons.append("Auth0 present")
-            if tech.get("Okta"): score += 8; reasons.append("Okta present")
-            if tech.get("FirebaseAuth"): score += 5; reasons.append("Firebase Auth present")
-            if tech.get("SAML"): score += 4; reasons.append("SAML in stack")
-            if tech.get("OIDC"): score += 4; reasons.append("OIDC in stack")
-            # size hint
-            size = (row.get("company_size_hint") or "unknown")
-            size_weight = {"51-250": 6, "251-1000": 10, ">1000": 12}
-            score += size_weight.get(size, 2)
-            reasons.append(f"size={size}")
-            # hiring roles
-            roles = (row.get("hiring_roles") or "").split(",") if row.get("hiring_roles") else []
-            for r in roles:
-                if r.strip() in {"security","identity","backend","platform","devops"}:
-                    score += 2
-            if roles:
-                reasons.append(f"hiring={','.join([r.strip() for r in roles if r.strip()])}")
-            # cap and write
-            score = min(score, 100)
-            self.storage.upsert_score(signal_url=row["url"], score=score, reasons=reasons)
+    def _score(self, lead: Lead, keyword_hits: int):
+        score = 0
+        reasons = []
+        # keyword strength
+        score += 3 * keyword_hits
+        # tech hints weight
+        for bit, pts, why in self.TECH_WEIGHTS:
+            if lead.tech & bit:
+                score += pts
+                reasons.append(why)
+        # size hint
+        size = lead.company_size_hint or "unknown"
+        score += self.SIZE_WEIGHTS.get(size, 2)
+        reasons.append(f"size={size}")
+        # hiring roles
+        if lead.roles:
+            score += 2 * len(lead.roles & self.HIRING_ROLES)
+            reasons.append(f"hiring={','.join(sorted(lead.roles))}")
+        # cap
+        score = min(score, 100)
+        return dict(signal_url=lead.url, score=score, reasons=reasons, rules_version=self.RULES_VERSION)
@@ -1,46 +1,75 @@
 import feedparser
-import time
-from typing import List, Tuple
+import json
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
-from bs4 import BeautifulSoup
 import requests
-from config import AUTH_KEYWORDS
+from config import SIGNAL_MAX_RESULTS, SIGNAL_QUEUE_SIZE, SIGNAL_SOURCE_MIN_INTERVAL
+from dedupe import NearDuplicateIndex
+from github_issues import GitHubIssuesCollector
+from httpclient import get_client
+from pagetext import page_text
 from storage import Storage
-from webstuff import extract_domain
+from webstuff import AUTH_KEYWORD_DETECTOR, HostLimiter, extract_domain
+
+logger = logging.getLogger(__name__)
+
+Item = Tuple[str, str, str]
+
+_DONE = object()
 
 
 class SignalDetectionAgent:
     """NOTE: 
         Sources implemented:
-        - GitHub issues search (unauthenticated; low rate limit)
+        - GitHub issues search: incremental per-query cursors, paced by the API's
+          rate-limit headers (github_issues.GitHubIssuesCollector)
         - Hacker News Algolia search API
         - RSS feeds (security / engineering blogs)
+
+        Every source runs on its own thread with its own rate limiter and page cursor;
+        results stream through a bounded queue and are written in batches on the
+        calling thread. New signals are then clustered with their near-duplicates
+        (the same incident posted on several sources) so downstream agents see one.
     """
-    def __init__(self, storage: Storage):
+    QUERIES = [
+        "auth0 migration", "okta outage", "SAML SSO problem", "OIDC error", "MFA rollout issue",
+        "passwordless login broken", "oauth callback error"
+    ]
+    FEEDS = [
+        "https://security.googleblog.com/feeds/posts/default?alt=rss",
+        "https://feeds.feedburner.com/TheHackersNews",
+    ]
+
+    def __init__(self, storage: Storage, max_results: Optional[Dict[str, int]] = None,
+                 min_interval: float = SIGNAL_SOURCE_MIN_INTERVAL, queue_size: int = SIGNAL_QUEUE_SIZE,
+                 write_batch: int = 200):
         self.storage = storage
+        self.max_results = {**SIGNAL_MAX_RESULTS, **(max_results or {})}
+        # one slot per source, spaced by min_interval (replaces the global sleeps)
+        self.limiter = HostLimiter(max_connections=1, min_interval=min_interval)
+        self.queue_size = queue_size
+        self.write_batch = write_batch
+        self.dedupe = NearDuplicateIndex(storage)
+        self.github: Optional[GitHubIssuesCollector] = None
 
-    def _github_search(self, q: str, per_page: int = 5) -> List[Tuple[str, str, str]]:
-        url = f"https://api.github.com/search/issues?q={requests.utils.quote(q)}&per_page={per_page}&sort=updated"
+    def _get_json(self, source: str, url: str) -> Dict:
+        with self.limiter.slot(source):
+            res = get_client().fetch(url, timeout=20)
+        if not res:
+            return {}
         try:
-            data = requests.get(url, timeout=20).json()
-            items = data.get("items", [])
-        except Exception:
-            items = []
-        out = []
-        for it in items:
-            title = it.get("title", "")
-            html_url = it.get("html_url", "")
-            snippet = (it.get("body") or "")[:300]
-            out.append((html_url, title, snippet))
-        return out
+            return json.loads(res[0])
+        except ValueError:
+            return {}
 
-    def _hn_search(self, q: str, hits: int = 5) -> List[Tuple[str, str, str]]:
-        url = f"https://hn.algolia.com/api/v1/search?query={requests.utils.quote(q)}&tags=story"
-        try:
-            data = requests.get(url, timeout=20).json()
-            items = data.get("hits", [])[:hits]
-        except Exception:
-            items = []
+    def _hn_search(self, q: str, hits: int = 5, page: int = 0) -> List[Item]:
+        url = (f"https://hn.algolia.com/api/v1/search?query={requests.utils.quote(q)}&tags=story"
+               f"&hitsPerPage={hits}&page={page}")
+        items = self._get_json("hn", url).get("hits", [])[:hits]
         out = []
         for it in items:
             title = it.get("title", "")
@@ -49,53 +78,107 @@ class SignalDetectionAgent:
             out.append((url, title, snippet))
         return out
 
-    def _rss_pull(self, feed_url: str, limit: int = 5) -> List[Tuple[str, str, str]]:
+    def _rss_pull(self, feed_url: str, limit: int = 5) -> List[Item]:
         try:
-            d = feedparser.parse(feed_url)
+            with self.limiter.slot(f"rss:{feed_url}"):
+                res = get_client().fetch(feed_url, timeout=20)
+            d = feedparser.parse(res[0] if res else b"")
         except Exception:
             return []
         out = []
         for entry in d.entries[:limit]:
             url = entry.link
             title = entry.title
-            summary = BeautifulSoup(getattr(entry, "summary", ""), "html.parser").get_text()[:300]
+            # bs4's get_text() glued adjacent strings ("<b>Acme</b>launches" -> "Acmelaunches");
+            # page_text keeps them separate words
+            summary = page_text(getattr(entry, "summary", ""))[:300]
             out.append((url, title, summary))
         return out
 
-    def run(self):
-        queries = [
-            "auth0 migration", "okta outage", "SAML SSO problem", "OIDC error", "MFA rollout issue",
-            "passwordless login broken", "oauth callback error"
-        ]
-        # GitHub & HN
-        for q in queries:
-            for url, title, snippet in self._github_search(q):
-                # print(f'Github: {url, title,snippet}\n')
-                self.storage.upsert_signal(
-                    source="github", url=url, title=title, snippet=snippet,
-                    detected_company="", detected_domain=extract_domain(url)
-                )
-            time.sleep(0.5)
-            for url, title, snippet in self._hn_search(q):
-                # print(f'HN: {url, title,snippet}\n')
-                self.storage.upsert_signal(
-                    source="hn", url=url, title=title, snippet=snippet,
-                    detected_company="", detected_domain=extract_domain(url)
-                )
-            time.sleep(0.5)
-
-        # A couple of generic security feeds (free)
-        feeds = [
-            "https://security.googleblog.com/feeds/posts/default?alt=rss",
-            "https://feeds.feedburner.com/TheHackersNews",
-        ]
-        for f in feeds:
-            for url, title, snippet in self._rss_pull(f):
-                # print(f'RSS: {url, title,snippet}\n')
-                text = f"{title} {snippet}".lower()
-                if any(k in text for k in AUTH_KEYWORDS):
-                    # print(f'RSS: {url, title,snippet}\n')
-                    self.storage.upsert_signal(
-                        source="rss", url=url, title=title, snippet=snippet,
+    def _paginate(self, fetch: Callable[[int, int], List[Item]], cap: int,
+                  first_page: int, max_per_page: int) -> Iterator[Item]:
+        """Walk pages until `cap` items were seen or a short page signals the end."""
+        per_page = max(1, min(cap, max_per_page))
+        page, seen = first_page, 0
+        while seen < cap:
+            items = fetch(per_page, page)
+            for it in items[:cap - seen]:
+                yield it
+            seen += len(items)
+            if len(items) < per_page:
+                break
+            page += 1
+
+    def _github_source(self) -> Iterator[Tuple[str, Item]]:
+        for it in self.github.collect():
+            yield "github", it
+
+    def _hn_source(self) -> Iterator[Tuple[str, Item]]:
+        for q in self.QUERIES:
+            for it in self._paginate(lambda n, p: self._hn_search(q, hits=n, page=p),
+                                     self.max_results["hn"], first_page=0, max_per_page=1000):
+                yield "hn", it
+
+    def _rss_source(self, feed_url: str) -> Iterator[Tuple[str, Item]]:
+        for url, title, snippet in self._rss_pull(feed_url, limit=self.max_results["rss"]):
+            if AUTH_KEYWORD_DETECTOR.matches(f"{title} {snippet}"):
+                yield "rss", (url, title, snippet)
+
+    def _produce(self, name: str, source: Callable[[], Iterator[Tuple[str, Item]]], out: "queue.Queue",
+                 stop: threading.Event):
+        try:
+            for item in source():
+                if stop.is_set():
+                    break
+                out.put(item)
+        except Exception:
+            # one broken source must not take the run down, but it must not go unnoticed either
+            logger.exception(f"signal source {name} failed; the run continues without the rest of it")
+            self.failed.append(name)
+        finally:
+            out.put(_DONE)
+
+    def run(self) -> int:
+        # reads the per-query cursors here, on the thread that owns the writes
+        self.github = GitHubIssuesCollector(self.storage, self.QUERIES, self.max_results["github"],
+                                            limiter=self.limiter)
+        sources = [("github", self._github_source), ("hn", self._hn_source)]
+        sources += [(f"rss {f}", lambda f=f: self._rss_source(f)) for f in self.FEEDS]
+        self.failed: List[str] = []  # names of the sources that raised this run
+
+        out: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        rows, written, pending = [], 0, len(sources)
+        with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+            for name, src in sources:
+                pool.submit(self._produce, name, src, out, stop)
+            try:
+                while pending:
+                    item = out.get()
+                    if item is _DONE:
+                        pending -= 1
+                        continue
+                    source, (url, title, snippet) = item
+                    rows.append(dict(
+                        source=source, url=url, title=title, snippet=snippet,
                         detected_company="", detected_domain=extract_domain(url)
-                    )
+                    ))
+                    if len(rows) >= self.write_batch:
+                        written += self.storage.upsert_signals_many(rows)
+                        rows = []
+            finally:
+                stop.set()
+                # unblock producers still waiting on a full queue
+                while pending:
+                    if out.get() is _DONE:
+                        pending -= 1
+        written += self.storage.upsert_signals_many(rows)
+        # only now that its issues are stored may the GitHub cursors move forward
+        self.github.save()
+        logger.info(self.github.summary())
+        if self.failed:
+            logger.warning(f"signal detection finished with {len(self.failed)} failed source(s): "
+                           f"{', '.join(self.failed)}")
+        self.dedupe.cluster_new()
+        self.storage.set_stage_state("signal_detection", None, rows_processed=written)
+        return written
@@ -0,0 +1,59 @@
+"""Cold-start import cost per CLI path, measured with `python -X importtime`.
+
+    python benchmarks/bench_import_time.py --top 10
+
+Each scenario runs in a fresh interpreter. Reports total import time, the slowest
+top-level imports (cumulative) and the child's peak RSS.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    # what `python main.py --bootstrap` / `--help` load before doing any work
+    "main (bootstrap/help)": "import main",
+    "agents package only": "import agents",
+    # the demo path, including the media agent
+    "creative outreach": "from agents import CreativeOutreachAgent",
+}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+_RSS = "import resource, sys; print('RSS_KB', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)"
+
+
+def measure(code: str):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"{code}\n{_RSS}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    top_level, rss_kb = [], 0
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m and len(m.group(3)) <= 1:  # top-level import (no nesting indent)
+            top_level.append((int(m.group(2)), m.group(4)))
+        elif line.startswith("RSS_KB"):
+            rss_kb = int(line.split()[1])
+    return sum(us for us, _ in top_level), sorted(top_level, reverse=True), rss_kb
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--top", type=int, default=8)
+    args = ap.parse_args()
+    for name, code in SCENARIOS.items():
+        try:
+            total_us, top, rss_kb = measure(code)
+        except RuntimeError as e:
+            print(f"== {name}: failed ({e})")
+            continue
+        print(f"== {name}: {total_us / 1000:.0f} ms imports, peak RSS {rss_kb / 1024:.0f} MB")
+        for us, mod in top[:args.top]:
+            print(f"   {us / 1000:8.1f} ms  {mod}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Top-N lead latency as the signals table grows: fetch_joined()[:n] vs iter_leads(limit=n).
+
+    python benchmarks/bench_iter_leads.py --sizes 10000 100000 --top 5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import Storage  # noqa: E402
+
+
+def _grow(st: Storage, start: int, stop: int):
+    rng = random.Random(start)
+    for lo in range(start, stop, 50000):
+        hi = min(lo + 50000, stop)
+        st.upsert_signals_many(dict(source="bench", url=f"https://ex{i % 997}.com/i/{i}", title=f"okta outage {i}",
+                                    snippet="sso", detected_domain=f"ex{i % 997}.com") for i in range(lo, hi))
+        st.upsert_scores_many(dict(signal_url=f"https://ex{i % 997}.com/i/{i}", score=rng.randint(0, 100),
+                                   reasons=[]) for i in range(lo, hi) if i % 4)
+
+
+def _ms(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--top", type=int, default=5)
+    ap.add_argument("--min-score", type=int, default=20)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        st = Storage(os.path.join(tmp, "leads.db"))
+        have = 0
+        print(f"{'signals':>10} {'fetch_joined[:n] ms':>20} {'iter_leads ms':>14}")
+        for size in sorted(args.sizes):
+            _grow(st, have, size)
+            have = size
+            old = _ms(lambda: st.fetch_joined(min_score=args.min_score)[:args.top], repeat=1)
+            new = _ms(lambda: list(st.iter_leads(min_score=args.min_score, limit=args.top)))
+            print(f"{size:>10} {old:>20.2f} {new:>14.3f}")
+        st.close()
+
+
+if __name__ == "__main__":
+    main()
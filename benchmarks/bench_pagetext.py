@@ -0,0 +1,104 @@
+"""Page text / first-heading extraction: BeautifulSoup tree vs. pagetext's incremental tokenizer.
+
+    python benchmarks/bench_pagetext.py saved_pages/ big.html --max-bytes 524288
+    python benchmarks/bench_pagetext.py                 # synthetic pages only
+
+Each page is run through the old agent code path (BeautifulSoup(html, "html.parser")
+then get_text(" ") / find(["h1", "h2", "h3"])) and through pagetext, uncapped and capped
+at --max-bytes (what the crawl plan downloads). Word-level parity with BeautifulSoup is
+checked on the uncapped text.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from config import PAGE_TEXT_MAX_BYTES  # noqa: E402
+from pagetext import first_heading, page_text  # noqa: E402
+
+
+def _synthetic(kb: int) -> str:
+    """A script/style-heavy marketing page of roughly `kb` KiB."""
+    head = ("<!doctype html><html><head><title>Acme &amp; Co</title>"
+            "<style>body{font:14px/1.4 sans-serif}.nav>li{display:inline}</style>"
+            "<script>window.__DATA__ = {\"engineer\": \"<h1>not a heading</h1>\"};</script></head><body>"
+            "<!--[if lte IE 11]><div>old browser</div><![endif]-->"
+            "<nav><ul class='nav'><li><a href='/'>Home</a></li><li><a href='/careers'>Careers</a></li></ul></nav>"
+            "<h2 class=\"post\"> Acme launches <em>passkeys</em> </h2>")
+    block = ("<div class=\"card\" data-x='a>b'><h3>Senior backend engineer</h3>"
+             "<p>Join our platform &amp; security team &mdash; SSO, SAML, OIDC.</p>"
+             "<ul><li>Product</li><li>Sales</li><li>Designer</li></ul>"
+             "<script>track('card', {id: 1, tags: ['<b>', '</b>']});</script></div>\n")
+    return head + block * max(1, kb * 1024 // len(block)) + "</body></html>"
+
+
+def _load(paths: List[str], limit: int) -> List[Tuple[str, str]]:
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, names in os.walk(p):
+                files += [os.path.join(root, n) for n in names if n.endswith((".html", ".htm"))]
+        else:
+            files.append(p)
+    files.sort(key=os.path.getsize, reverse=True)  # the large pages are the point
+    pages = []
+    for f in files[:limit]:
+        with open(f, "r", encoding="utf-8", errors="replace") as fh:
+            pages.append((os.path.basename(f), fh.read()))
+    return pages
+
+
+def _bs4(html: str):
+    soup = BeautifulSoup(html, "html.parser")
+    h = soup.find(["h1", "h2", "h3"])
+    return soup.get_text(" "), h.get_text(strip=True) if h else None
+
+
+def _timed(fn, pages: List[str]) -> Tuple[float, list]:
+    t0 = time.perf_counter()
+    out = [fn(html) for html in pages]
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("paths", nargs="*", help="HTML files or directories (largest first)")
+    ap.add_argument("--limit", type=int, default=20, help="at most this many files")
+    ap.add_argument("--max-bytes", type=int, default=PAGE_TEXT_MAX_BYTES)
+    ap.add_argument("--synthetic-kb", type=int, nargs="*", default=[64, 512, 4096])
+    args = ap.parse_args()
+
+    pages = [(f"synthetic-{kb}k", _synthetic(kb)) for kb in args.synthetic_kb] + _load(args.paths, args.limit)
+    htmls = [html for _, html in pages]
+    capped = [html.encode("utf-8")[:args.max_bytes].decode("utf-8", errors="replace") for html in htmls]
+    mb = sum(len(h.encode("utf-8")) for h in htmls) / 1e6
+
+    bs4_s, bs4_out = _timed(_bs4, htmls)
+    text_s, texts = _timed(page_text, htmls)
+    head_s, heads = _timed(first_heading, htmls)
+    capped_s, _ = _timed(lambda h: (page_text(h), first_heading(h)), capped)
+
+    mismatched = [name for (name, _), (bt, _), pt in zip(pages, bs4_out, texts) if bt.split() != pt.split()]
+    print(f"{len(pages)} pages, {mb:.1f} MB")
+    print(f"{'path':<44} {'seconds':>9} {'MB/s':>9} {'speedup':>8}")
+    for label, secs in [("bs4 parse + get_text + find(h1-h3)", bs4_s),
+                        ("pagetext page_text + first_heading", text_s + head_s),
+                        ("  page_text", text_s),
+                        ("  first_heading (stops at the heading)", head_s),
+                        (f"pagetext, pages capped at {args.max_bytes} B", capped_s)]:
+        print(f"{label:<44} {secs:9.3f} {mb / secs:9.1f} {bs4_s / secs:7.1f}x")
+    print(f"text parity with bs4 (word level): {len(pages) - len(mismatched)}/{len(pages)}"
+          + (f"  mismatched: {', '.join(mismatched[:5])}" if mismatched else ""))
+    # bs4's get_text(strip=True) glues inline children ("Acme launches" + "passkeys");
+    # first_heading keeps a space, so compare with whitespace removed
+    same = sum((b[1] or "").replace(" ", "") == (h or "").replace(" ", "") for b, h in zip(bs4_out, heads))
+    print(f"heading parity with bs4: {same}/{len(pages)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Rows/sec for Storage writes: per-row commits vs. the *_many batch API.
+
+    python benchmarks/bench_storage_writes.py --rows 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import Storage  # noqa: E402
+
+
+def _signal(i: int):
+    return dict(source="bench", url=f"https://example{i % 500}.com/issue/{i}",
+                title=f"SSO outage #{i}", snippet="saml login broken after okta migration",
+                detected_company="", detected_domain=f"example{i % 500}.com")
+
+
+def _legacy_upsert_signal(st: Storage, r):
+    # The pre-batch code path: two statements and a commit per row, rollback journal.
+    cur = st.conn.cursor()
+    cur.execute(
+        "INSERT OR IGNORE INTO signals(source, url, title, snippet, detected_company, detected_domain, created_at) "
+        "VALUES(?,?,?,?,?,?,datetime('now'))",
+        (r["source"], r["url"], r["title"], r["snippet"], r["detected_company"], r["detected_domain"])
+    )
+    cur.execute(
+        "UPDATE signals SET detected_company = COALESCE(NULLIF(?, ''), detected_company), "
+        "detected_domain = COALESCE(NULLIF(?, ''), detected_domain) WHERE url = ?",
+        (r["detected_company"], r["detected_domain"], r["url"])
+    )
+    st.conn.commit()
+
+
+def _timed(label: str, n: int, fn):
+    t0 = time.perf_counter()
+    fn()
+    dt_s = time.perf_counter() - t0
+    print(f"{label:<34} {n:>8} rows  {dt_s:8.3f}s  {n / dt_s:12.0f} rows/s")
+    return n / dt_s
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=5000)
+    args = ap.parse_args()
+    rows = [_signal(i) for i in range(args.rows)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        st = Storage(os.path.join(tmp, "before.db"))
+        st.conn.execute("PRAGMA journal_mode=DELETE")
+        st.conn.execute("PRAGMA synchronous=FULL")
+        before = _timed("before: per-row upsert_signal", len(rows),
+                        lambda: [_legacy_upsert_signal(st, r) for r in rows])
+        st.close()
+
+        st = Storage(os.path.join(tmp, "after.db"))
+        after = _timed("after: upsert_signals_many", len(rows), lambda: st.upsert_signals_many(rows))
+        scores = [dict(signal_url=r["url"], score=i % 100, reasons=["bench"]) for i, r in enumerate(rows)]
+        _timed("after: upsert_scores_many", len(scores), lambda: st.upsert_scores_many(scores))
+        enr = [dict(signal_url=r["url"], domain=r["detected_domain"], tech_hints={"Okta": 1},
+                    company_size_hint="51-250", hiring_roles=["security"]) for r in rows]
+        _timed("after: upsert_enrichments_many", len(enr), lambda: st.upsert_enrichments_many(enr))
+        st.close()
+
+    print(f"speedup (signals): {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""TechDetector vs one re.search per TECH_HINTS pattern, as vendor count grows.
+
+    python benchmarks/bench_tech_detect.py [--size-kb 1024] [--repeat 3]
+
+Times 6, 60 and 300 vendors (the real TECH_HINTS plus synthetic ones) on a page
+with no matches and a page with scattered matches, and checks the detector's
+offsets against each pattern's own finditer, including vendors that overlap
+("firebase auth0 login" is both FirebaseAuth and Auth0). Exits non-zero on a mismatch.
+The baseline stops at each vendor's first hit; the detector reports every offset.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import TECH_HINTS  # noqa: E402
+from webstuff import AUTH_KEYWORD_DETECTOR, TechDetector, keyword_regex  # noqa: E402
+
+WORDS = ("login session token user account settings page button form submit cookie "
+         "script style div span href class data value option select input label").split()
+
+OVERLAP_CASES = [
+    ("firebase auth0 login", {"FirebaseAuth": [0], "Auth0": [9]}),
+    ("FirebaseAuth via AUTH0.com", {"FirebaseAuth": [0], "Auth0": [17]}),
+    ("openid connect / oidc / okta.com", {"OIDC": [0, 17], "Okta": [24]}),
+]
+
+
+def vendors(n):
+    hints = dict(TECH_HINTS)
+    for i in range(n - len(hints)):
+        hints[f"Vendor{i}"] = rf"vendor{i}sdk|vendor{i}\.io|v{i}-auth\s*widget"
+    return dict(list(hints.items())[:n])
+
+
+def page(size, hints, rng, hits):
+    words, total = [], 0
+    while total < size:
+        words.append(rng.choice(WORDS))
+        total += len(words[-1]) + 1
+    if hits:
+        samples = [n.lower() for n in ("auth0.com", "okta", "firebase auth", "openid connect")]
+        samples += [f"vendor{i}sdk" for i in range(len(hints) - len(TECH_HINTS))]
+        for _ in range(hits):
+            words.insert(rng.randrange(len(words)), rng.choice(samples))
+    return "<html><body>" + " ".join(words) + "</body></html>"
+
+
+def baseline(hints, text):
+    low = text.lower()
+    return [tech for tech, pattern in hints.items() if re.search(pattern, low)]
+
+
+def reference(hints, text, prefix=""):
+    out = {}
+    for tech, pattern in hints.items():
+        pos = [m.start() for m in re.finditer(prefix + f"(?:{pattern})", text, re.IGNORECASE)]
+        if pos:
+            out[tech] = pos
+    return out
+
+
+def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size-kb", type=int, default=1024)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    rng = random.Random(7)
+    failures = 0
+
+    det = TechDetector(TECH_HINTS)
+    for text, expected in OVERLAP_CASES:
+        got = det.scan(text)
+        if got != expected:
+            failures += 1
+            print(f"FAIL overlap: {text!r} -> {got}, expected {expected}")
+    kw = {k: keyword_regex(k) for k in ("sso", "single sign-on", "oauth")}
+    kw_text = "Okta outage broke SSO; sso-login, lasso, single-sign-on"
+    got, expected = AUTH_KEYWORD_DETECTOR.scan(kw_text), reference(kw, kw_text, r"\b")
+    for k in kw:
+        if got.get(k) != expected.get(k):
+            failures += 1
+            print(f"FAIL keyword {k!r}: {got.get(k)}, expected {expected.get(k)}")
+
+    print(f"{'vendors':>8} {'page':>8} {'baseline ms':>12} {'detector ms':>12} {'speedup':>8}")
+    for n in (6, 60, 300):
+        hints = vendors(n)
+        det = TechDetector(hints)
+        for label, hits in (("no-hit", 0), ("hits", 50)):
+            text = page(args.size_kb * 1024, hints, rng, hits)
+            expected = reference(hints, text)
+            for kind, doc in (("str", text), ("bytes", text.encode("utf-8"))):
+                if det.scan(doc) != expected:
+                    failures += 1
+                    print(f"FAIL {n} vendors, {label} {kind}: offsets differ from per-pattern finditer")
+            if sorted(det.scan(text)) != sorted(baseline(hints, text)):
+                failures += 1
+                print(f"FAIL {n} vendors, {label}: vendor set differs from baseline")
+            t_base = best_of(args.repeat, lambda: baseline(hints, text))
+            t_det = best_of(args.repeat, lambda: det.scan(text))
+            print(f"{n:>8} {label:>8} {t_base * 1000:>12.1f} {t_det * 1000:>12.1f} {t_base / t_det:>7.1f}x")
+    print(f"{failures} mismatches")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
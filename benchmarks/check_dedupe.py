@@ -0,0 +1,58 @@
+"""Clustering sanity check: issues sharing a template stay apart, reposts of one incident merge.
+
+    python benchmarks/check_dedupe.py
+
+GitHub snippets are the first 300 characters of the issue body, usually the bug-report
+template, so two unrelated issues can pass the text threshold on the template alone.
+Exits non-zero when a pair lands on the wrong side.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedupe import MinHasher, NearDuplicateIndex  # noqa: E402
+from storage import Storage  # noqa: E402
+
+TEMPLATE = ("**Describe the bug**\nA clear and concise description of what the bug is.\n\n"
+            "**To Reproduce**\nSteps to reproduce the behavior:\n1. Go to '...'\n2. Click on '....'\n"
+            "3. Scroll down to '....'\n4. See error\n\n**Expected behavior**\n"
+            "A clear and concise description of what you expected to happen.")[:300]
+
+# (url, title, snippet, expected cluster label)
+SIGNALS = [
+    ("https://github.com/a/app/issues/1", "OIDC callback error after upgrading to v3", TEMPLATE, "oidc"),
+    ("https://github.com/b/admin/issues/2", "Okta SAML login loop in admin console", TEMPLATE, "saml"),
+    ("https://github.com/c/web/issues/3", "Passkey registration fails on Safari 17", TEMPLATE, "passkey"),
+    ("https://news.ycombinator.com/item?id=1", "Okta outage takes down SSO for thousands of companies",
+     "Okta's identity platform suffered a multi-hour outage on Tuesday, leaving SSO logins failing", "outage"),
+    ("https://example.com/blog/okta-outage", "Okta outage takes down SSO for thousands of companies",
+     "Okta's identity platform suffered a multi-hour outage on Tuesday, leaving SSO logins failing for", "outage"),
+]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        st = Storage(os.path.join(tmp, "dedupe.db"))
+        st.upsert_signals_many(dict(source="check", url=u, title=t, snippet=s) for u, t, s, _ in SIGNALS)
+        NearDuplicateIndex(st).cluster_new()
+        canonical = {r["url"]: r["canonical_id"] for r in st.conn.execute("SELECT url, canonical_id FROM signals")}
+        st.close()
+
+    h = MinHasher()
+    text_sim = h.similarity(h.signature(f"{SIGNALS[0][1]} {TEMPLATE}"), h.signature(f"{SIGNALS[1][1]} {TEMPLATE}"))
+    print(f"template-only text similarity of the first two issues: {text_sim:.3f}")
+    failures = 0
+    for i, (u1, _, _, l1) in enumerate(SIGNALS):
+        for u2, _, _, l2 in SIGNALS[i + 1:]:
+            same = canonical[u1] == canonical[u2]
+            if same != (l1 == l2):
+                failures += 1
+                print(f"FAIL: {u1} and {u2} {'merged' if same else 'kept apart'}")
+    print(f"{len(SIGNALS)} signals, {len(set(canonical.values()))} clusters, {failures} wrong pairs")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
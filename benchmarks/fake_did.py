@@ -0,0 +1,146 @@
+"""Local stand-in for the D-ID /talks API, plus a scheduler timing run.
+
+    python benchmarks/fake_did.py --jobs 5 --render 2
+    python benchmarks/fake_did.py --jobs 20 --render 1 --fail-rate 0.2 --malformed-rate 0.2 \
+        --hang-rate 0.2 --max-wait 5        # error, bad-body and timeout paths
+
+Each talk reports "started" until its render time elapses, then "done" with a
+result_url served by the same server. Point VideoJobScheduler(base_url=...) at it.
+The rates pick, per talk, a render that ends in status "error", a malformed status
+response (non-JSON body, "done" without result_url, or a string "error"), or one
+that never finishes.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeDID:
+    OUTCOMES = ("done", "error", "malformed", "hang")
+    MALFORMED = [
+        (200, b"<html>502 Bad Gateway</html>", "text/html"),
+        (200, b'{"status": "done"}', "application/json"),
+        (200, b'{"status": "error", "error": "render failed"}', "application/json"),
+    ]
+
+    def __init__(self, render_seconds: float = 2.0, video_bytes: int = 4 * 1024 * 1024,
+                 fail_rate: float = 0.0, malformed_rate: float = 0.0, hang_rate: float = 0.0, seed: int = 0):
+        self.render_seconds = render_seconds
+        self.video = os.urandom(1024) * (video_bytes // 1024)
+        self.weights = [max(0.0, 1.0 - fail_rate - malformed_rate - hang_rate), fail_rate, malformed_rate, hang_rate]
+        self._rng = random.Random(seed)
+        self.talks = {}
+        self.status_calls = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, code, body):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                if self.path != "/talks":
+                    return self._json(404, {})
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with fake._lock:
+                    n = next(fake._ids)
+                    outcome = fake._rng.choices(fake.OUTCOMES, fake.weights)[0]
+                    fake.talks[f"tlk_{n}"] = (time.monotonic() + fake.render_seconds, outcome, n)
+                self._json(201, {"id": f"tlk_{n}", "status": "created"})
+
+            def do_GET(self):
+                if self.path.startswith("/videos/"):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "video/mp4")
+                    self.send_header("Content-Length", str(len(fake.video)))
+                    self.end_headers()
+                    self.wfile.write(fake.video)
+                    return
+                talk_id = self.path.rsplit("/", 1)[-1]
+                with fake._lock:
+                    fake.status_calls += 1
+                    talk = fake.talks.get(talk_id)
+                if talk is None:
+                    return self._json(404, {})
+                ready_at, outcome, n = talk
+                if time.monotonic() < ready_at or outcome == "hang":
+                    return self._json(200, {"id": talk_id, "status": "started"})
+                if outcome == "error":
+                    return self._json(200, {"id": talk_id, "status": "error", "error": {"message": "render failed"}})
+                if outcome == "malformed":
+                    code, data, ctype = fake.MALFORMED[n % len(fake.MALFORMED)]
+                    self.send_response(code)
+                    self.send_header("Content-Type", ctype)
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                return self._json(200, {"id": talk_id, "status": "done",
+                                        "result_url": f"{fake.base_url}/videos/{talk_id}.mp4"})
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+
+
+def main():
+    from storage import Storage
+    from videojobs import VideoJobScheduler
+
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--jobs", type=int, default=5)
+    ap.add_argument("--render", type=float, default=2.0, help="seconds each fake render takes")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="share of talks ending in status error")
+    ap.add_argument("--malformed-rate", type=float, default=0.0, help="share of talks with a malformed status body")
+    ap.add_argument("--hang-rate", type=float, default=0.0, help="share of talks that never finish rendering")
+    ap.add_argument("--max-wait", type=float, default=30.0, help="scheduler deadline per talk (seconds)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    with FakeDID(render_seconds=args.render, fail_rate=args.fail_rate, malformed_rate=args.malformed_rate,
+                 hang_rate=args.hang_rate, seed=args.seed) as fake, tempfile.TemporaryDirectory() as tmp:
+        st = Storage(os.path.join(tmp, "jobs.db"))
+        sched = VideoJobScheduler(st, api_key="test", base_url=fake.base_url, max_wait=args.max_wait)
+        t0 = time.perf_counter()
+        ids = [sched.submit(f"script {i}", Path(tmp) / f"v{i}.mp4", f"https://lead/{i}") for i in range(args.jobs)]
+        done = sched.wait(ids, timeout=sched.job_timeout)
+        wall = time.perf_counter() - t0
+        sched.close()
+        ok = sum(1 for p in done.values() if p and p.exists())
+        print(f"{ok}/{args.jobs} videos in {wall:.1f}s (sequential would be >= {args.jobs * args.render:.1f}s), "
+              f"{fake.status_calls} status polls")
+        planned = Counter(outcome for _, outcome, _ in fake.talks.values())
+        print("fake outcomes:", dict(planned))
+        print("job statuses: ", dict(Counter(r["status"] for r in st.fetch_video_jobs())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Synthetic, offline web for the benchmark suite.
+
+One local HTTP server stands in for every host the agents talk to:
+- company sites: /, /login, /auth, /.well-known/* with tech hints; /careers, /jobs with
+  hiring roles; /team, /about listing `team_size` people; /blog, /news with a heading
+- api.github.com search/issues, hn.algolia.com search, and RSS feeds
+
+`route_to(fake)` mounts a transport adapter on the shared httpclient session that
+rewrites https://<host>/<path> to http://127.0.0.1:<port>/<host>/<path>, so the agents
+run unmodified.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+TECHS = ["auth0.com", "okta.com", "firebase auth", "descope", "saml", "openid connect"]
+ROLES = ["security", "identity", "backend", "platform", "mobile", "sre", "devops"]
+TITLES = ["engineer", "product", "sales", "marketing", "designer", "finance"]
+
+
+def _h(*parts) -> int:
+    return int(hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()[:8], 16)
+
+
+def company_domain(i: int) -> str:
+    return f"company{i}.example"
+
+
+class FakeWeb:
+    def __init__(self, team_size: int = 50, page_kb: int = 32, latency: float = 0.0, companies: int = 200):
+        self.team_size = team_size
+        self.page_kb = page_kb
+        self.latency = latency
+        self.companies = companies
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    # --- page builders -------------------------------------------------------
+    def _filler(self) -> str:
+        para = "<p>We build delightful software for teams everywhere. " * 8 + "</p>\n"
+        return para * max(1, (self.page_kb * 1024) // len(para))
+
+    def site_page(self, host: str, path: str) -> str:
+        seed = _h(host)
+        if path in ("", "/", "/login", "/auth") or path.startswith("/.well-known"):
+            tech = TECHS[seed % len(TECHS)]
+            return f"<html><head><script src='https://cdn.{tech}/sdk.js'></script></head><body>" \
+                   f"<h1>Sign in to {host}</h1>{self._filler()}</body></html>"
+        if path in ("/careers", "/jobs"):
+            roles = [ROLES[(seed + k) % len(ROLES)] for k in range(3)]
+            jobs = "".join(f"<li>Senior {r} engineer</li>" for r in roles)
+            return f"<html><body><h1>Careers</h1><ul>{jobs}</ul>{self._filler()}</body></html>"
+        if path in ("/team", "/about"):
+            people = "".join(f"<li>Person {k}, {TITLES[k % len(TITLES)]}</li>" for k in range(self.team_size))
+            return f"<html><body><h1>Our team</h1><ul>{people}</ul>{self._filler()}</body></html>"
+        if path in ("/blog", "/news", "/changelog"):
+            return f"<html><body><h2>{host} launches passkeys</h2>{self._filler()}</body></html>"
+        return ""
+
+    def github(self, qs) -> dict:
+        q, per_page, page = qs.get("q", [""])[0], int(qs.get("per_page", ["5"])[0]), int(qs.get("page", ["1"])[0])
+        items = []
+        for k in range(per_page):
+            n = _h(q, page, k) % 100000
+            items.append({"title": f"{q}: SSO login fails ({n})",
+                          "html_url": f"https://github.com/org{n % 97}/repo/issues/{n}",
+                          "updated_at": f"2024-01-{1 + page % 28:02d}T00:{k // 60 % 60:02d}:{k % 60:02d}Z",
+                          "body": "Users cannot sign in with SAML after the okta migration. " * 3})
+        return {"total_count": 10000, "items": items}
+
+    def hn(self, qs) -> dict:
+        q, hits, page = qs.get("query", [""])[0], int(qs.get("hitsPerPage", ["20"])[0]), int(qs.get("page", ["0"])[0])
+        out = []
+        for k in range(hits):
+            n = _h("hn", q, page, k)
+            out.append({"title": f"Ask HN: {q} ({n % 100000})", "objectID": str(n),
+                        "url": f"https://{company_domain(n % self.companies)}/blog/{n}"})
+        return {"hits": out}
+
+    def rss(self, host: str) -> str:
+        items = "".join(
+            f"<item><title>OAuth flaw {k} in {host}</title><link>https://{host}/post/{k}</link>"
+            f"<description>&lt;p&gt;A new SSO bypass affects passkey login {k}&lt;/p&gt;</description></item>"
+            for k in range(20))
+        return f"<?xml version='1.0'?><rss version='2.0'><channel><title>{host}</title>{items}</channel></rss>"
+
+    # --- server plumbing -----------------------------------------------------
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code: int, body: str, ctype: str = "text/html; charset=utf-8", headers=None):
+                data = body.encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", ctype)
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                if fake.latency:
+                    threading.Event().wait(fake.latency)
+                parts = urlsplit(self.path)
+                host, _, path = parts.path.lstrip("/").partition("/")
+                path = "/" + path if path else ""
+                qs = parse_qs(parts.query)
+                if host == "api.github.com":
+                    # a budget that never runs out, so the collector's pacing stays out of the timings
+                    return self._send(200, json.dumps(fake.github(qs)), "application/json",
+                                      {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "5000",
+                                       "X-RateLimit-Reset": str(int(time.time()) + 60)})
+                if host == "hn.algolia.com":
+                    return self._send(200, json.dumps(fake.hn(qs)), "application/json")
+                if "feed" in host or "rss" in parts.query or path.startswith("/feeds"):
+                    return self._send(200, fake.rss(host), "application/rss+xml")
+                body = fake.site_page(host, path)
+                self._send(200 if body else 404, body or "not found")
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+
+
+class _RouteAdapter(HTTPAdapter):
+    def __init__(self, base_url: str, **kw):
+        self.base_url = base_url
+        super().__init__(**kw)
+
+    def send(self, request, **kw):
+        parts = urlsplit(request.url)
+        request.url = f"{self.base_url}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+        return super().send(request, **kw)
+
+
+def route_to(fake: FakeWeb, session) -> None:
+    """Send every http(s) request made through `session` to the fake server."""
+    adapter = _RouteAdapter(fake.base_url, pool_connections=4, pool_maxsize=64)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
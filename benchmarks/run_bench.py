@@ -0,0 +1,244 @@
+"""Offline end-to-end benchmarks: one harness per agent, against the fake web and synthetic data.
+
+    python benchmarks/run_bench.py                        # all harnesses, default sizes
+    python benchmarks/run_bench.py --only scoring fetch_joined --sizes 1000 100000
+    python benchmarks/run_bench.py --save-baseline        # record benchmarks/baselines.json
+
+Every harness runs in its own subprocess so peak RSS is per harness. Reports throughput
+(items/s), p50/p99 latency (per HTTP fetch for the crawling agents, per run otherwise) and
+peak RSS, and flags results that are worse than the saved baseline by more than --tolerance.
+Each baseline stores the flags it was recorded with and is only compared against a run
+with the same flags (items and latency depend on --repeat, --min-score, ...).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+HARNESSES = ["detection", "enrichment", "scoring", "messaging", "messaging_rerun", "fetch_joined"]
+DEFAULT_SIZES = {"detection": [20], "enrichment": [200], "scoring": [10000],
+                 "messaging": [10000], "messaging_rerun": [10000], "fetch_joined": [10000]}
+
+
+def _pct(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _timed_fetches(samples: List[float]):
+    """Record the latency of every HttpClient.fetch call into `samples`."""
+    import httpclient
+    orig = httpclient.HttpClient.fetch
+
+    def fetch(self, *a, **kw):
+        t0 = time.perf_counter()
+        try:
+            return orig(self, *a, **kw)
+        finally:
+            samples.append(time.perf_counter() - t0)
+    httpclient.HttpClient.fetch = fetch
+
+
+def _offline_client(fake):
+    """Fresh shared client (no disk cache, no politeness delay) routed to the fake web."""
+    import httpclient
+    import webstuff
+    from fakeweb import route_to
+    httpclient._client = httpclient.HttpClient(cache_dir=None, max_retries=0)
+    route_to(fake, httpclient._client.session)
+    webstuff.HOST_LIMITER.min_interval = 0.0
+
+
+def _repeat(fn: Callable[[], int], repeat: int) -> Dict[str, Any]:
+    samples, items = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        items += fn()
+        samples.append(time.perf_counter() - t0)
+    return dict(items=items, seconds=sum(samples), samples=samples)
+
+
+# --- harnesses (run inside the child process) -------------------------------------------------
+def h_detection(st, size: int, args) -> Dict[str, Any]:
+    from agents.signaldetection import SignalDetectionAgent
+    from fakeweb import FakeWeb
+    samples: List[float] = []
+    with FakeWeb(latency=args.latency) as fake:
+        _offline_client(fake)
+        _timed_fetches(samples)
+        agent = SignalDetectionAgent(st, max_results={"github": size, "hn": size, "rss": 20}, min_interval=0)
+        t0 = time.perf_counter()
+        n = agent.run()
+        secs = time.perf_counter() - t0
+    return dict(items=n, seconds=secs, samples=samples, requests=fake.requests)
+
+
+def h_enrichment(st, size: int, args) -> Dict[str, Any]:
+    from agents.enrichment import EnrichmentAgent
+    from fakeweb import FakeWeb
+    from synth import generate_signals
+    generate_signals(st, size, companies=max(1, size // 4))
+    samples: List[float] = []
+    with FakeWeb(team_size=args.team_size, page_kb=args.page_kb, latency=args.latency) as fake:
+        _offline_client(fake)
+        _timed_fetches(samples)
+        t0 = time.perf_counter()
+        totals = EnrichmentAgent(st).run(backlog=True)
+        secs = time.perf_counter() - t0
+    return dict(items=totals["signals"], seconds=secs, samples=samples, requests=fake.requests)
+
+
+def h_scoring(st, size: int, args) -> Dict[str, Any]:
+    from agents.scoring import ScoringAgent
+    from synth import generate_signals
+    generate_signals(st, size, enrich=True)
+    agent = ScoringAgent(st)
+    return _repeat(lambda: agent.run(full=True), args.repeat)
+
+
+def h_messaging(st, size: int, args) -> Dict[str, Any]:
+    from agents.messaging import MessagingAgent
+    from synth import generate_signals
+    generate_signals(st, size, enrich=True, score=True)
+    agent = MessagingAgent(st)
+
+    # drafts written per second; every run is a first pass (drafts cleared in between, untimed)
+    samples, items = [], 0
+    for _ in range(args.repeat):
+        with st.transaction() as cur:
+            cur.execute("DELETE FROM outreach")
+        t0 = time.perf_counter()
+        items += agent.run(min_score=10)["drafted"]
+        samples.append(time.perf_counter() - t0)
+    return dict(items=items, seconds=sum(samples), samples=samples)
+
+
+def h_messaging_rerun(st, size: int, args) -> Dict[str, Any]:
+    from agents.messaging import MessagingAgent
+    from synth import generate_signals
+    generate_signals(st, size, enrich=True, score=True)
+    agent = MessagingAgent(st)
+    agent.run(min_score=10)  # first pass, untimed
+
+    # unchanged leads skipped per second (the idempotent re-run path)
+    return _repeat(lambda: agent.run(min_score=10)["skipped"], args.repeat)
+
+
+def h_fetch_joined(st, size: int, args) -> Dict[str, Any]:
+    from synth import generate_signals
+    generate_signals(st, size, enrich=True, score=True)
+    return _repeat(lambda: len(st.fetch_joined(min_score=args.min_score)), args.repeat)
+
+
+def child(name: str, size: int, args) -> Dict[str, Any]:
+    from storage import Storage
+    with tempfile.TemporaryDirectory() as tmp:
+        st = Storage(os.path.join(tmp, "bench.db"))
+        res = globals()[f"h_{name}"](st, size, args)
+        st.close()
+    samples = res.pop("samples")
+    return dict(harness=name, size=size, items=res["items"], seconds=round(res["seconds"], 4),
+                throughput=round(res["items"] / res["seconds"], 1) if res["seconds"] else 0.0,
+                p50_ms=round(_pct(samples, 0.50) * 1000, 3), p99_ms=round(_pct(samples, 0.99) * 1000, 3),
+                peak_rss_mb=round(_peak_rss_mb(), 1), **{k: v for k, v in res.items() if k not in ("items", "seconds")})
+
+
+# --- driver --------------------------------------------------------------------------------
+def _run_child(name: str, size: int, args) -> Dict[str, Any]:
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", name, "--sizes", str(size),
+           "--repeat", str(args.repeat), "--min-score", str(args.min_score), "--latency", str(args.latency),
+           "--team-size", str(args.team_size), "--page-kb", str(args.page_kb)]
+    out = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if out.returncode != 0:
+        return dict(harness=name, size=size, error=(out.stderr.strip().splitlines() or ["failed"])[-1])
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _flags(args) -> Dict[str, Any]:
+    """The options that change what a harness measures, stored with each baseline."""
+    return dict(repeat=args.repeat, min_score=args.min_score, latency=args.latency,
+                team_size=args.team_size, page_kb=args.page_kb)
+
+
+def _regressions(res: Dict[str, Any], base: Dict[str, Any], tol: float) -> List[str]:
+    out = []
+    if base.get("throughput") and res["throughput"] < base["throughput"] * (1 - tol):
+        out.append(f"throughput {res['throughput']} < {base['throughput']}")
+    for k in ("p99_ms", "peak_rss_mb"):
+        if base.get(k) and res[k] > base[k] * (1 + tol):
+            out.append(f"{k} {res[k]} > {base[k]}")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--only", nargs="+", choices=HARNESSES, default=HARNESSES)
+    ap.add_argument("--sizes", type=int, nargs="+", help="override sizes for every selected harness")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per size for the non-crawling harnesses")
+    ap.add_argument("--min-score", type=int, default=20)
+    ap.add_argument("--latency", type=float, default=0.0, help="artificial per-request server delay (s)")
+    ap.add_argument("--team-size", type=int, default=50)
+    ap.add_argument("--page-kb", type=int, default=32)
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--child", choices=HARNESSES, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.sizes[0], args)))
+        return
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+    print(f"{'harness':<13} {'size':>8} {'items/s':>11} {'p50 ms':>9} {'p99 ms':>9} {'rss MB':>8}  vs baseline")
+    regressed = 0
+    for name in args.only:
+        for size in args.sizes or DEFAULT_SIZES[name]:
+            res = _run_child(name, size, args)
+            key = f"{name}@{size}"
+            if "error" in res:
+                print(f"{name:<13} {size:>8}  ERROR: {res['error']}")
+                regressed += 1
+                continue
+            base = baselines.get(key)
+            if base and base.get("flags") != _flags(args):
+                note, bad = "baseline recorded with other flags", []
+            else:
+                bad = _regressions(res, base, args.tolerance) if base else []
+                note = "REGRESSION: " + "; ".join(bad) if bad else ("ok" if base else "no baseline")
+            regressed += bool(bad)
+            print(f"{name:<13} {size:>8} {res['throughput']:>11} {res['p50_ms']:>9} {res['p99_ms']:>9} "
+                  f"{res['peak_rss_mb']:>8}  {note}")
+            if args.save_baseline:
+                baselines[key] = {k: res[k] for k in ("items", "throughput", "p50_ms", "p99_ms", "peak_rss_mb")}
+                baselines[key]["flags"] = _flags(args)
+    if args.save_baseline:
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"baselines saved to {BASELINES}")
+    sys.exit(1 if regressed and not args.save_baseline else 0)
+
+
+if __name__ == "__main__":
+    main()
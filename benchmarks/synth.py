@@ -0,0 +1,75 @@
+"""Synthetic signals/enrichments/scores for the benchmark suite (1k .. 1M rows).
+
+    python benchmarks/synth.py --db /tmp/bench.db --signals 100000 --enrich --score
+"""
+import argparse
+import os
+import random
+import sys
+from typing import Iterator, Dict, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import AUTH_KEYWORDS, TECH_HINTS  # noqa: E402
+from storage import Storage  # noqa: E402
+
+try:
+    from benchmarks.fakeweb import ROLES, company_domain
+except ImportError:  # run as a script from benchmarks/
+    from fakeweb import ROLES, company_domain
+
+SOURCES = ["github", "hn", "rss"]
+TECH_NAMES = list(TECH_HINTS)  # enrichment stores the TECH_HINTS names, not the page strings
+SIZES = ["1", "2-10", "11-50", "51-250", "251-1000", ">1000", "unknown"]
+
+
+def signal_url(i: int, companies: int) -> str:
+    return f"https://{company_domain(i % companies)}/post/{i}"
+
+
+def _signals(lo: int, hi: int, companies: int, rng: random.Random) -> Iterator[Dict[str, Any]]:
+    for i in range(lo, hi):
+        kws = rng.sample(AUTH_KEYWORDS, k=2)
+        domain = company_domain(i % companies)
+        yield dict(source=SOURCES[i % 3], url=signal_url(i, companies),
+                   title=f"{kws[0]} trouble at {domain} #{i}",
+                   snippet=f"Users report {kws[1]} failures after the last release. " * 3,
+                   detected_domain=domain, detected_company=domain.split(".")[0])
+
+
+def generate_signals(storage: Storage, n: int, companies: int = 1000, enrich: bool = False,
+                     score: bool = False, batch: int = 20000, seed: int = 7) -> int:
+    """Write `n` signals (and optionally enrichments/scores) in batches; returns n."""
+    rng = random.Random(seed)
+    for lo in range(0, n, batch):
+        hi = min(lo + batch, n)
+        storage.upsert_signals_many(_signals(lo, hi, companies, rng))
+        if enrich:
+            storage.upsert_enrichments_many(
+                dict(signal_url=signal_url(i, companies), domain=company_domain(i % companies),
+                     tech_hints={TECH_NAMES[i % len(TECH_NAMES)]: 1 + i % 3},
+                     hiring_roles=sorted({ROLES[i % len(ROLES)], ROLES[(i * 7) % len(ROLES)]}),
+                     company_size_hint=SIZES[i % len(SIZES)])
+                for i in range(lo, hi))
+        if score:
+            storage.upsert_scores_many(dict(signal_url=signal_url(i, companies), score=rng.randint(0, 60),
+                                            reasons=["synthetic"]) for i in range(lo, hi))
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", required=True)
+    ap.add_argument("--signals", type=int, default=1000)
+    ap.add_argument("--companies", type=int, default=1000)
+    ap.add_argument("--enrich", action="store_true")
+    ap.add_argument("--score", action="store_true")
+    args = ap.parse_args()
+    st = Storage(args.db)
+    generate_signals(st, args.signals, args.companies, args.enrich, args.score)
+    st.close()
+    print(f"wrote {args.signals} signals to {args.db}")
+
+
+if __name__ == "__main__":
+    main()
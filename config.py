@@ -7,9 +7,89 @@ DB_PATH = os.path.join(os.path.dirname(__file__), "gtm.db")
 SLACK_WEBHOOK = os.getenv("SLACK_WEBHOOK", "")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
 D_ID_KEY = os.getenv("D_ID_KEY")
+D_ID_BASE_URL = os.getenv("D_ID_BASE_URL", "https://api.d-id.com")
+D_ID_MAX_WAIT = float(os.getenv("D_ID_MAX_WAIT", "300"))
+D_ID_DOWNLOAD_WORKERS = int(os.getenv("D_ID_DOWNLOAD_WORKERS", "4"))
 PATH_TO_SERVICEACC = os.getenv("PATH_TO_SERVICEACC")
 STORAGEBUCKET = os.getenv("STORAGEBUCKET")
 
+# SQLite tuning (see Storage._ensure)
+SQLITE_SYNCHRONOUS = os.getenv("GTM_SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_KB = int(os.getenv("GTM_SQLITE_CACHE_KB", "20000"))
+
+# Crawl politeness / concurrency (see webstuff.HostLimiter, EnrichmentAgent.run)
+ENRICH_CONCURRENCY = int(os.getenv("GTM_ENRICH_CONCURRENCY", "8"))
+HOST_MAX_CONNECTIONS = int(os.getenv("GTM_HOST_MAX_CONNECTIONS", "2"))
+HOST_MIN_INTERVAL = float(os.getenv("GTM_HOST_MIN_INTERVAL", "0.3"))
+# per-run page store shared by the crawling agents (crawlplan.CrawlPlan): bodies plus their
+# decoded html/text; LRU beyond this. Agents release a domain's pages once they are done.
+CRAWL_STORE_MAX_BYTES = int(os.getenv("GTM_CRAWL_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Domain crawl cache (domain_profiles table)
+DOMAIN_PROFILE_TTL = int(os.getenv("GTM_DOMAIN_PROFILE_TTL", str(7 * 24 * 3600)))  # seconds
+DOMAIN_PROFILE_MAX_ROWS = int(os.getenv("GTM_DOMAIN_PROFILE_MAX_ROWS", "50000"))
+
+# Shared HTTP client (httpclient.py); set GTM_HTTP_CACHE_DIR="" to disable the disk cache
+HTTP_POOL_CONNECTIONS = int(os.getenv("GTM_HTTP_POOL_CONNECTIONS", "32"))
+HTTP_POOL_MAXSIZE = int(os.getenv("GTM_HTTP_POOL_MAXSIZE", "16"))
+HTTP_MAX_RETRIES = int(os.getenv("GTM_HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("GTM_HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("GTM_HTTP_BACKOFF_MAX", "10"))
+HTTP_MAX_BODY_BYTES = int(os.getenv("GTM_HTTP_MAX_BODY_BYTES", str(2 * 1024 * 1024)))
+# pages read only for their text (careers/team/blog) stop downloading here (crawlplan.CrawlPlan)
+PAGE_TEXT_MAX_BYTES = int(os.getenv("GTM_PAGE_TEXT_MAX_BYTES", str(512 * 1024)))
+HTTP_CACHE_DIR = os.getenv("GTM_HTTP_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".http_cache"))
+
+# Run metrics (metrics.py): metrics.prom + run_report.json (+ profile.txt with --profile); "" disables
+METRICS_DIR = os.getenv("GTM_METRICS_DIR", os.path.join(os.path.dirname(__file__), "run_metrics"))
+PROFILE_TOP = int(os.getenv("GTM_PROFILE_TOP", "30"))
+
+# Near-duplicate signal clustering (dedupe.py): MinHash over title+snippet, LSH buckets in SQLite
+DEDUPE_THRESHOLD = float(os.getenv("GTM_DEDUPE_THRESHOLD", "0.5"))  # estimated Jaccard
+# titles must agree too (word-set Jaccard): issue-template bodies alone look alike
+DEDUPE_TITLE_THRESHOLD = float(os.getenv("GTM_DEDUPE_TITLE_THRESHOLD", "0.3"))
+DEDUPE_NUM_PERM = int(os.getenv("GTM_DEDUPE_NUM_PERM", "64"))
+DEDUPE_BANDS = int(os.getenv("GTM_DEDUPE_BANDS", "16"))
+
+# CRM export (agents/crmsync.py): NDJSON files, delta syncs land in CRM_SYNC_DIR
+CRM_SYNC_DIR = os.getenv("GTM_CRM_SYNC_DIR", os.path.join(os.path.dirname(__file__), "crm_sync"))
+CRM_EXPORT_GZIP = os.getenv("GTM_CRM_EXPORT_GZIP", "1") == "1"
+
+# Signal collection (SignalDetectionAgent): per-source result caps per query/feed
+SIGNAL_MAX_RESULTS = {
+    "github": int(os.getenv("GTM_GITHUB_MAX_RESULTS", "100")),  # per query and run: page depth x per_page
+    "hn": int(os.getenv("GTM_HN_MAX_RESULTS", "5")),
+    "rss": int(os.getenv("GTM_RSS_MAX_RESULTS", "5")),
+}
+SIGNAL_SOURCE_MIN_INTERVAL = float(os.getenv("GTM_SIGNAL_SOURCE_MIN_INTERVAL", "0.5"))
+SIGNAL_QUEUE_SIZE = int(os.getenv("GTM_SIGNAL_QUEUE_SIZE", "500"))
+
+# GitHub issue search (github_issues.GitHubIssuesCollector)
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN", "")  # optional; raises the search limit from 10 to 30 calls/min
+GITHUB_BACKFILL_DAYS = int(os.getenv("GTM_GITHUB_BACKFILL_DAYS", "7"))  # first run of a new query
+GITHUB_RATE_RESERVE = int(os.getenv("GTM_GITHUB_RATE_RESERVE", "0"))  # calls left untouched per window
+GITHUB_RATE_MAX_WAIT = float(os.getenv("GTM_GITHUB_RATE_MAX_WAIT", "65"))  # wait for a reset at most this long (s)
+
+# Local LLM (llm.LLMClient)
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+LLM_CACHE_MAX_AGE = int(os.getenv("GTM_LLM_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_BYTES = int(os.getenv("GTM_LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+# Bark TTS worker pool (tts.TTSPool)
+# opt-in: narration loads Bark in worker processes on the --run-demo path
+TTS_ENABLED = os.getenv("GTM_TTS_ENABLED", "0") == "1"
+TTS_BACKEND = os.getenv("GTM_TTS_BACKEND", "tts:bark_backend")  # "module:function" loader
+TTS_WORKERS = int(os.getenv("GTM_TTS_WORKERS", "1"))
+TTS_TORCH_THREADS = int(os.getenv("GTM_TTS_TORCH_THREADS", str(max(1, (os.cpu_count() or 1) // TTS_WORKERS))))
+TTS_BATCH_SIZE = int(os.getenv("GTM_TTS_BATCH_SIZE", "4"))
+TTS_MAX_QUEUE = int(os.getenv("GTM_TTS_MAX_QUEUE", "8"))
+TTS_MAX_JOBS_PER_WORKER = int(os.getenv("GTM_TTS_MAX_JOBS_PER_WORKER", "200"))
+TTS_MAX_CHARS = int(os.getenv("GTM_TTS_MAX_CHARS", "350"))
+TTS_TIMEOUT = float(os.getenv("GTM_TTS_TIMEOUT", "600"))  # seconds for one batch of scripts, overall
+
 
 SAFE_MODE = True
 
@@ -0,0 +1,187 @@
+"""Per-run crawl plan: agents declare the pages they need, each unique URL is fetched once.
+
+An agent calls plan.need(domain, paths) for every domain it is about to look at and
+then plan.fetch(), which downloads every URL not already in the plan's page store in
+parallel (per-host politeness still comes from webstuff.HOST_LIMITER). The agent then
+reads pages back with body()/html()/text(). Pages another agent already declared in
+this run are not requested again; summary() reports how many requests that saved.
+An agent that is done with a domain's pages calls release(domains) to free them.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, zip_longest
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import CRAWL_STORE_MAX_BYTES, ENRICH_CONCURRENCY, HTTP_MAX_BODY_BYTES, PAGE_TEXT_MAX_BYTES
+from metrics import METRICS
+from pagetext import page_text
+from webstuff import extract_domain, http_fetch
+
+
+class _Page:
+    __slots__ = ("body", "encoding", "cap", "view_cap", "html", "text", "size")
+
+    def __init__(self, body: Optional[bytes], encoding: str, cap: int):
+        self.body = body  # None: the fetch failed (not retried within the run)
+        self.encoding = encoding
+        self.cap = cap  # byte cap it was fetched under
+        # decoded / extracted on first read, for the first `view_cap` bytes
+        self.view_cap = 0
+        self.html: Optional[str] = None
+        self.text: Optional[str] = None
+        self.size = len(body or b"")  # body + decoded html + text, as counted in the store
+
+
+class CrawlPlan:
+    """NOTE:
+        Thread-safe. The store holds at most `max_store_bytes` of pages (body plus the
+        decoded html and extracted text kept for reads) and drops the least recently
+        used ones beyond that; a dropped page that is read again is
+        fetched again. So is a URL read without being declared first: declaring is an
+        optimization, never a requirement. Both count as `unplanned` fetches.
+    """
+    def __init__(self, concurrency: int = ENRICH_CONCURRENCY, max_store_bytes: int = CRAWL_STORE_MAX_BYTES):
+        self.concurrency = max(1, concurrency)
+        self.max_store_bytes = max_store_bytes
+        self._pages: "OrderedDict[str, _Page]" = OrderedDict()
+        self._store_bytes = 0
+        self._want: Dict[str, int] = {}  # declared, not fetched yet: url -> byte cap
+        self._lock = threading.Lock()
+        self.declared = 0  # need() entries, i.e. the requests the agents asked for
+        self.fetched = 0  # HTTP requests actually made
+        self.unplanned = 0  # of those, made by a read instead of fetch()
+
+    # --- declaring / fetching ------------------------------------------------
+    def need(self, domain: str, paths: Iterable[str], max_bytes: int = HTTP_MAX_BODY_BYTES) -> List[str]:
+        """Declare https://<domain><path> for each path; returns the URLs. Call fetch() next."""
+        urls = [f"https://{domain}{path}" for path in paths]
+        with self._lock:
+            for url in urls:
+                self.declared += 1
+                page = self._pages.get(url)
+                if page is not None and page.cap >= max_bytes or self._want.get(url, 0) >= max_bytes:
+                    METRICS.inc("gtm_crawl_pages_total", result="deduped")
+                else:
+                    self._want[url] = max(self._want.get(url, 0), max_bytes)
+        return urls
+
+    def fetch(self, concurrency: Optional[int] = None) -> int:
+        """Fetch every declared URL not in the store yet, in parallel; returns the number fetched."""
+        with self._lock:
+            want, self._want = self._want, {}
+        if not want:
+            return 0
+        # round-robin over hosts, so the pool isn't stuck behind one host's connection cap
+        by_host: Dict[str, List[str]] = {}
+        for url in want:
+            by_host.setdefault(extract_domain(url), []).append(url)
+        order = [u for u in chain.from_iterable(zip_longest(*by_host.values())) if u]
+        with ThreadPoolExecutor(max_workers=min(max(1, concurrency or self.concurrency), len(order))) as pool:
+            for url, res in zip(order, pool.map(lambda u: http_fetch(u, max_bytes=want[u]), order)):
+                self._put(url, res, want[url])
+        with self._lock:
+            self.fetched += len(order)
+        METRICS.inc("gtm_crawl_pages_total", len(order), result="fetched")
+        return len(order)
+
+    def _put(self, url: str, res: Optional[Tuple[bytes, str]], cap: int) -> _Page:
+        page = _Page(res[0], res[1], cap) if res else _Page(None, "utf-8", cap)
+        with self._lock:
+            old = self._pages.pop(url, None)
+            if old is not None:
+                self._store_bytes -= old.size
+            self._pages[url] = page
+            self._store_bytes += page.size
+            self._evict()
+        return page
+
+    def _evict(self):
+        """Drop least recently used pages until the store fits (lock held)."""
+        while self._store_bytes > self.max_store_bytes and len(self._pages) > 1:
+            _, dropped = self._pages.popitem(last=False)
+            self._store_bytes -= dropped.size
+
+    def _resize(self, url: str, page: _Page):
+        """Re-count `page` after its html/text changed (str length as a byte estimate)."""
+        size = len(page.body or b"") + len(page.html or "") + len(page.text or "")
+        with self._lock:
+            if self._pages.get(url) is page:
+                self._store_bytes += size - page.size
+                page.size = size
+                self._evict()
+            else:  # dropped meanwhile; nothing is counted for it
+                page.size = size
+
+    def release(self, domains: Iterable[str]) -> int:
+        """Free the stored pages of `domains` (an agent is done with them); returns pages freed."""
+        domains = {d.lower() for d in domains}
+        with self._lock:
+            urls = [u for u in self._pages if extract_domain(u) in domains]
+            for url in urls:
+                self._store_bytes -= self._pages.pop(url).size
+        return len(urls)
+
+    def _get(self, url: str, cap: int) -> _Page:
+        with self._lock:
+            page = self._pages.get(url)
+            if page is not None and page.cap >= cap:
+                self._pages.move_to_end(url)
+                return page
+            pending = url in self._want
+        # not declared (or dropped, or declared under a smaller cap): fetch it now
+        page = self._put(url, http_fetch(url, max_bytes=cap), cap)
+        with self._lock:
+            self.fetched += 1
+            self.unplanned += 0 if pending else 1
+            self._want.pop(url, None)
+        METRICS.inc("gtm_crawl_pages_total", result="fetched")
+        return page
+
+    # --- reading -------------------------------------------------------------
+    def body(self, url: str, max_bytes: int = HTTP_MAX_BODY_BYTES) -> Optional[bytes]:
+        body = self._get(url, max_bytes).body
+        return body[:max_bytes] if body is not None else None
+
+    def _view(self, url: str, max_bytes: int) -> Optional[_Page]:
+        page = self._get(url, max_bytes)
+        if page.body is None:
+            return None
+        if page.html is None or page.view_cap != max_bytes:
+            head = page.body[:max_bytes]
+            try:
+                html = head.decode(page.encoding, errors="replace")
+            except LookupError:
+                html = head.decode("utf-8", errors="replace")
+            page.html, page.text, page.view_cap = html, None, max_bytes
+            self._resize(url, page)
+        return page
+
+    def html(self, url: str, max_bytes: int = PAGE_TEXT_MAX_BYTES) -> Optional[str]:
+        """Decoded page (first `max_bytes`), undecodable bytes replaced."""
+        page = self._view(url, max_bytes)
+        return page.html if page else None
+
+    def text(self, url: str, max_bytes: int = PAGE_TEXT_MAX_BYTES) -> Optional[str]:
+        """pagetext.page_text of the page, extracted once per run."""
+        page = self._view(url, max_bytes)
+        if page is None:
+            return None
+        if page.text is None:
+            page.text = page_text(page.html)
+            self._resize(url, page)
+        return page.text
+
+    # --- reporting -----------------------------------------------------------
+    @property
+    def saved(self) -> int:
+        """Declared requests that were not made because another declaration covered them."""
+        return max(0, self.declared - (self.fetched - self.unplanned))
+
+    def summary(self) -> str:
+        return (f"[CRAWL] {self.declared} page requests declared, {self.fetched} fetched, "
+                f"{self.saved} saved by dedupe ({self.unplanned} unplanned, "
+                f"{len(self._pages)} pages / {self._store_bytes / 1e6:.1f} MB in store)")
+
+    def report(self) -> Dict[str, int]:
+        return dict(declared=self.declared, fetched=self.fetched, saved=self.saved, unplanned=self.unplanned)
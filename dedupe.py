@@ -0,0 +1,148 @@
+import hashlib
+import re
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from config import DEDUPE_BANDS, DEDUPE_NUM_PERM, DEDUPE_THRESHOLD, DEDUPE_TITLE_THRESHOLD
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str) -> Set[bytes]:
+    """Word bigrams (single words for one-word texts) of the lower-cased text."""
+    words = _TOKEN.findall(text.lower())
+    grams = [" ".join(words[i:i + 2]) for i in range(len(words) - 1)] or words
+    return {g.encode("utf-8") for g in grams}
+
+
+def title_similarity(a: str, b: str) -> float:
+    """Jaccard of the two titles' word sets; 1.0 when either has no words (nothing to compare)."""
+    wa, wb = set(_TOKEN.findall(a.lower())), set(_TOKEN.findall(b.lower()))
+    if not wa or not wb:
+        return 1.0
+    return len(wa & wb) / len(wa | wb)
+
+
+class MinHasher:
+    """MinHash signatures plus LSH banding.
+
+    `num_perm` 32-bit minima per text, split into `bands` bands; two texts share a
+    bucket when any band matches exactly, which happens with high probability once
+    their Jaccard similarity passes ~(1/bands)^(bands/num_perm).
+
+    The hash family is blake2b: each 64-byte digest (personalised per block) yields 16
+    independent 32-bit hashes, so a shingle costs num_perm/16 C-level hash calls and the
+    per-position minimum is taken with map(min, zip(...)).
+    """
+    def __init__(self, num_perm: int = DEDUPE_NUM_PERM, bands: int = DEDUPE_BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._persons = [f"gtm-mh{i}".encode() for i in range(-(-num_perm // 16))]
+        # auth/SSO chatter reuses the same bigrams constantly; memoize their hash rows
+        self._hashes = lru_cache(maxsize=1 << 15)(self._hash_row)
+
+    def _hash_row(self, shingle: bytes) -> array:
+        out = array("I")
+        for person in self._persons:
+            out.frombytes(hashlib.blake2b(shingle, digest_size=64, person=person).digest())
+        return out
+
+    def signature(self, text: str) -> Optional[array]:
+        sh = shingles(text)
+        if not sh:
+            return None
+        rows = [self._hashes(g) for g in sh]
+        return array("I", list(map(min, zip(*rows)))[:self.num_perm])
+
+    def buckets(self, sig: array) -> List[int]:
+        """One stable 63-bit bucket key per band (band number is part of the key)."""
+        out = []
+        for band in range(self.bands):
+            chunk = sig[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(band.to_bytes(2, "little") + chunk, digest_size=8).digest()
+            out.append(int.from_bytes(digest, "little") >> 1)
+        return out
+
+    @staticmethod
+    def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """Clusters near-duplicate signals (title + snippet) under a canonical signal.
+
+    Only canonical signals are indexed, so a new signal joins the cluster whose
+    canonical it resembles most (estimated Jaccard >= threshold) or starts its own.
+    The titles must also share title_threshold of their words: GitHub snippets are
+    mostly the issue template, so unrelated issues can look alike on text alone.
+    Clusters never chain through intermediate members. Signals store canonical_id
+    (their own id when canonical); downstream readers skip the non-canonical ones.
+    """
+    def __init__(self, storage, threshold: float = DEDUPE_THRESHOLD, hasher: Optional[MinHasher] = None,
+                 title_threshold: float = DEDUPE_TITLE_THRESHOLD):
+        self.storage = storage
+        self.threshold = threshold
+        self.title_threshold = title_threshold
+        self.hasher = hasher or MinHasher()
+
+    def _assign(self, signals: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        prepared = []
+        for s in signals:
+            sig = self.hasher.signature(f"{s.get('title') or ''} {s.get('snippet') or ''}")
+            prepared.append((s["id"], s.get("title") or "", sig, self.hasher.buckets(sig) if sig else []))
+        known = self.storage.fetch_lsh_candidates({b for _, _, _, bs in prepared for b in bs})
+        sigs: Dict[int, Sequence[int]] = {}
+        titles: Dict[int, str] = {}
+        for cid, (blob, title) in self.storage.fetch_minhashes({c for ids in known.values() for c in ids}).items():
+            sigs[cid], titles[cid] = array("I", blob), title
+        batch: Dict[int, List[int]] = {}   # bucket -> canonical ids added in this batch
+        assignments, lsh_rows, merged = [], [], 0
+        for sid, title, sig, buckets in prepared:
+            best, best_sim = None, self.threshold
+            for cand in {c for b in buckets for c in known.get(b, []) + batch.get(b, [])}:
+                other = sigs.get(cand)
+                sim = self.hasher.similarity(sig, other) if other and len(other) == len(sig) else 0.0
+                if sim >= best_sim and title_similarity(title, titles.get(cand, "")) < self.title_threshold:
+                    continue
+                if sim >= best_sim and (best is None or sim > best_sim or cand < best):
+                    best, best_sim = cand, sim
+            if best is not None:
+                assignments.append((best, None, sid))
+                merged += 1
+                continue
+            assignments.append((sid, sig.tobytes() if sig else None, sid))
+            if sig:
+                sigs[sid], titles[sid] = sig, title
+                for b in buckets:
+                    batch.setdefault(b, []).append(sid)
+                    lsh_rows.append((b, sid))
+        self.storage.assign_clusters(assignments, lsh_rows)
+        return len(assignments), merged
+
+    def cluster_new(self, batch_size: int = 1000) -> Dict[str, int]:
+        """Cluster every signal that has no canonical_id yet, oldest first."""
+        totals = {"signals": 0, "duplicates": 0}
+        while True:
+            batch = self.storage.fetch_unclustered_signals(limit=batch_size)
+            if not batch:
+                break
+            n, merged = self._assign(batch)
+            totals["signals"] += n
+            totals["duplicates"] += merged
+        if totals["signals"]:
+            print(f"[DEDUPE] {totals['signals']} new signals, {totals['duplicates']} folded into existing clusters")
+        return totals
+
+    def report(self) -> List[str]:
+        dist = self.storage.cluster_size_distribution()
+        clusters = sum(n for _, n in dist)
+        signals = sum(size * n for size, n in dist)
+        lines = [f"{'size':>6} {'clusters':>9} {'signals':>8}"]
+        lines += [f"{size:>6} {n:>9} {size * n:>8}" for size, n in dist]
+        lines.append(f"{clusters} clusters over {signals} signals "
+                     f"({signals - clusters} duplicates skipped downstream)")
+        return lines
@@ -0,0 +1,180 @@
+"""Incremental, rate-limit-aware GitHub issue search for SignalDetectionAgent.
+
+Every query keeps a cursor (the newest `updated_at` it has returned) in
+storage.source_cursors and only asks for `updated:>cursor`, oldest first, so each
+call returns issues we have not seen yet and a run that stops early (page depth or
+rate limit) resumes where it left off instead of re-downloading the same head.
+"""
+import datetime as dt
+import json
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import requests
+
+from config import GITHUB_BACKFILL_DAYS, GITHUB_RATE_MAX_WAIT, GITHUB_RATE_RESERVE, GITHUB_TOKEN
+from httpclient import get_client
+from metrics import METRICS
+from storage import Storage
+from webstuff import HostLimiter
+
+logger = logging.getLogger(__name__)
+
+Item = Tuple[str, str, str]
+
+
+class RateLimitBudget:
+    """Calls left in the current rate-limit window, learned from X-RateLimit-* headers.
+
+    Until the first response arrives the budget is unknown and calls go through.
+    """
+    def __init__(self, reserve: int = GITHUB_RATE_RESERVE, max_wait: float = GITHUB_RATE_MAX_WAIT):
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at = 0.0  # epoch seconds
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, status: int, headers: Mapping[str, str]):
+        """HttpClient.fetch on_response hook."""
+        remaining = headers.get("X-RateLimit-Remaining", "")
+        if not remaining.isdigit():
+            return
+        limit, reset = headers.get("X-RateLimit-Limit", ""), headers.get("X-RateLimit-Reset", "")
+        with self._lock:
+            self.remaining = int(remaining)
+            self.limit = int(limit) if limit.isdigit() else max(self.limit or 0, self.remaining)
+            if reset.isdigit():
+                self.reset_at = float(reset)
+
+    def _take(self, now: float) -> Optional[float]:
+        """Take one call; None on success, else the seconds until the window resets."""
+        with self._lock:
+            if self.remaining is not None and self.remaining <= self.reserve and now >= self.reset_at:
+                self.remaining = self.limit  # the window rolled over since the last response
+            if self.remaining is None:
+                return None
+            if self.remaining > self.reserve:
+                self.remaining -= 1
+                return None
+            return self.reset_at - now
+
+    def acquire(self) -> bool:
+        """Reserve one call, waiting for the reset if it is at most max_wait away."""
+        while True:
+            wait = self._take(time.time())
+            if wait is None:
+                return True
+            if wait > self.max_wait:
+                return False
+            wait += 1  # X-RateLimit-Reset has one-second resolution
+            time.sleep(wait)
+            self.waited += wait
+
+
+class GitHubIssuesCollector:
+    """NOTE:
+        One instance per detection run. Cursors are read when it is created and written
+        by save(), which the caller must only do after the yielded issues are stored,
+        so a crash never moves a cursor past unsaved signals.
+
+        Pages are scheduled breadth-first (page 1 of every query before any page 2),
+        least recently polled query first, so a small rate budget still rotates through
+        all queries; a short page ends a query early. `updated:>` has one-second
+        resolution, so issues sharing the cursor's exact timestamp can be missed.
+    """
+    SOURCE = "github"
+    SEARCH_URL = "https://api.github.com/search/issues"
+    MAX_PER_PAGE = 100
+    SEARCH_WINDOW = 1000  # the search API only serves the first 1000 results of a query
+
+    def __init__(self, storage: Storage, queries: Iterable[str], max_results: int = 100,
+                 budget: Optional[RateLimitBudget] = None, limiter: Optional[HostLimiter] = None,
+                 token: str = GITHUB_TOKEN, backfill_days: int = GITHUB_BACKFILL_DAYS):
+        self.storage = storage
+        self.queries = list(queries)
+        self.max_results = min(max(1, max_results), self.SEARCH_WINDOW)
+        self.per_page = min(self.max_results, self.MAX_PER_PAGE)
+        self.max_pages = -(-self.max_results // self.per_page)
+        self.budget = budget or RateLimitBudget()
+        self.limiter = limiter
+        self.headers = {"Accept": "application/vnd.github+json"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        self.cursors = storage.get_source_cursors(self.SOURCE)
+        since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=backfill_days)
+        self.backfill_since = since.strftime("%Y-%m-%dT%H:%M:%SZ")
+        # query -> this run's {query, cursor, calls, items}; saved by save()
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.skipped = 0  # calls not made because the rate budget ran out
+
+    def _url(self, query: str, since: str, page: int) -> str:
+        q = f"{query} updated:>{since}"
+        return (f"{self.SEARCH_URL}?q={requests.utils.quote(q)}&sort=updated&order=asc"
+                f"&per_page={self.per_page}&page={page}")
+
+    def _search(self, query: str, since: str, page: int) -> Optional[List[Dict[str, Any]]]:
+        """One page of issues, or None when the call failed (the cursor then stays put)."""
+        with self.limiter.slot(self.SOURCE) if self.limiter else nullcontext():
+            res = get_client().fetch(self._url(query, since, page), headers=self.headers, timeout=20,
+                                     on_response=self.budget.observe)
+        try:
+            items = json.loads(res[0]).get("items") if res else None
+        except ValueError:
+            items = None
+        METRICS.inc("gtm_github_search_total", result="error" if items is None else "ok")
+        return items
+
+    def collect(self) -> Iterator[Item]:
+        order = sorted(self.queries, key=lambda q: (self.cursors.get(q) or {}).get("polled_at") or "")
+        since = {q: (self.cursors.get(q) or {}).get("cursor") or self.backfill_since for q in order}
+        active = order
+        for page in range(1, self.max_pages + 1):
+            full = []
+            for i, q in enumerate(active):
+                if not self.budget.acquire():
+                    self.skipped = len(active) - i
+                    METRICS.inc("gtm_github_search_total", self.skipped, result="throttled")
+                    logger.info(f"GitHub rate limit reached; {self.skipped} searches deferred to the next run")
+                    return
+                st = self.stats.setdefault(q, dict(query=q, cursor=None, calls=0, items=0))
+                st["calls"] += 1
+                items = self._search(q, since[q], page)
+                if items is None:
+                    continue
+                for it in items[:self.max_results - (page - 1) * self.per_page]:
+                    updated = it.get("updated_at")
+                    if updated and (st["cursor"] is None or updated > st["cursor"]):
+                        st["cursor"] = updated
+                    st["items"] += 1
+                    yield it.get("html_url", ""), it.get("title", ""), (it.get("body") or "")[:300]
+                if len(items) >= self.per_page:
+                    full.append(q)
+            active = full
+            if not active:
+                break
+
+    def save(self) -> int:
+        """Persist this run's cursors and call/item counts; returns the number of queries polled."""
+        return self.storage.save_source_cursors(self.SOURCE, self.stats.values())
+
+    def summary(self) -> str:
+        calls = sum(s["calls"] for s in self.stats.values())
+        items = sum(s["items"] for s in self.stats.values())
+        return (f"github: {calls} searches, {items} issues ({items / calls if calls else 0:.1f}/call), "
+                f"{self.skipped} deferred by rate limit")
+
+    @staticmethod
+    def report(storage: Storage) -> List[str]:
+        """Per-query cursor and lifetime yield (issues per API call)."""
+        lines = []
+        for q, c in sorted(storage.get_source_cursors(GitHubIssuesCollector.SOURCE).items()):
+            per_call = c["items"] / c["calls"] if c["calls"] else 0
+            lines.append(f"{q:<28} cursor={c['cursor'] or '-':<21} calls={c['calls']:<5} "
+                         f"issues={c['items']:<6} per_call={per_call:.1f}")
+        return lines
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX, HTTP_CACHE_DIR, HTTP_MAX_BODY_BYTES,
+                    HTTP_MAX_RETRIES, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE)
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class DiskCache:
+    """Validator cache: body + ETag/Last-Modified per URL, for conditional GETs."""
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def load(self, url: str) -> Optional[Dict[str, str]]:
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url else None
+
+    def body(self, url: str) -> Optional[bytes]:
+        _, body_path = self._paths(url)
+        try:
+            with open(body_path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store(self, url: str, body: bytes, etag: str, last_modified: str, encoding: str, truncated_at: int = 0):
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        for path, data in ((body_path, body),
+                           (meta_path, json.dumps({"url": url, "etag": etag, "last_modified": last_modified,
+                                                   "encoding": encoding, "truncated_at": truncated_at}
+                                                  ).encode("utf-8"))):
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+
+class HttpClient:
+    """Shared GET client: pooled keep-alive session, jittered retries, body cap, conditional cache."""
+    def __init__(self, pool_connections: int = HTTP_POOL_CONNECTIONS, pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                 max_retries: int = HTTP_MAX_RETRIES, backoff_base: float = HTTP_BACKOFF_BASE,
+                 backoff_max: float = HTTP_BACKOFF_MAX, max_body_bytes: int = HTTP_MAX_BODY_BYTES,
+                 cache_dir: Optional[str] = HTTP_CACHE_DIR):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = "descope-gtm-demo/0.1"
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_body_bytes = max_body_bytes
+        self.cache = DiskCache(cache_dir) if cache_dir else None
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        # full jitter: uniform over [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _read_capped(self, r: requests.Response, limit: int) -> bytes:
+        buf = bytearray()
+        for chunk in r.iter_content(chunk_size=min(64 * 1024, limit)):
+            buf += chunk
+            if len(buf) >= limit:
+                logger.debug(f"Truncated {r.url} at {limit} bytes")
+                del buf[limit:]
+                break
+        return bytes(buf)
+
+    @staticmethod
+    def _record(host: str, status: str, t0: float):
+        METRICS.observe("gtm_http_request_seconds", time.perf_counter() - t0, host=host)
+        METRICS.inc("gtm_http_responses_total", host=host, status=status)
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: int = 15,
+              on_response: Optional[Callable[[int, Mapping[str, str]], None]] = None,
+              max_bytes: Optional[int] = None) -> Optional[Tuple[bytes, str]]:
+        """GET `url`; returns (body, encoding) for a 200 (or a 304 served from cache), else None.
+
+        Every attempt is recorded in the per-host latency histogram and status counter.
+        `on_response(status, headers)` sees every response, e.g. to track API rate limits.
+        The download stops after `max_bytes` (default: the client's max_body_bytes).
+        """
+        host = urlsplit(url).hostname or ""
+        limit = max_bytes or self.max_body_bytes
+        req_headers = dict(headers or {})
+        cached = self.cache.load(url) if self.cache else None
+        if cached and 0 < (cached.get("truncated_at") or 0) < limit:
+            cached = None  # cached under a smaller cap; this caller wants more of the page
+        if cached:
+            if cached.get("etag"):
+                req_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                req_headers["If-Modified-Since"] = cached["last_modified"]
+
+        for attempt in range(self.max_retries + 1):
+            t0 = time.perf_counter()
+            try:
+                with self.session.get(url, headers=req_headers, timeout=timeout, stream=True) as r:
+                    if on_response:
+                        on_response(r.status_code, r.headers)
+                    if r.status_code != 200:
+                        self._record(host, str(r.status_code), t0)
+                    if r.status_code == 304 and cached:
+                        body = self.cache.body(url)
+                        if body is not None:
+                            return body[:limit], cached.get("encoding") or "utf-8"
+                        req_headers.pop("If-None-Match", None)
+                        req_headers.pop("If-Modified-Since", None)
+                        cached = None
+                        continue
+                    if r.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                        delay = self._backoff(attempt, r.headers.get("Retry-After"))
+                        logger.debug(f"GET {url} -> {r.status_code}, retrying in {delay:.2f}s")
+                        time.sleep(delay)
+                        continue
+                    if r.status_code != 200:
+                        return None
+                    body = self._read_capped(r, limit)
+                    self._record(host, "200", t0)
+                    encoding = r.encoding or "utf-8"
+                    etag, last_modified = r.headers.get("ETag", ""), r.headers.get("Last-Modified", "")
+                    if self.cache and (etag or last_modified):
+                        self.cache.store(url, body, etag, last_modified, encoding,
+                                         truncated_at=limit if len(body) >= limit else 0)
+                    return body, encoding
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(host, "error", t0)
+                if attempt >= self.max_retries:
+                    logger.debug(f"GET {url} failed: {e}")
+                    return None
+                time.sleep(self._backoff(attempt))
+            except requests.RequestException as e:
+                self._record(host, "error", t0)
+                logger.debug(f"GET {url} failed: {e}")
+                return None
+        return None
+
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
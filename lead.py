@@ -0,0 +1,169 @@
+import json
+from functools import lru_cache
+from operator import itemgetter
+from typing import AbstractSet, Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
+
+from config import TECH_HINTS
+
+# one bit per TECH_HINTS vendor, in config order
+TECH_NAMES = tuple(TECH_HINTS)
+TECH_BITS = {name: 1 << i for i, name in enumerate(TECH_NAMES)}
+
+
+def tech_bit(name: str) -> int:
+    return TECH_BITS.get(name, 0)
+
+
+def tech_mask(hints: Union[None, str, Mapping[str, Any], Iterable[str]]) -> int:
+    """Bitmask of the vendors present in `hints` (JSON text, {name: count}, or names)."""
+    if not hints:
+        return 0
+    if isinstance(hints, str):
+        return _mask_from_json(hints)
+    return sum(TECH_BITS.get(n, 0) for n in set(hints) if not isinstance(hints, Mapping) or hints[n])
+
+
+@lru_cache(maxsize=4096)
+def _mask_from_json(raw: str) -> int:
+    try:
+        return tech_mask(json.loads(raw))
+    except ValueError:
+        return 0
+
+
+def tech_names(mask: int) -> List[str]:
+    return [name for name in TECH_NAMES if mask & TECH_BITS[name]]
+
+
+@lru_cache(maxsize=4096)
+def parse_roles(raw: Optional[str]) -> FrozenSet[str]:
+    """"security, backend" -> frozenset; identical strings share one frozenset."""
+    return frozenset(r.strip().lower() for r in (raw or "").split(",") if r.strip())
+
+
+# legacy dict keys (the joined columns) exposed by the mapping view
+LEAD_KEYS = ("id", "source", "url", "title", "snippet", "detected_company", "detected_domain", "created_at",
+             "tech_hints", "company_size_hint", "hiring_roles", "score", "reasons")
+
+
+class Lead:
+    """One joined signal/enrichment/score row, decoded once at fetch time.
+
+    `tech` is a TECH_HINTS bitmask and `roles` a frozenset, so consumers test bits and
+    set membership instead of re-parsing JSON and comma strings. For callers written
+    against the old dict rows it is also a read-only mapping over LEAD_KEYS, where
+    tech_hints/hiring_roles come back as name lists (JSON-friendly, e.g. `{**lead}`).
+    """
+    __slots__ = ("id", "source", "url", "title", "snippet", "detected_company", "detected_domain",
+                 "created_at", "tech", "company_size_hint", "roles", "score", "reasons")
+
+    def __init__(self, id: Optional[int] = None, source: Optional[str] = None, url: Optional[str] = None,
+                 title: Optional[str] = None, snippet: Optional[str] = None,
+                 detected_company: Optional[str] = None, detected_domain: Optional[str] = None,
+                 created_at: Optional[str] = None, tech: int = 0, company_size_hint: Optional[str] = None,
+                 roles: AbstractSet[str] = frozenset(), score: Optional[int] = None,
+                 reasons: Optional[str] = None):
+        self.id = id
+        self.source = source
+        self.url = url
+        self.title = title
+        self.snippet = snippet
+        self.detected_company = detected_company
+        self.detected_domain = detected_domain
+        self.created_at = created_at
+        self.tech = tech
+        self.company_size_hint = company_size_hint
+        self.roles = frozenset(roles)
+        self.score = score
+        self.reasons = reasons  # JSON text as stored; only exported
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> "Lead":
+        """Build from a sqlite3.Row or dict with any subset of the joined columns."""
+        return cls.from_rows([row])[0]
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Mapping[str, Any]]) -> List["Lead"]:
+        """Decode a page of rows that share one column list (one SELECT).
+
+        The column positions are looked up once per page and the slots are filled
+        directly, which is cheaper than building the dict rows this replaces.
+        """
+        if not rows:
+            return []
+        first = rows[0]
+        # sqlite3.Row reads fastest by position, dicts by key
+        names = list(first.keys())
+        pos = dict(zip(names, names if isinstance(first, Mapping) else range(len(names))))
+        if all(k in pos for k in LEAD_KEYS):
+            values = map(itemgetter(*[pos[k] for k in LEAD_KEYS]), rows)
+        else:  # a narrowed SELECT: absent columns read as None
+            picks = [pos.get(k) for k in LEAD_KEYS]
+            values = ([None if i is None else row[i] for i in picks] for row in rows)
+        new = object.__new__
+        out = []
+        for (id_, source, url, title, snippet, company, domain, created_at,
+             tech, size, roles, score, reasons) in values:
+            ld = new(cls)
+            ld.id = id_
+            ld.source = source
+            ld.url = url
+            ld.title = title
+            ld.snippet = snippet
+            ld.detected_company = company
+            ld.detected_domain = domain
+            ld.created_at = created_at
+            ld.tech = tech_mask(tech)
+            ld.company_size_hint = size
+            ld.roles = parse_roles(roles)
+            ld.score = score
+            ld.reasons = reasons
+            out.append(ld)
+        return out
+
+    @property
+    def tech_names(self) -> List[str]:
+        return tech_names(self.tech)
+
+    def has_tech(self, name: str) -> bool:
+        return bool(self.tech & TECH_BITS.get(name, 0))
+
+    # read-only mapping view over LEAD_KEYS
+    def __getitem__(self, key: str) -> Any:
+        if key == "tech_hints":
+            return self.tech_names
+        if key == "hiring_roles":
+            return sorted(self.roles)
+        if key in LEAD_KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Like dict.get, except a None column also yields `default`."""
+        if key not in LEAD_KEYS:
+            return default
+        value = self[key]
+        return default if value is None else value
+
+    def keys(self) -> Iterator[str]:
+        return iter(LEAD_KEYS)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(LEAD_KEYS)
+
+    def __contains__(self, key: object) -> bool:
+        return key in LEAD_KEYS
+
+    def __len__(self) -> int:
+        return len(LEAD_KEYS)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {k: self[k] for k in LEAD_KEYS}
+
+    def __repr__(self) -> str:
+        return f"Lead(id={self.id!r}, url={self.url!r}, score={self.score!r})"
+
+
+def as_lead(row: Union[Lead, Mapping[str, Any]]) -> Lead:
+    """Accept a Lead or a legacy dict row."""
+    return row if isinstance(row, Lead) else Lead.from_row(row)
@@ -0,0 +1,161 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (LLM_CACHE_MAX_AGE, LLM_CACHE_MAX_BYTES, OLLAMA_KEEP_ALIVE, OLLAMA_MAX_CONCURRENCY,
+                    OLLAMA_TIMEOUT, OLLAMA_URL)
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """Shared client for Ollama's /api/generate.
+
+    One pooled keep-alive session, `keep_alive` so the model stays loaded between
+    prompts, and a semaphore bounding concurrent generations. Remembers which
+    fallback model last worked and which ones the server doesn't have.
+    """
+    def __init__(self, base_url: str = OLLAMA_URL, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 max_concurrency: int = OLLAMA_MAX_CONCURRENCY, timeout: float = OLLAMA_TIMEOUT):
+        self.url = base_url.rstrip("/") + "/api/generate"
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, max_concurrency))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._lock = threading.Lock()
+        self._working_model: Optional[str] = None
+        self._missing_models = set()
+
+    def generate(self, prompt: str, model: Optional[str], options: Optional[Dict] = None) -> Optional[str]:
+        """Return the completion text, or None if the model is unset/unavailable or the call fails."""
+        if not model or model in self._missing_models:
+            return None
+        payload = {"model": model, "prompt": prompt, "stream": False, "keep_alive": self.keep_alive}
+        if options:
+            payload["options"] = options
+        try:
+            with self._slots:
+                t0 = time.perf_counter()
+                try:
+                    resp = self.session.post(self.url, json=payload, timeout=self.timeout)
+                finally:
+                    elapsed = time.perf_counter() - t0
+        except requests.RequestException as e:
+            METRICS.observe("gtm_llm_request_seconds", elapsed, model=model, outcome="error")
+            logger.warning(f"Ollama request failed ({model}): {e}")
+            return None
+        METRICS.observe("gtm_llm_request_seconds", elapsed, model=model, outcome=str(resp.status_code))
+        if resp.status_code == 404:
+            with self._lock:
+                self._missing_models.add(model)
+            logger.warning(f"Ollama model not available: {model}")
+            return None
+        if resp.status_code != 200:
+            logger.warning(f"Ollama returned {resp.status_code} for {model}: {resp.text[:200]}")
+            return None
+        try:
+            return (resp.json().get("response") or "").strip()
+        except ValueError:
+            return None
+
+    def generate_first(self, prompt: str, models: Sequence[str],
+                       accept: Callable[[str], bool] = bool) -> Optional[Tuple[str, str]]:
+        """Try `models` in order (last known-good first); return (model, text) for the first accepted output."""
+        order = list(models)
+        if self._working_model in order:
+            order.remove(self._working_model)
+            order.insert(0, self._working_model)
+        for model in order:
+            text = self.generate(prompt, model)
+            if text and accept(text):
+                with self._lock:
+                    self._working_model = model
+                return model, text
+        return None
+
+
+class CachedLLM:
+    """LLMClient front with a content-addressed response cache in the llm_cache table.
+
+    Entries are keyed by sha256(model, template version, rendered prompt); bump the
+    caller's template version whenever the prompt wording changes.
+    """
+    def __init__(self, storage, client: Optional[LLMClient] = None,
+                 max_age: int = LLM_CACHE_MAX_AGE, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.storage = storage
+        self.client = client or get_llm()
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        storage.evict_llm_cache(max_age=max_age, max_bytes=max_bytes)
+
+    @staticmethod
+    def cache_key(model: str, template_version: str, prompt: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, template_version, prompt):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+        METRICS.inc("gtm_llm_cache_total", result=stat)
+
+    def _lookup(self, prompt: str, model: str, template_version: str) -> Optional[str]:
+        return self.storage.get_llm_response(self.cache_key(model, template_version, prompt))
+
+    def generate(self, prompt: str, model: Optional[str], template_version: str,
+                 options: Optional[Dict] = None) -> Optional[str]:
+        if not model:
+            return None
+        cached = self._lookup(prompt, model, template_version)
+        if cached is not None:
+            self._count("hits")
+            return cached
+        self._count("misses")
+        text = self.client.generate(prompt, model, options=options)
+        if text:
+            self.storage.put_llm_response(self.cache_key(model, template_version, prompt), model,
+                                          template_version, text)
+        return text
+
+    def generate_first(self, prompt: str, models: Sequence[str], template_version: str,
+                       accept: Callable[[str], bool] = bool) -> Optional[Tuple[str, str]]:
+        for model in models:
+            cached = self._lookup(prompt, model, template_version)
+            if cached is not None and accept(cached):
+                self._count("hits")
+                return model, cached
+        self._count("misses")
+        generated = self.client.generate_first(prompt, models, accept=accept)
+        if generated:
+            model, text = generated
+            self.storage.put_llm_response(self.cache_key(model, template_version, prompt), model,
+                                          template_version, text)
+        return generated
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm() -> LLMClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
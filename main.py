@@ -1,8 +1,11 @@
 
 from __future__ import annotations
 import argparse
-import json
+import cProfile
+import io
 import os
+import pstats
+import threading
 from pathlib import Path
 
 from agents import (
@@ -17,84 +20,183 @@ from agents import (
     ScoringAgent,
     SignalDetectionAgent,
     VisualPersonalizationAgent,
-    CreativeOutreachAgent
 )
-from config import DB_PATH
+from config import DB_PATH, METRICS_DIR, PROFILE_TOP
+from crawlplan import CrawlPlan
+from metrics import METRICS
+from pipeline import Pipeline
 from storage import Storage
 
 
-def bootstrap_demo_data(storage: Storage):
-    sd = SignalDetectionAgent(storage)
-    sd.run()
-    en = EnrichmentAgent(storage)
-    en.run()
-    sc = ScoringAgent(storage)
-    sc.run()
+def bootstrap_demo_data(storage: Storage, full_rescore: bool = False, backlog: bool = False,
+                        plan: CrawlPlan | None = None):
+    with METRICS.timer("gtm_stage_seconds", stage="signal_detection"):
+        SignalDetectionAgent(storage).run()
+    with METRICS.timer("gtm_stage_seconds", stage="enrichment"):
+        EnrichmentAgent(storage, plan=plan).run(backlog=backlog)
+    with METRICS.timer("gtm_stage_seconds", stage="scoring"):
+        ScoringAgent(storage).run(full=full_rescore)
 
 
-def run_demo(storage: Storage, use_llm: bool = False):
+def run_demo(storage: Storage, use_llm: bool = False, top_n: int = 5, plan: CrawlPlan | None = None):
+    # media stack (LLM/D-ID/TTS clients) only loads for the demo, not for --bootstrap
+    from agents import CreativeOutreachAgent
+
     msg = MessagingAgent(storage)
-    msg.run(min_score=10, use_llm=use_llm)
     dv = DeliveryAgent(storage)
-    dv.run(min_score=20, top_n=3)
-
-    # additional layers
-    leads = storage.fetch_joined(min_score=10)
     ip = IntentPredictionAgent()
     csw = CompetitiveSwitcherDetector()
     mt = MultiThreadingAgent()
-    hyp = HyperPersonalizationAgent()
+    hyp = HyperPersonalizationAgent(plan)
     vis = VisualPersonalizationAgent()
-    crm = CRMSyncAgent()
-
-
-    enriched_export = []
-    for ld in leads[:5]:
-        bonus, why = ip.predict(ld)
-        diss = csw.detect((ld.get("title") or "") + "\n" + (ld.get("snippet") or ""))
-        personas = mt.suggest_personas(ld.get("company_size_hint") or "unknown", ld.get("hiring_roles") or "")
-        hook = hyp.recent_hook(ld.get("detected_domain") or "")
-        onepager = vis.make_onepager(ld.get("detected_domain") or "company", ld.get("title") or "auth friction", list(json.loads(ld.get("tech_hints") or "{}").keys()))
-
-        agent = CreativeOutreachAgent(storage, "./Descope")
-        results = agent.run_for_top_leads(top_n=5)
-
-        enriched_export.append({
-            "url": ld.get("url"),
-            "domain": ld.get("detected_domain"),
-            "base_score": ld.get("score"),
-            "intent_bonus": bonus,
-            "switcher_risk": diss,
-            "personas": personas,
-            "hook": hook,
-            "onepager_path": onepager,
-            "creative_outreach": results,
-        })
-
-    path = crm.export_json(enriched_export)
-    print(f"CRM export written to: {path}")
+    crm = CRMSyncAgent(storage)
+    creative = CreativeOutreachAgent(storage, "./Descope")
+
+    # every stage runs once for the whole lead set; independent ones run side by side
+    p = Pipeline()
+    p.add("drafts", lambda: msg.run(min_score=10, use_llm=use_llm))
+    p.add("alerts", lambda: dv.run(min_score=20, top_n=3))
+    p.add("leads", lambda: list(storage.iter_leads(min_score=10, limit=top_n)))
+    p.add("intent", lambda leads: [ip.predict(ld) for ld in leads], ["leads"])
+    p.add("switcher", lambda leads: [
+        csw.detect((ld.title or "") + "\n" + (ld.snippet or "")) for ld in leads], ["leads"])
+    p.add("personas", lambda leads: [
+        mt.suggest_personas(ld.company_size_hint or "unknown", ld.roles) for ld in leads], ["leads"])
+    p.add("hooks", lambda leads: hyp.recent_hooks(ld.detected_domain or "" for ld in leads), ["leads"])
+    p.add("onepagers", lambda leads: [
+        vis.make_onepager(ld.detected_domain or "company", ld.title or "auth friction", ld.tech_names)
+        for ld in leads], ["leads"])
+    p.add("creative", lambda leads: creative.run_for_leads(leads), ["leads"])
+
+    def export(leads, intent, switcher, personas, hooks, onepagers, creative):
+        def records():
+            for i, ld in enumerate(leads):
+                # creative results repeat the lead's own columns; export only the new assets
+                assets = creative[i] if i < len(creative) else None
+                yield {
+                    "url": ld.url,
+                    "domain": ld.detected_domain,
+                    "base_score": ld.score,
+                    "intent_bonus": intent[i][0],
+                    "switcher_risk": switcher[i],
+                    "personas": personas[i],
+                    "hook": hooks[i],
+                    "onepager_path": onepagers[i],
+                    "creative_outreach": {k: v for k, v in assets.items() if k not in ld} if assets else None,
+                }
+        path = "crm_export.ndjson"
+        crm.export_ndjson(records(), path)
+        return path
+
+    p.add("export", export, ["leads", "intent", "switcher", "personas", "hooks", "onepagers", "creative"])
+    p.run()
+    print("\n".join(["[RUN] Stage timings:"] + p.report()))
+    print(f"CRM export written to: {p.results['export']}")
 
 def main():
     parser = argparse.ArgumentParser(description="Descope AI GTM – free 14-agent prototype")
     parser.add_argument("--bootstrap", action="store_true", help="Collect signals, enrich, score")
     parser.add_argument("--run-demo", action="store_true", help="Generate messages & deliver Slack alerts")
     parser.add_argument("--use-ollama", action="store_true", help="Use local LLM via Ollama for refining copy")
+    parser.add_argument("--full-rescore", action="store_true", help="Rescore every lead, not just new/changed ones")
+    parser.add_argument("--backlog", action="store_true", help="Enrich every un-enriched signal, not just new ones")
+    parser.add_argument("--crm-sync", action="store_true", help="Export leads changed since the last CRM sync (NDJSON)")
+    parser.add_argument("--crm-full", action="store_true", help="With --crm-sync: export every lead")
+    parser.add_argument("--cluster-report", action="store_true", help="Print the near-duplicate cluster-size distribution")
+    parser.add_argument("--github-report", action="store_true", help="Print per-query GitHub cursors and issues per API call")
+    parser.add_argument("--search", metavar="QUERY", help="Full-text search over signal titles/snippets (FTS5 syntax)")
+    parser.add_argument("--profile", action="store_true", help="Run under cProfile and write the top hot spots")
     args = parser.parse_args()
 
+    if not (args.bootstrap or args.run_demo or args.crm_sync or args.cluster_report or args.github_report
+            or args.search):
+        parser.print_help()
+        return
+
+    profiles = start_profiling() if args.profile else None
+    try:
+        run(args)
+    finally:
+        if profiles:
+            threading.setprofile(None)
+            profiles[0].disable()
+        write_run_metrics(args, profiles)
+
+
+def start_profiling() -> list:
+    """cProfile the main thread and every thread started afterwards (pools, pollers)."""
+    profiles = [cProfile.Profile()]
+
+    def on_thread_start(frame, event, arg):
+        prof = cProfile.Profile()
+        profiles.append(prof)
+        prof.enable()  # replaces this hook for the new thread
+
+    threading.setprofile(on_thread_start)
+    profiles[0].enable()
+    return profiles
+
+
+def write_run_metrics(args, profiles=None):
+    """Dump metrics.prom / run_report.json (and the merged cProfile hot spots) into METRICS_DIR."""
+    if not METRICS_DIR:
+        return
+    modes = [m for m in ("bootstrap", "run_demo", "crm_sync", "cluster_report") if getattr(args, m)]
+    prom, report = METRICS.write(METRICS_DIR, extra={"modes": modes})
+    print(f"[METRICS] {prom}, {report}")
+    if profiles:
+        buf = io.StringIO()
+        stats = pstats.Stats(profiles[0], stream=buf)
+        for prof in profiles[1:]:
+            try:
+                stats.add(prof)
+            except TypeError:  # thread never made a call
+                pass
+        stats.dump_stats(os.path.join(METRICS_DIR, "profile.pstats"))
+        stats.strip_dirs()
+        for key in ("tottime", "cumulative"):
+            buf.write(f"=== top {PROFILE_TOP} by {key} ({len(profiles)} threads) ===\n")
+            stats.sort_stats(key).print_stats(PROFILE_TOP)
+        path = os.path.join(METRICS_DIR, "profile.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+        print(f"[PROFILE] hot spots: {path} (full stats: profile.pstats)")
+
+
+def run(args):
     storage = Storage(DB_PATH)
+    plan = CrawlPlan()  # pages fetched once per run, shared by enrichment and hooks
 
     if args.bootstrap:
         print("[BOOTSTRAP] Collecting signals → enriching → scoring...")
-        bootstrap_demo_data(storage)
+        bootstrap_demo_data(storage, full_rescore=args.full_rescore, backlog=args.backlog, plan=plan)
         print("[BOOTSTRAP] Done.")
 
     if args.run_demo:
         print("[RUN] Messaging, delivery, and advanced layers...")
-        run_demo(storage, use_llm=args.use_ollama)
+        run_demo(storage, use_llm=args.use_ollama, plan=plan)
         print("[RUN] Done.")
 
-    if not (args.bootstrap or args.run_demo):
-        parser.print_help()
+    if plan.declared:
+        print(plan.summary())
+
+    if args.crm_sync:
+        with METRICS.timer("gtm_stage_seconds", stage="crm_sync"):
+            CRMSyncAgent(storage).sync(full=args.crm_full)
+
+    if args.cluster_report:
+        from dedupe import NearDuplicateIndex
+        index = NearDuplicateIndex(storage)
+        index.cluster_new()
+        print("\n".join(["[DEDUPE] Cluster sizes:"] + index.report()))
+
+    if args.github_report:
+        from github_issues import GitHubIssuesCollector
+        print("\n".join(["[GITHUB] Query cursors:"] + GitHubIssuesCollector.report(storage)))
+
+    if args.search:
+        for r in storage.search(args.search, limit=20):
+            print(f"{r['score'] if r['score'] is not None else '-':>4}  {r['source']:<7} {r['title'][:80]}  {r['url']}")
 
 if __name__ == "__main__":
     main()
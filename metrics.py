@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# seconds; covers a ~1ms SQLite statement up to a multi-minute video render
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels: Labels, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")  # noqa: E731
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation (max for the +Inf bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+
+class Metrics:
+    """Process-wide counters and latency histograms, keyed by metric name + labels.
+
+    Export with `to_prometheus()` (text exposition format) or `report()` (JSON-friendly
+    dict with count/sum/p50/p99 per series). Thread-safe; recording is a dict lookup and
+    a bisect under one lock.
+    """
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(self.buckets)
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    def to_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+            for name in sorted(self._histograms):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, h in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, c in zip(list(h.buckets) + ["+Inf"], h.counts):
+                        cumulative += c
+                        le = bound if isinstance(bound, str) else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {h.sum:.6f}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {name: [dict(labels=dict(k), value=v) for k, v in sorted(series.items())]
+                        for name, series in sorted(self._counters.items())}
+            histograms = {name: [dict(labels=dict(k), count=h.count, sum=round(h.sum, 6),
+                                      p50=h.quantile(0.5), p99=h.quantile(0.99), max=round(h.max, 6))
+                                 for k, h in sorted(series.items())]
+                          for name, series in sorted(self._histograms.items())}
+        return dict(started_at=self.started_at, duration=round(time.time() - self.started_at, 3),
+                    counters=counters, histograms=histograms)
+
+    def write(self, directory: str, extra: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        """Write `metrics.prom` and `run_report.json` into `directory` (atomic replace)."""
+        os.makedirs(directory, exist_ok=True)
+        report = self.report()
+        report.update(extra or {})
+        paths = (os.path.join(directory, "metrics.prom"), os.path.join(directory, "run_report.json"))
+        for path, text in zip(paths, (self.to_prometheus(), json.dumps(report, indent=2, default=str))):
+            tmp = f"{path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        return paths
+
+
+METRICS = Metrics()
+METRICS.describe("gtm_stage_seconds", "Wall time of one agent/pipeline stage run.")
+METRICS.describe("gtm_http_request_seconds", "Latency of one HTTP GET attempt, per host.")
+METRICS.describe("gtm_http_responses_total", "HTTP GET attempts by host and status (or 'error').")
+METRICS.describe("gtm_crawl_pages_total", "Crawl plan page requests by result (fetched, deduped = served by an earlier request).")
+METRICS.describe("gtm_github_search_total", "GitHub issue searches by result (ok, error, throttled = deferred by rate limit).")
+METRICS.describe("gtm_sqlite_statement_seconds", "SQLite execute/executemany time by statement kind and table.")
+METRICS.describe("gtm_llm_request_seconds", "Ollama /api/generate call time by model and outcome.")
+METRICS.describe("gtm_llm_cache_total", "LLM response cache lookups by result.")
+METRICS.describe("gtm_did_seconds", "D-ID call time by phase (submit, render, download).")
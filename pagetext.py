@@ -0,0 +1,164 @@
+"""Bounded, DOM-free text extraction for crawled pages.
+
+PageText tokenizes HTML incrementally (one regex for tags/comments, a scan for the
+end of script/style blocks) instead of building a BeautifulSoup tree, so the cost is
+one pass over the bytes we read (the crawl plan downloads at most PAGE_TEXT_MAX_BYTES
+of a text page). page_text() yields the same words, in order, as
+`BeautifulSoup(html).get_text(" ")`, but whitespace-only strings are dropped rather than
+joined, so the spacing between words can differ. first_heading() finds the same element
+as `soup.find(["h1", "h2", "h3"])`; its text is space-joined and collapsed, where
+get_text(strip=True) glues inline children ("Acme <b>launches</b>" -> "Acmelaunches").
+"""
+import re
+from html import unescape
+from typing import List, Optional, Sequence
+
+HEADINGS = ("h1", "h2", "h3")
+# contents are raw text, never markup; skipped like bs4's get_text does
+RAW_TEXT = {"script", "style"}
+# parsed as markup, but not page text for bs4's get_text either
+HIDDEN = {"template"}
+
+_TAG_RE = re.compile(
+    r"""<(?:!--.*?(--\s*>|\Z)"""                               # comment; group 1 is "" while still open
+    r"""|[!?](?!--)[^>]*>"""                                 # doctype, CDATA, processing instruction
+    r"""|(/?)([A-Za-z][^\s/>]*)((?:[^>"']|"[^"]*"|'[^']*')*)>)""",  # start/end tag (quoted '>' allowed)
+    re.S)
+_TAG_START_RE = re.compile(r"<[A-Za-z/!?]")
+_WS_RE = re.compile(r"\s+")
+
+
+class PageText:
+    """Incremental HTML -> (text, first heading). feed() chunks, then close().
+
+    Text runs are joined with a single space, like get_text(" "). The heading is the
+    first h1-h3 in document order with its whitespace collapsed ("" if that element is
+    empty, as with soup.find). With stop_at_heading, feed() returns False once it is
+    known and the rest of the page is never tokenized.
+    """
+    def __init__(self, headings: Sequence[str] = HEADINGS, stop_at_heading: bool = False):
+        self.headings = {h.lower() for h in headings}
+        self.stop_at_heading = stop_at_heading
+        self.heading: Optional[str] = None
+        self.done = False
+        self._parts: List[str] = []
+        self._buf = ""
+        self._raw_end: Optional["re.Pattern"] = None  # end-tag pattern while inside script/style
+        self._hidden = 0
+        self._capture: Optional[str] = None  # heading tag being read
+        self._heading_parts: List[str] = []
+        self._watch = RAW_TEXT | HIDDEN | self.headings
+
+    @property
+    def text(self) -> str:
+        return " ".join(self._parts)
+
+    def _emit(self, text: str):
+        if "&" in text:
+            text = unescape(text)
+        if self._hidden or text.isspace():
+            return
+        self._parts.append(text)
+        if self._capture:
+            self._heading_parts.append(text)
+
+    def _tag(self, closing: bool, name: str, attrs: str):
+        if closing:
+            if name in HIDDEN and self._hidden:
+                self._hidden -= 1
+            elif name == self._capture:
+                self._end_heading()
+            return
+        if name in RAW_TEXT and not attrs.rstrip().endswith("/"):
+            self._raw_end = re.compile(rf"</{name}\s*>", re.I)
+        elif name in HIDDEN:
+            self._hidden += 1
+        elif name in self.headings and self.heading is None and not self._capture:
+            self._capture = name
+
+    def _end_heading(self):
+        self.heading = _WS_RE.sub(" ", " ".join(self._heading_parts)).strip()
+        self._capture = None
+        if self.stop_at_heading:
+            self.done = True
+
+    def feed(self, chunk: str, final: bool = False) -> bool:
+        """Tokenize `chunk`; a tag or text run cut by the chunk end waits for the next one."""
+        if self.done:
+            return False
+        buf, pos = self._buf + chunk, 0
+        watch = self._watch
+        while not self.done:
+            if self._raw_end:
+                m = self._raw_end.search(buf, pos)
+                if not m:
+                    pos = len(buf) if final else max(pos, len(buf) - 16)  # keep a possibly cut "</script"
+                    break
+                self._raw_end, pos = None, m.end()
+            # hot loop: text runs and tags; only watched tags leave it
+            append = None if (self._hidden or self._capture) else self._parts.append
+            cut = False
+            for m in _TAG_RE.finditer(buf, pos):
+                start, end = m.span()
+                if m.group(1) == "" and not final:  # a comment the chunk end cut
+                    cut = True
+                    end = start
+                if start > pos:
+                    if append is None:
+                        self._emit(buf[pos:start])
+                    else:  # inlined _emit for the common state
+                        text = buf[pos:start]
+                        if "&" in text:
+                            text = unescape(text)
+                        if not text.isspace():
+                            append(text)
+                pos = end
+                if cut:
+                    break
+                name = m.group(3)
+                if name:
+                    name = name.lower()
+                    if name in watch:
+                        self._tag(bool(m.group(2)), name, m.group(4))
+                        if self._raw_end or self.done:
+                            break
+                        append = None if (self._hidden or self._capture) else self._parts.append
+            else:
+                # no tag left; a "<" that does not parse is text (as in html.parser) unless the
+                # chunk may have cut it, in which case it waits for the next one
+                lt = -1 if final else buf.rfind("<", pos)
+                if lt >= 0 and (lt + 1 == len(buf) or _TAG_START_RE.match(buf, lt)):
+                    if lt > pos:
+                        self._emit(buf[pos:lt])
+                    pos = lt
+                elif final and pos < len(buf):
+                    self._emit(buf[pos:])
+                    pos = len(buf)
+                break
+            if cut:
+                break
+        self._buf = buf[pos:]
+        return not self.done
+
+    def close(self) -> "PageText":
+        self.feed("", final=True)
+        self._buf = ""
+        if self._capture:
+            self._end_heading()
+        return self
+
+
+def page_text(html: str) -> str:
+    """Visible text of `html`, space-joined: the words of BeautifulSoup(html).get_text(" ")."""
+    parser = PageText(headings=())
+    parser.feed(html)
+    return parser.close().text
+
+
+def first_heading(html: str, headings: Sequence[str] = HEADINGS, chunk_size: int = 16 * 1024) -> Optional[str]:
+    """Text of the first h1-h3 (None if there is none); stops tokenizing right after it."""
+    parser = PageText(headings, stop_at_heading=True)
+    for i in range(0, len(html), chunk_size):
+        if not parser.feed(html[i:i + chunk_size]):
+            break
+    return parser.close().heading
@@ -0,0 +1,78 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    def __init__(self, name: str, fn: Callable[..., Any], inputs: Sequence[str] = ()):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+
+
+class Pipeline:
+    """Tiny DAG executor: each stage's output is stored under its name.
+
+    A stage runs once, as soon as every input it names (a seed value or another
+    stage's output) is available; independent stages run in parallel. Outputs are
+    memoized in `results`, wall time per stage in `timings`.
+    """
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.stages: Dict[str, Stage] = {}
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+
+    def stage(self, name: str, inputs: Sequence[str] = ()):
+        """Decorator form of add()."""
+        def register(fn: Callable[..., Any]):
+            self.add(name, fn, inputs)
+            return fn
+        return register
+
+    def add(self, name: str, fn: Callable[..., Any], inputs: Sequence[str] = ()):
+        if name in self.stages:
+            raise ValueError(f"duplicate stage: {name}")
+        self.stages[name] = Stage(name, fn, inputs)
+
+    def _timed(self, st: Stage, args: Dict[str, Any]) -> Any:
+        t0 = time.perf_counter()
+        try:
+            return st.fn(**args)
+        finally:
+            self.timings[st.name] = time.perf_counter() - t0
+            METRICS.observe("gtm_stage_seconds", self.timings[st.name], stage=st.name)
+
+    def run(self, seed: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        self.results.update(seed or {})
+        pending = {n: s for n, s in self.stages.items() if n not in self.results}
+        known = set(self.results) | set(pending)
+        for st in pending.values():
+            missing = [i for i in st.inputs if i not in known]
+            if missing:
+                raise ValueError(f"stage {st.name} needs unknown inputs: {missing}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+            while pending or running:
+                for name in [n for n, s in pending.items() if all(i in self.results for i in s.inputs)]:
+                    st = pending.pop(name)
+                    running[pool.submit(self._timed, st, {i: self.results[i] for i in st.inputs})] = name
+                if not running:
+                    raise ValueError(f"dependency cycle among stages: {sorted(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    self.results[running.pop(fut)] = fut.result()
+        return self.results
+
+    def report(self) -> List[str]:
+        lines = [f"{name:<20} {secs:8.2f}s" for name, secs in
+                 sorted(self.timings.items(), key=lambda kv: kv[1], reverse=True)]
+        for line in lines:
+            logger.info(f"[STAGE] {line}")
+        return lines
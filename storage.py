@@ -1,19 +1,160 @@
 import json
+import re
 import sqlite3
-from typing import Dict, List, Optional, Any
-from config import DB_PATH
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Sequence, Tuple
+from config import DB_PATH, SQLITE_CACHE_KB, SQLITE_SYNCHRONOUS
+from lead import Lead
+from metrics import METRICS
 import datetime as dt
 
 
+def _now() -> str:
+    return dt.datetime.now(dt.timezone.utc).isoformat()
+
+
+# Columns iter_leads can project, mapped to their qualified SQL expression.
+LEAD_COLUMNS = {
+    "id": "s.id",
+    "source": "s.source",
+    "url": "s.url",
+    "title": "s.title",
+    "snippet": "s.snippet",
+    "detected_company": "s.detected_company",
+    "detected_domain": "s.detected_domain",
+    "created_at": "s.created_at",
+    "tech_hints": "e.tech_hints",
+    "company_size_hint": "e.company_size_hint",
+    "hiring_roles": "e.hiring_roles",
+    "score": "sc.score",
+    "reasons": "sc.reasons",
+}
+
+LeadCursor = Tuple[int, int]
+
+# near-duplicate signals point canonical_id at their cluster's canonical signal; only
+# canonical (or not yet clustered) signals are enriched, scored and messaged
+CANONICAL = "(s.canonical_id IS NULL OR s.canonical_id = s.id)"
+
+_FTS_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def fts_phrase(keyword: str) -> str:
+    """FTS5 query for a keyword: its tokens as a phrase, last token as a prefix ("sign-on" -> "sign on"*)."""
+    return '"' + " ".join(_FTS_TOKEN.findall(keyword.lower())) + '"*'
+
+# llm_cache hits are recorded in memory and written in one UPDATE at the next put/evict,
+# or once this many keys are pending, instead of a write transaction per hit
+LLM_TOUCH_BATCH = 256
+
+_STATEMENT_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE(?: IF NOT EXISTS)?|ON)\s+(\w+)", re.I)
+
+
+def _statement_labels(sql: str) -> Dict[str, str]:
+    """Low-cardinality labels for a statement: leading verb + first table it names."""
+    text = sql.lstrip()
+    op = text.split(None, 1)[0].upper() if text else ""
+    m = _STATEMENT_TABLE.search(text)
+    return {"op": op, "table": m.group(1) if m else ""}
+
+
+class _TimedCursor(sqlite3.Cursor):
+    """Records execute/executemany time per statement kind (for SELECTs: up to the first row)."""
+    def execute(self, sql, parameters=()):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            METRICS.observe("gtm_sqlite_statement_seconds", time.perf_counter() - t0, **_statement_labels(sql))
+
+    def executemany(self, sql, seq_of_parameters):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            METRICS.observe("gtm_sqlite_statement_seconds", time.perf_counter() - t0, **_statement_labels(sql))
+
+
+class _TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute* build their cursor internally, bypassing cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class _ConnHolder:
+    """A thread's connection; collected (and the connection closed) when the thread exits."""
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _release_conn(conn: sqlite3.Connection, conns: List[sqlite3.Connection], lock: threading.Lock):
+    with lock:
+        if conn in conns:
+            conns.remove(conn)
+    conn.close()
+
+
+def lead_cursor(row: Lead) -> LeadCursor:
+    """Keyset cursor for a row yielded by iter_leads; pass back as after_cursor."""
+    return (row.get("score") or 0, row["id"])
+
+
 class Storage:
+    """NOTE:
+        Thread-safe. `conn` is a per-thread connection (opened on a thread's first use),
+        so pipeline threads never share a connection or its cursors: reads run side by
+        side under WAL and see committed data only. Writes go through transaction(),
+        which serializes them on one process-wide lock. A thread's connection is closed
+        when the thread exits; close() closes every live thread's connection. A ":memory:"
+        path would be a separate database per thread, so use a file (a temp file in tests/benchmarks).
+    """
     def __init__(self, path: str = DB_PATH):
         self.path = path
-        self.conn = sqlite3.connect(self.path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self.fts = False  # set by _ensure when the SQLite build has FTS5
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        self._llm_touched: Dict[str, str] = {}  # llm_cache key -> last hit, not yet written
+        self._llm_touched_lock = threading.Lock()
+        # connections are per thread, but SQLite has one writer: serialize write transactions
+        self._write_lock = threading.RLock()
         self._ensure()
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection."""
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            # check_same_thread=False only so close() can close it from another thread
+            conn = sqlite3.connect(self.path, check_same_thread=False, factory=_TimedConnection)
+            conn.row_factory = sqlite3.Row
+            # NORMAL sync only fsyncs at checkpoints, which is safe under WAL
+            conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            conn.execute(f"PRAGMA cache_size=-{int(SQLITE_CACHE_KB)}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            holder = self._local.holder = _ConnHolder(conn)
+            with self._conns_lock:
+                self._conns.append(conn)
+            # the thread-local drops the holder when the thread exits: close its connection
+            # then, or every short-lived worker thread leaks an fd and a WAL reader slot
+            weakref.finalize(holder, _release_conn, conn, self._conns, self._conns_lock)
+        return holder.conn
+
     def _ensure(self):
         cur = self.conn.cursor()
+        # WAL lets readers run while a batch is being written (persistent, set once per file)
+        cur.execute("PRAGMA journal_mode=WAL")
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS signals (
@@ -64,97 +205,854 @@ class Storage:
             )
             """
         )
-        self.conn.commit()
-
-    # Basic upserts
-    def upsert_signal(self, source: str, url: str, title: str, snippet: str,
-                      detected_company: str = "", detected_domain: str = ""):
-        cur = self.conn.cursor()
         cur.execute(
             """
-            INSERT OR IGNORE INTO signals(source, url, title, snippet, detected_company, detected_domain, created_at)
-            VALUES(?,?,?,?,?,?,?)
-            """,
-            (source, url, title, snippet, detected_company, detected_domain,
-             dt.datetime.now(dt.timezone.utc).isoformat())
+            CREATE TABLE IF NOT EXISTS domain_profiles (
+              domain TEXT PRIMARY KEY,
+              tech_hints TEXT,
+              company_size_hint TEXT,
+              hiring_roles TEXT,
+              fetched_at TEXT
+            )
+            """
         )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_domain_profiles_fetched_at ON domain_profiles(fetched_at)")
+        # scores carries its signal's id so (score, id) keyset pagination is index-only
+        if self._add_column("scores", "signal_id", "INTEGER"):
+            cur.execute("UPDATE scores SET signal_id = (SELECT id FROM signals WHERE url = scores.signal_url)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_scores_score ON scores(score DESC, signal_id DESC)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_outreach_signal_url ON outreach(signal_url)")
+        # change tracking for incremental rescoring
+        if self._add_column("signals", "updated_at", "TEXT"):
+            cur.execute("UPDATE signals SET updated_at = created_at")
+        self._add_column("scores", "rules_version", "INTEGER")
+        # change tracking for delta CRM sync: changed_at only moves when score/reasons change
+        if self._add_column("scores", "changed_at", "TEXT"):
+            cur.execute("UPDATE scores SET changed_at = updated_at")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_scores_changed_at ON scores(changed_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_outreach_created_at ON outreach(created_at)")
+        # idempotent drafts: one row per (signal, channel, template/LLM version, input hash).
+        # Legacy rows keep NULL keys (NULLs never collide); their exact duplicates are dropped.
+        if self._add_column("outreach", "version", "TEXT"):
+            cur.execute(
+                """
+                DELETE FROM outreach WHERE id NOT IN (
+                  SELECT MIN(id) FROM outreach GROUP BY signal_url, channel, message
+                )
+                """
+            )
+        self._add_column("outreach", "input_hash", "TEXT")
+        cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_outreach_key "
+                    "ON outreach(channel, version, signal_url, input_hash)")
+        # near-duplicate clusters (dedupe.py): MinHash of canonical signals + LSH band buckets
+        self._add_column("signals", "canonical_id", "INTEGER")
+        self._add_column("signals", "minhash", "BLOB")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_signals_canonical ON signals(canonical_id)")
         cur.execute(
             """
-            UPDATE signals SET detected_company = COALESCE(NULLIF(?, ''), detected_company),
-                               detected_domain = COALESCE(NULLIF(?, ''), detected_domain)
-            WHERE url = ?
-            """,
-            (detected_company, detected_domain, url)
+            CREATE TABLE IF NOT EXISTS signal_lsh (
+              bucket INTEGER,
+              signal_id INTEGER,
+              PRIMARY KEY (bucket, signal_id)
+            ) WITHOUT ROWID
+            """
         )
-        self.conn.commit()
-
-    def upsert_enrichment(self, signal_url: str, domain: str, tech_hints: Dict[str, int],
-                           company_size_hint: str = "unknown", hiring_roles: List[str] | None = None):
-        cur = self.conn.cursor()
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_signals_updated_at ON signals(updated_at)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_enrichments_updated_at ON enrichments(updated_at)")
         cur.execute(
             """
-            INSERT OR REPLACE INTO enrichments(signal_url, domain, tech_hints, company_size_hint, hiring_roles, updated_at)
-            VALUES(?,?,?,?,?,?)
-            """,
-            (
-                signal_url,
-                domain,
-                json.dumps(tech_hints or {}),
-                company_size_hint,
-                ", ".join(hiring_roles or []),
-                dt.datetime.now(dt.timezone.utc).isoformat(),
+            CREATE TABLE IF NOT EXISTS llm_cache (
+              key TEXT PRIMARY KEY,
+              model TEXT,
+              template_version TEXT,
+              response TEXT,
+              size INTEGER,
+              created_at TEXT,
+              last_used_at TEXT
             )
+            """
         )
-        self.conn.commit()
-
-    def upsert_score(self, signal_url: str, score: int, reasons: List[str]):
-        cur = self.conn.cursor()
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used_at)")
         cur.execute(
             """
-            INSERT OR REPLACE INTO scores(signal_url, score, reasons, updated_at)
-            VALUES(?,?,?,?)
-            """,
-            (signal_url, score, json.dumps(reasons), dt.datetime.now(dt.timezone.utc).isoformat())
+            CREATE TABLE IF NOT EXISTS video_jobs (
+              id INTEGER PRIMARY KEY AUTOINCREMENT,
+              signal_url TEXT,
+              talk_id TEXT,
+              video_path TEXT,
+              status TEXT,
+              result_url TEXT,
+              error TEXT,
+              submitted_at TEXT,
+              updated_at TEXT
+            )
+            """
         )
-        self.conn.commit()
-
-    def insert_outreach(self, signal_url: str, channel: str, message: str, status: str = "draft"):
-        cur = self.conn.cursor()
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_video_jobs_status ON video_jobs(status)")
+        self.fts = self._ensure_fts(cur)
+        # per-stage watermarks for incremental pipeline runs
         cur.execute(
             """
-            INSERT INTO outreach(signal_url, channel, message, status, created_at)
-            VALUES(?,?,?,?,?)
-            """,
-            (signal_url, channel, message, status, dt.datetime.now(dt.timezone.utc).isoformat())
+            CREATE TABLE IF NOT EXISTS pipeline_state (
+              stage TEXT PRIMARY KEY,
+              watermark TEXT,
+              version INTEGER,
+              rows_processed INTEGER,
+              last_run_at TEXT
+            )
+            """
+        )
+        # per-query cursors of incremental API sources (github_issues.py)
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS source_cursors (
+              source TEXT,
+              query TEXT,
+              cursor TEXT,
+              polled_at TEXT,
+              calls INTEGER DEFAULT 0,
+              items INTEGER DEFAULT 0,
+              PRIMARY KEY (source, query)
+            )
+            """
         )
         self.conn.commit()
 
+    def _ensure_fts(self, cur) -> bool:
+        """Full-text index over signals(title, snippet), kept in sync by triggers."""
+        exists = cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'signals_fts'").fetchone()
+        try:
+            cur.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS signals_fts
+                USING fts5(title, snippet, content='signals', content_rowid='id')
+                """
+            )
+        except sqlite3.OperationalError:  # SQLite built without FTS5
+            return False
+        cur.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS signals_fts_ai AFTER INSERT ON signals BEGIN
+              INSERT INTO signals_fts(rowid, title, snippet) VALUES (new.id, new.title, new.snippet);
+            END;
+            CREATE TRIGGER IF NOT EXISTS signals_fts_ad AFTER DELETE ON signals BEGIN
+              INSERT INTO signals_fts(signals_fts, rowid, title, snippet)
+              VALUES ('delete', old.id, old.title, old.snippet);
+            END;
+            CREATE TRIGGER IF NOT EXISTS signals_fts_au AFTER UPDATE OF title, snippet ON signals BEGIN
+              INSERT INTO signals_fts(signals_fts, rowid, title, snippet)
+              VALUES ('delete', old.id, old.title, old.snippet);
+              INSERT INTO signals_fts(rowid, title, snippet) VALUES (new.id, new.title, new.snippet);
+            END;
+            """
+        )
+        if not exists:
+            cur.execute("INSERT INTO signals_fts(signals_fts) VALUES ('rebuild')")
+        return True
+
+    def _add_column(self, table: str, column: str, decl: str) -> bool:
+        cols = {r["name"] for r in self.conn.execute(f"PRAGMA table_info({table})")}
+        if column in cols:
+            return False
+        self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        return True
+
+    @contextmanager
+    def transaction(self):
+        """Run a block of writes as one explicit transaction (one commit).
+
+        Nested calls on the same thread become savepoints of the outer transaction.
+        Uncommitted work left on the connection by raw conn.execute() writes is an
+        error: it is never committed (or rolled back) on the caller's behalf.
+        """
+        with self._write_lock:
+            conn = self.conn
+            depth = getattr(self._local, "tx_depth", 0)
+            if depth:
+                yield from self._savepoint(conn, depth)
+                return
+            if conn.in_transaction:
+                raise sqlite3.ProgrammingError(
+                    "transaction(): the connection has uncommitted writes from outside transaction(); "
+                    "commit or roll them back first")
+            conn.execute("BEGIN")
+            self._local.tx_depth = 1
+            try:
+                yield conn.cursor()
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._local.tx_depth = 0
+
+    def _savepoint(self, conn: sqlite3.Connection, depth: int):
+        name = f"tx{depth}"
+        conn.execute(f"SAVEPOINT {name}")
+        self._local.tx_depth = depth + 1
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            conn.execute(f"RELEASE {name}")
+        finally:
+            self._local.tx_depth = depth
+
+    # Basic upserts
+    def upsert_signal(self, source: str, url: str, title: str, snippet: str,
+                      detected_company: str = "", detected_domain: str = ""):
+        self.upsert_signals_many([{
+            "source": source, "url": url, "title": title, "snippet": snippet,
+            "detected_company": detected_company, "detected_domain": detected_domain,
+        }])
+
+    def upsert_enrichment(self, signal_url: str, domain: str, tech_hints: Dict[str, int],
+                           company_size_hint: str = "unknown", hiring_roles: List[str] | None = None):
+        self.upsert_enrichments_many([{
+            "signal_url": signal_url, "domain": domain, "tech_hints": tech_hints,
+            "company_size_hint": company_size_hint, "hiring_roles": hiring_roles,
+        }])
+
+    def upsert_score(self, signal_url: str, score: int, reasons: List[str]):
+        self.upsert_scores_many([{"signal_url": signal_url, "score": score, "reasons": reasons}])
+
+    def insert_outreach(self, signal_url: str, channel: str, message: str, status: str = "draft",
+                        version: Optional[str] = None, input_hash: Optional[str] = None):
+        self.insert_outreach_many([{
+            "signal_url": signal_url, "channel": channel, "message": message, "status": status,
+            "version": version, "input_hash": input_hash,
+        }])
+
+    # Bulk writes: one executemany per table inside a single transaction
+    def upsert_signals_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        now = _now()
+        params = [
+            (r["source"], r["url"], r.get("title", ""), r.get("snippet", ""),
+             r.get("detected_company", ""), r.get("detected_domain", ""), now)
+            for r in rows
+        ]
+        if not params:
+            return 0
+        with self.transaction() as cur:
+            cur.executemany(
+                """
+                INSERT INTO signals(source, url, title, snippet, detected_company, detected_domain, created_at, updated_at)
+                VALUES(?,?,?,?,?,?,?,?)
+                ON CONFLICT(url) DO UPDATE SET
+                  detected_company = COALESCE(NULLIF(excluded.detected_company, ''), detected_company),
+                  detected_domain = COALESCE(NULLIF(excluded.detected_domain, ''), detected_domain),
+                  updated_at = CASE
+                    WHEN COALESCE(NULLIF(excluded.detected_company, ''), detected_company) IS NOT detected_company
+                      OR COALESCE(NULLIF(excluded.detected_domain, ''), detected_domain) IS NOT detected_domain
+                    THEN excluded.updated_at ELSE updated_at END
+                """,
+                [p + (now,) for p in params]
+            )
+        return len(params)
+
+    def upsert_enrichments_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        now = _now()
+        params = [
+            (
+                r["signal_url"],
+                r["domain"],
+                json.dumps(r.get("tech_hints") or {}),
+                r.get("company_size_hint") or "unknown",
+                ", ".join(r.get("hiring_roles") or []),
+                now,
+            )
+            for r in rows
+        ]
+        if not params:
+            return 0
+        with self.transaction() as cur:
+            cur.executemany(
+                """
+                INSERT INTO enrichments(signal_url, domain, tech_hints, company_size_hint, hiring_roles, updated_at)
+                VALUES(?,?,?,?,?,?)
+                ON CONFLICT(signal_url) DO UPDATE SET
+                  updated_at = CASE
+                    WHEN (excluded.domain, excluded.tech_hints, excluded.company_size_hint, excluded.hiring_roles)
+                      IS NOT (domain, tech_hints, company_size_hint, hiring_roles)
+                    THEN excluded.updated_at ELSE updated_at END,
+                  domain = excluded.domain,
+                  tech_hints = excluded.tech_hints,
+                  company_size_hint = excluded.company_size_hint,
+                  hiring_roles = excluded.hiring_roles
+                """,
+                params
+            )
+        return len(params)
+
+    def upsert_scores_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        now = _now()
+        params = [(r["signal_url"], r["score"], json.dumps(r.get("reasons") or []), now,
+                   r.get("rules_version"), r["signal_url"], now) for r in rows]
+        if not params:
+            return 0
+        with self.transaction() as cur:
+            cur.executemany(
+                """
+                INSERT INTO scores(signal_url, score, reasons, updated_at, rules_version, signal_id, changed_at)
+                VALUES(?,?,?,?,?,(SELECT id FROM signals WHERE url = ?),?)
+                ON CONFLICT(signal_url) DO UPDATE SET
+                  changed_at = CASE WHEN (excluded.score, excluded.reasons) IS NOT (score, reasons)
+                               THEN excluded.changed_at ELSE changed_at END,
+                  score = excluded.score,
+                  reasons = excluded.reasons,
+                  updated_at = excluded.updated_at,
+                  rules_version = excluded.rules_version,
+                  signal_id = excluded.signal_id
+                """,
+                params
+            )
+        return len(params)
+
+    def insert_outreach_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Insert drafts; a row whose (signal_url, channel, version, input_hash) already
+        exists is skipped. Returns the number of rows inserted."""
+        now = _now()
+        params = [
+            (r["signal_url"], r["channel"], r["message"], r.get("status", "draft"), now,
+             r.get("version"), r.get("input_hash"))
+            for r in rows
+        ]
+        if not params:
+            return 0
+        with self.transaction() as cur:
+            cur.executemany(
+                """
+                INSERT INTO outreach(signal_url, channel, message, status, created_at, version, input_hash)
+                VALUES(?,?,?,?,?,?,?)
+                ON CONFLICT(signal_url, channel, version, input_hash) DO NOTHING
+                """,
+                params
+            )
+            return cur.rowcount
+
+    def drafted_outreach(self, channel: str, version: str, keys: Sequence[Tuple[str, str]]) -> set:
+        """The (signal_url, input_hash) pairs in `keys` already drafted for this channel and
+        version; each pair is one lookup on idx_outreach_key, so cost follows len(keys),
+        not the size of the outreach table."""
+        keys = list(keys)
+        out = set()
+        for i in range(0, len(keys), 400):
+            chunk = keys[i:i + 400]
+            cur = self.conn.execute(
+                f"""
+                WITH k(signal_url, input_hash) AS (VALUES {",".join(["(?,?)"] * len(chunk))})
+                SELECT k.signal_url, k.input_hash FROM k
+                WHERE EXISTS (
+                  SELECT 1 FROM outreach o
+                  WHERE o.channel = ? AND o.version = ? AND o.signal_url = k.signal_url
+                    AND o.input_hash = k.input_hash
+                )
+                """,
+                (*[v for pair in chunk for v in pair], channel, version)
+            )
+            out.update((url, h) for url, h in cur.fetchall())
+        return out
+
+    # Domain crawl cache
+    def upsert_domain_profiles_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        now = _now()
+        params = [
+            (r["domain"], json.dumps(r.get("tech_hints") or {}), r.get("company_size_hint") or "unknown",
+             json.dumps(list(r.get("hiring_roles") or [])), now)
+            for r in rows
+        ]
+        if not params:
+            return 0
+        with self.transaction() as cur:
+            cur.executemany(
+                """
+                INSERT OR REPLACE INTO domain_profiles(domain, tech_hints, company_size_hint, hiring_roles, fetched_at)
+                VALUES(?,?,?,?,?)
+                """,
+                params
+            )
+        return len(params)
+
+    def fetch_domain_profiles(self, domains: Iterable[str], max_age: int) -> Dict[str, Dict[str, Any]]:
+        """Cached crawl results fetched within the last `max_age` seconds, keyed by domain."""
+        cutoff = (dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=max_age)).isoformat()
+        domains = list(dict.fromkeys(domains))
+        out: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(domains), 500):
+            chunk = domains[i:i + 500]
+            cur = self.conn.execute(
+                f"SELECT * FROM domain_profiles WHERE fetched_at >= ? AND domain IN ({','.join('?' * len(chunk))})",
+                (cutoff, *chunk)
+            )
+            for r in cur.fetchall():
+                out[r["domain"]] = dict(
+                    tech_hints=json.loads(r["tech_hints"] or "{}"),
+                    company_size_hint=r["company_size_hint"],
+                    hiring_roles=json.loads(r["hiring_roles"] or "[]"),
+                )
+        return out
+
+    def evict_domain_profiles(self, max_age: Optional[int] = None, max_rows: Optional[int] = None) -> int:
+        """Drop profiles older than `max_age` seconds, then all but the newest `max_rows`."""
+        removed = 0
+        with self.transaction() as cur:
+            if max_age is not None:
+                cutoff = (dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=max_age)).isoformat()
+                removed += cur.execute("DELETE FROM domain_profiles WHERE fetched_at < ?", (cutoff,)).rowcount
+            if max_rows is not None:
+                removed += cur.execute(
+                    """
+                    DELETE FROM domain_profiles WHERE domain NOT IN (
+                      SELECT domain FROM domain_profiles ORDER BY fetched_at DESC LIMIT ?
+                    )
+                    """,
+                    (max_rows,)
+                ).rowcount
+        return removed
+
+    # LLM response cache
+    def get_llm_response(self, key: str) -> Optional[str]:
+        r = self.conn.execute("SELECT response FROM llm_cache WHERE key=?", (key,)).fetchone()
+        if r is None:
+            return None
+        with self._llm_touched_lock:
+            self._llm_touched[key] = _now()
+            full = len(self._llm_touched) >= LLM_TOUCH_BATCH
+        if full:
+            with self.transaction() as cur:
+                self._flush_llm_touched(cur)
+        return r["response"]
+
+    def _flush_llm_touched(self, cur):
+        """Write the pending last_used_at of cache hits (inside the caller's transaction)."""
+        with self._llm_touched_lock:
+            touched, self._llm_touched = self._llm_touched, {}
+        if touched:
+            cur.executemany("UPDATE llm_cache SET last_used_at=? WHERE key=?",
+                            [(at, key) for key, at in touched.items()])
+
+    def put_llm_response(self, key: str, model: str, template_version: str, response: str):
+        now = _now()
+        with self.transaction() as cur:
+            self._flush_llm_touched(cur)
+            cur.execute(
+                """
+                INSERT OR REPLACE INTO llm_cache(key, model, template_version, response, size, created_at, last_used_at)
+                VALUES(?,?,?,?,?,?,?)
+                """,
+                (key, model, template_version, response, len(response.encode("utf-8")), now, now)
+            )
+
+    def evict_llm_cache(self, max_age: Optional[int] = None, max_bytes: Optional[int] = None) -> int:
+        """Drop entries created more than `max_age` seconds ago, then least recently
+        used entries until the cached responses fit in `max_bytes`."""
+        removed = 0
+        with self.transaction() as cur:
+            # LRU order must see the hits recorded since the last flush
+            self._flush_llm_touched(cur)
+            if max_age is not None:
+                cutoff = (dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=max_age)).isoformat()
+                removed += cur.execute("DELETE FROM llm_cache WHERE created_at < ?", (cutoff,)).rowcount
+            if max_bytes is not None:
+                removed += cur.execute(
+                    """
+                    DELETE FROM llm_cache WHERE key IN (
+                      SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY last_used_at DESC, key) AS running
+                        FROM llm_cache
+                      ) WHERE running > ?
+                    )
+                    """,
+                    (max_bytes,)
+                ).rowcount
+        return removed
+
+    # D-ID video jobs
+    def insert_video_job(self, signal_url: str, talk_id: str, video_path: str,
+                         status: str = "submitted", error: str = "") -> int:
+        now = _now()
+        with self.transaction() as cur:
+            cur.execute(
+                """
+                INSERT INTO video_jobs(signal_url, talk_id, video_path, status, error, submitted_at, updated_at)
+                VALUES(?,?,?,?,?,?,?)
+                """,
+                (signal_url, talk_id, video_path, status, error, now, now)
+            )
+            return cur.lastrowid
+
+    def update_video_job(self, job_id: int, status: str, result_url: Optional[str] = None, error: str = ""):
+        with self.transaction() as cur:
+            cur.execute(
+                """
+                UPDATE video_jobs SET status=?, result_url=COALESCE(?, result_url), error=?, updated_at=?
+                WHERE id=?
+                """,
+                (status, result_url, error, _now(), job_id)
+            )
+
+    def fetch_video_jobs(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        if status is None:
+            cur = self.conn.execute("SELECT * FROM video_jobs ORDER BY id")
+        else:
+            cur = self.conn.execute("SELECT * FROM video_jobs WHERE status=? ORDER BY id", (status,))
+        return [dict(r) for r in cur.fetchall()]
+
+    # Pipeline watermarks
+    def get_stage_state(self, stage: str) -> Optional[Dict[str, Any]]:
+        r = self.conn.execute("SELECT * FROM pipeline_state WHERE stage=?", (stage,)).fetchone()
+        return dict(r) if r else None
+
+    def set_stage_state(self, stage: str, watermark: Any, rows_processed: int = 0,
+                        version: Optional[int] = None):
+        """Record a successful stage run; call only after its writes are committed."""
+        with self.transaction() as cur:
+            cur.execute(
+                """
+                INSERT OR REPLACE INTO pipeline_state(stage, watermark, version, rows_processed, last_run_at)
+                VALUES(?,?,?,?,?)
+                """,
+                (stage, None if watermark is None else str(watermark), version, rows_processed, _now())
+            )
+
+    def get_source_cursors(self, source: str) -> Dict[str, Dict[str, Any]]:
+        """query -> {cursor, polled_at, calls, items} for one incremental source."""
+        cur = self.conn.execute("SELECT * FROM source_cursors WHERE source=?", (source,))
+        return {r["query"]: dict(r) for r in cur.fetchall()}
+
+    def save_source_cursors(self, source: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """Upsert per-query cursors; `calls`/`items` are this run's counts and accumulate.
+
+        A None cursor keeps the stored one. Save only after the items are written.
+        """
+        params = [(source, r["query"], r.get("cursor"), r.get("polled_at") or _now(),
+                   r.get("calls", 0), r.get("items", 0)) for r in rows]
+        if not params:
+            return 0
+        with self.transaction() as cur:
+            cur.executemany(
+                """
+                INSERT INTO source_cursors(source, query, cursor, polled_at, calls, items)
+                VALUES(?,?,?,?,?,?)
+                ON CONFLICT(source, query) DO UPDATE SET
+                  cursor = COALESCE(excluded.cursor, cursor),
+                  polled_at = excluded.polled_at,
+                  calls = calls + excluded.calls,
+                  items = items + excluded.items
+                """,
+                params
+            )
+        return len(params)
+
     # Fetch methods
     def fetch_signals(self, limit: int = 50) -> List[Dict[str, Any]]:
         cur = self.conn.cursor()
         cur.execute("SELECT * FROM signals ORDER BY id DESC LIMIT ?", (limit,))
         return [dict(r) for r in cur.fetchall()]
 
+    def fetch_unenriched_signals(self, after_id: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Signals with no enrichment row and id > after_id, oldest first."""
+        cur = self.conn.execute(
+            f"""
+            SELECT s.* FROM signals s
+            LEFT JOIN enrichments e ON e.signal_url = s.url
+            WHERE s.id > ? AND e.id IS NULL AND {CANONICAL}
+            ORDER BY s.id
+            LIMIT ?
+            """,
+            (after_id, limit)
+        )
+        return [dict(r) for r in cur.fetchall()]
+
     def fetch_signal_by_url(self, url: str) -> Optional[Dict[str, Any]]:
         cur = self.conn.cursor()
         cur.execute("SELECT * FROM signals WHERE url=?", (url,))
         r = cur.fetchone()
         return dict(r) if r else None
 
-    def fetch_joined(self, min_score: int = 0) -> List[Dict[str, Any]]:
-        cur = self.conn.cursor()
-        cur.execute(
+    def fetch_joined(self, min_score: int = 0) -> List[Lead]:
+        return list(self.iter_leads(min_score=min_score))
+
+    def iter_leads(self, min_score: int = 0, limit: Optional[int] = None,
+                   after_cursor: Optional[LeadCursor] = None,
+                   columns: Optional[Sequence[str]] = None,
+                   page_size: int = 500) -> Iterator[Lead]:
+        """Stream joined leads (as Lead records) ordered by score DESC, id DESC (same order as fetch_joined).
+
+        Pages are fetched with keyset pagination on (score, id), so memory stays at one
+        page and the first rows come straight off idx_scores_score. Scored leads are
+        read first; unscored leads (and score 0 when min_score <= 0) follow by id.
+        ``id`` and ``score`` are always included so lead_cursor() works on every row.
+        """
+        cols = list(columns or LEAD_COLUMNS)
+        unknown = set(cols) - set(LEAD_COLUMNS)
+        if unknown:
+            raise ValueError(f"unknown lead columns: {sorted(unknown)}")
+        for required in ("id", "score"):
+            if required not in cols:
+                cols.append(required)
+        select = ", ".join(f"{LEAD_COLUMNS[c]} AS {c}" for c in cols)
+        joins = "LEFT JOIN enrichments e ON e.signal_url = s.url" if any(
+            LEAD_COLUMNS[c].startswith("e.") for c in cols) else ""
+
+        remaining = limit
+        cur_score, cur_id = after_cursor if after_cursor else (None, None)
+
+        def take(sql: str, args: tuple) -> List[Lead]:
+            n = page_size if remaining is None else min(page_size, remaining)
+            return Lead.from_rows(self.conn.execute(sql + " LIMIT ?", args + (n,)).fetchall())
+
+        # 1) scored leads with a positive score, straight off the (score, signal_id) index
+        floor = max(min_score, 1)
+        if cur_score is None or cur_score > 0:
+            sql = f"""
+                SELECT {select}
+                FROM scores sc
+                JOIN signals s ON s.id = sc.signal_id
+                {joins}
+                WHERE sc.score >= ? AND (sc.score, sc.signal_id) < (?, ?) AND {CANONICAL}
+                ORDER BY sc.score DESC, sc.signal_id DESC
             """
-            SELECT s.*, e.tech_hints, e.company_size_hint, e.hiring_roles, sc.score, sc.reasons
+            key = (cur_score, cur_id) if cur_score is not None else (1 << 62, 1 << 62)
+            while remaining is None or remaining > 0:
+                page = take(sql, (floor,) + key)
+                for row in page:
+                    yield row
+                if remaining is not None:
+                    remaining -= len(page)
+                if len(page) < page_size:
+                    break
+                key = lead_cursor(page[-1])
+            cur_id = None
+
+        # 2) unscored leads (sorted as 0) and, when asked for, score-0 leads, newest first
+        zero = "OR sc.score = 0" if min_score <= 0 else ""
+        sql = f"""
+            SELECT {select}
+            FROM signals s
+            LEFT JOIN scores sc ON sc.signal_url = s.url
+            {joins}
+            WHERE (sc.score IS NULL {zero}) AND s.id < ? AND {CANONICAL}
+            ORDER BY s.id DESC
+        """
+        last_id = cur_id if cur_id is not None else 1 << 62
+        while remaining is None or remaining > 0:
+            page = take(sql, (last_id,))
+            for row in page:
+                yield row
+            if remaining is not None:
+                remaining -= len(page)
+            if len(page) < page_size:
+                break
+            last_id = page[-1].id
+
+    def iter_dirty_leads(self, rules_version: int, full: bool = False, since: Optional[str] = None,
+                         page_size: int = 500) -> Iterator[Lead]:
+        """Stream leads (as Lead records) whose score is missing or stale, oldest signal first.
+
+        Stale means scored under another rules_version, or the signal/enrichment row
+        changed after the score was written. `since` (a stage watermark) narrows the
+        scan to signals/enrichments touched after it via their updated_at indexes.
+        `full=True` yields every lead.
+        """
+        dirty = "" if full else """
+              AND (sc.score IS NULL OR sc.rules_version IS NOT ?
+                   OR s.updated_at > sc.updated_at OR e.updated_at > sc.updated_at)"""
+        touched = "" if full or since is None else """
+              AND s.id IN (SELECT id FROM signals WHERE updated_at > ?
+                           UNION SELECT s2.id FROM enrichments e2 JOIN signals s2 ON s2.url = e2.signal_url
+                                 WHERE e2.updated_at > ?)"""
+        sql = f"""
+            SELECT s.id, s.url, s.title, s.snippet, e.tech_hints, e.company_size_hint, e.hiring_roles
             FROM signals s
             LEFT JOIN enrichments e ON e.signal_url = s.url
             LEFT JOIN scores sc ON sc.signal_url = s.url
-            WHERE sc.score IS NULL OR sc.score >= ?
-            ORDER BY COALESCE(sc.score, 0) DESC, s.id DESC
-            """,
-            (min_score,)
+            WHERE s.id > ? AND {CANONICAL} {dirty} {touched}
+            ORDER BY s.id
+            LIMIT ?
+        """
+        last_id = 0
+        while True:
+            args = (last_id,) if full else (last_id, rules_version)
+            if touched:
+                args += (since, since)
+            page = Lead.from_rows(self.conn.execute(sql, args + (page_size,)).fetchall())
+            yield from page
+            if len(page) < page_size:
+                break
+            last_id = page[-1].id
+
+    def iter_changed_leads(self, since: Optional[str] = None, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Stream leads, oldest signal first, whose signal, enrichment, score or outreach changed after `since`.
+
+        `since=None` yields every lead. Touched rows are found through the
+        updated_at/changed_at/created_at indexes, so a delta scan only reads what changed.
+        """
+        select = ", ".join(f"{expr} AS {name}" for name, expr in LEAD_COLUMNS.items())
+        touched = "" if since is None else """
+              AND s.id IN (SELECT id FROM signals WHERE updated_at > ?
+                           UNION SELECT s2.id FROM enrichments e2 JOIN signals s2 ON s2.url = e2.signal_url
+                                 WHERE e2.updated_at > ?
+                           UNION SELECT signal_id FROM scores WHERE changed_at > ?
+                           UNION SELECT s3.id FROM outreach o JOIN signals s3 ON s3.url = o.signal_url
+                                 WHERE o.created_at > ?)"""
+        sql = f"""
+            SELECT {select}
+            FROM signals s
+            LEFT JOIN enrichments e ON e.signal_url = s.url
+            LEFT JOIN scores sc ON sc.signal_url = s.url
+            WHERE s.id > ? AND {CANONICAL} {touched}
+            ORDER BY s.id
+            LIMIT ?
+        """
+        last_id = 0
+        while True:
+            args = (last_id,) + ((since,) * 4 if touched else ())
+            page = [dict(r) for r in self.conn.execute(sql, args + (page_size,)).fetchall()]
+            yield from page
+            if len(page) < page_size:
+                break
+            last_id = page[-1]["id"]
+
+    # Full-text search
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Signals matching an FTS5 query (plain words work too), best bm25 rank first.
+
+        Falls back to quoting each word when `query` isn't valid FTS5 syntax.
+        """
+        if not self.fts:
+            raise RuntimeError("this SQLite build has no FTS5; search() is unavailable")
+        sql = """
+            SELECT s.id, s.source, s.url, s.title, s.snippet, s.detected_domain, s.canonical_id,
+                   sc.score, bm25(signals_fts) AS rank
+            FROM signals_fts
+            JOIN signals s ON s.id = signals_fts.rowid
+            LEFT JOIN scores sc ON sc.signal_url = s.url
+            WHERE signals_fts MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """
+        try:
+            rows = self.conn.execute(sql, (query, limit)).fetchall()
+        except sqlite3.OperationalError:
+            quoted = " ".join(f'"{w}"' for w in _FTS_TOKEN.findall(query.lower()))
+            if not quoted:
+                return []
+            rows = self.conn.execute(sql, (quoted, limit)).fetchall()
+        return [dict(r) for r in rows]
+
+    def keyword_hits(self, keywords: Sequence[str], signal_ids: Sequence[int],
+                     max_gap: int = 1024) -> Dict[int, int]:
+        """Number of distinct `keywords` (token-prefix phrases) each signal's title/snippet contains.
+
+        One statement per rowid range: an indexed MATCH per keyword, UNION ALL'd and
+        counted per rowid in SQLite. Ids are grouped into ranges (a new range starts at
+        gaps wider than `max_gap`) because FTS5 seeks rowid ranges natively but re-runs
+        the MATCH for every value of a `rowid IN (...)` list. Each prefix query has a
+        fixed setup cost, so pass large id sets. Ids with no hit are omitted.
+        """
+        wanted = set(signal_ids)
+        if not wanted:
+            return {}
+        ordered = sorted(wanted)
+        ranges, lo, prev = [], ordered[0], ordered[0]
+        for sid in ordered[1:]:
+            if sid - prev > max_gap:
+                ranges.append((lo, prev))
+                lo = sid
+            prev = sid
+        ranges.append((lo, prev))
+        phrases = [fts_phrase(kw) for kw in keywords]
+        if not phrases:
+            return {}
+        sql = "SELECT rowid_, COUNT(*) FROM (" + " UNION ALL ".join(
+            ["SELECT rowid AS rowid_ FROM signals_fts WHERE signals_fts MATCH ? AND rowid BETWEEN ? AND ?"]
+            * len(phrases)) + ") GROUP BY rowid_"
+        hits: Dict[int, int] = {}
+        for lo, hi in ranges:
+            args = [a for phrase in phrases for a in (phrase, lo, hi)]
+            hits.update((rowid, n) for rowid, n in self.conn.execute(sql, args).fetchall() if rowid in wanted)
+        return hits
+
+    # Near-duplicate clusters
+    def fetch_unclustered_signals(self, limit: int = 1000) -> List[Dict[str, Any]]:
+        cur = self.conn.execute(
+            "SELECT id, url, title, snippet FROM signals WHERE canonical_id IS NULL ORDER BY id LIMIT ?",
+            (limit,)
         )
         return [dict(r) for r in cur.fetchall()]
 
+    def fetch_lsh_candidates(self, buckets: Iterable[int]) -> Dict[int, List[int]]:
+        """Canonical signal ids per LSH bucket."""
+        out: Dict[int, List[int]] = {}
+        keys = list(buckets)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            cur = self.conn.execute(
+                f"SELECT bucket, signal_id FROM signal_lsh WHERE bucket IN ({','.join('?' * len(chunk))})", chunk)
+            for bucket, signal_id in cur.fetchall():
+                out.setdefault(bucket, []).append(signal_id)
+        return out
+
+    def fetch_minhashes(self, signal_ids: Iterable[int]) -> Dict[int, Tuple[bytes, str]]:
+        """id -> (minhash, title) for the given canonical signals."""
+        out: Dict[int, Tuple[bytes, str]] = {}
+        ids = list(signal_ids)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cur = self.conn.execute(
+                f"SELECT id, minhash, title FROM signals WHERE id IN ({','.join('?' * len(chunk))}) "
+                "AND minhash IS NOT NULL",
+                chunk)
+            out.update((r["id"], (r["minhash"], r["title"] or "")) for r in cur.fetchall())
+        return out
+
+    def assign_clusters(self, assignments: Iterable[Tuple[int, Optional[bytes], int]],
+                        lsh_rows: Iterable[Tuple[int, int]]):
+        """Set (canonical_id, minhash) per signal id and add LSH rows for new canonicals, in one transaction."""
+        with self.transaction() as cur:
+            cur.executemany("UPDATE signals SET canonical_id = ?, minhash = ? WHERE id = ?", list(assignments))
+            cur.executemany("INSERT OR IGNORE INTO signal_lsh(bucket, signal_id) VALUES(?,?)", list(lsh_rows))
+
+    def cluster_size_distribution(self) -> List[Tuple[int, int]]:
+        """[(cluster size, number of clusters)] over clustered signals, smallest size first."""
+        cur = self.conn.execute(
+            """
+            SELECT size, COUNT(*) FROM (
+              SELECT COUNT(*) AS size FROM signals WHERE canonical_id IS NOT NULL GROUP BY canonical_id
+            ) GROUP BY size ORDER BY size
+            """
+        )
+        return [(r[0], r[1]) for r in cur.fetchall()]
+
+    def fetch_outreach_for(self, signal_urls: Sequence[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Outreach rows for the given signals, oldest first, grouped by signal_url."""
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        urls = list(signal_urls)
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            cur = self.conn.execute(
+                f"""
+                SELECT signal_url, channel, message, status, created_at FROM outreach
+                WHERE signal_url IN ({",".join("?" * len(chunk))})
+                ORDER BY id
+                """,
+                chunk
+            )
+            for r in cur.fetchall():
+                out.setdefault(r["signal_url"], []).append(dict(r))
+        return out
+
     def close(self):
-        self.conn.close()
+        with self.transaction() as cur:
+            self._flush_llm_touched(cur)
+        with self._conns_lock:
+            conns = list(self._conns)
+            self._conns.clear()
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
@@ -0,0 +1,281 @@
+import atexit
+import importlib
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config import (TTS_BACKEND, TTS_BATCH_SIZE, TTS_MAX_CHARS, TTS_MAX_JOBS_PER_WORKER, TTS_MAX_QUEUE,
+                    TTS_TIMEOUT, TTS_TORCH_THREADS, TTS_WORKERS)
+
+logger = logging.getLogger(__name__)
+
+
+def bark_backend(torch_threads: int) -> Tuple[int, Callable[[str], "object"]]:
+    """Load Bark once in this (worker) process; returns (sample_rate, text -> audio array)."""
+    import numpy as np
+    import torch
+    from torch.serialization import safe_globals
+    from bark import SAMPLE_RATE, generate_audio, preload_models
+
+    torch.set_num_threads(torch_threads)
+    with safe_globals([
+        np.core.multiarray.scalar,
+        np.dtype,
+        np.dtypes.Float64DType
+    ]):
+        preload_models()
+    return SAMPLE_RATE, generate_audio
+
+
+def _load_backend(spec: str, torch_threads: int):
+    module, _, fn = spec.partition(":")
+    return getattr(importlib.import_module(module), fn)(torch_threads)
+
+
+def _worker_main(backend: str, torch_threads: int, max_jobs: int, max_chars: int, in_q, out_q):
+    """Worker process: load models once, then synthesize batches until max_jobs or a None sentinel."""
+    try:
+        sample_rate, synth = _load_backend(backend, torch_threads)
+        from scipy.io.wavfile import write as write_wav
+        init_error = ""
+    except Exception as e:  # keep answering jobs so callers never hang on a broken backend
+        init_error = f"TTS backend failed to load: {e!r}"
+    done = 0
+    while done < max_jobs:
+        batch = in_q.get()
+        if batch is None:
+            break
+        # tell the parent which jobs this process holds, so they can be failed if it dies
+        out_q.put(("take", os.getpid(), [job_id for job_id, _, _ in batch], 0.0, 0.0, ""))
+        for job_id, text, out_path in batch:
+            if init_error:
+                out_q.put(("result", job_id, None, 0.0, 0.0, init_error))
+                continue
+            t0 = time.perf_counter()
+            try:
+                audio = synth(text[:max_chars])
+                write_wav(out_path, sample_rate, audio)
+                out_q.put(("result", job_id, out_path, len(audio) / sample_rate, time.perf_counter() - t0, ""))
+            except Exception as e:
+                out_q.put(("result", job_id, None, 0.0, time.perf_counter() - t0, repr(e)))
+        done += len(batch)
+    out_q.put(("exit", os.getpid(), None, 0.0, 0.0, ""))
+
+
+class TTSPool:
+    """Long-lived CPU worker processes that keep TTS models loaded between runs.
+
+    Scripts are sent in batches over a bounded queue (TTS_MAX_QUEUE batches), so the
+    parent never buffers more than that. Each worker restarts after
+    TTS_MAX_JOBS_PER_WORKER scripts to cap memory growth. `stats()` reports audio
+    seconds produced per wall second, for sizing the pool to the machine.
+
+    A worker that dies without saying so (segfault, OOM kill, os._exit while loading
+    the model) is noticed within LIVENESS_INTERVAL: its in-flight jobs resolve to None
+    and it is replaced. After MAX_CRASHES deaths in a row with no result in between,
+    the backend is considered broken: no more respawns, and every job resolves to None.
+    """
+    LIVENESS_INTERVAL = 0.5
+    MAX_CRASHES = 3
+
+    def __init__(self, workers: int = TTS_WORKERS, torch_threads: int = TTS_TORCH_THREADS,
+                 backend: str = TTS_BACKEND, batch_size: int = TTS_BATCH_SIZE, max_queue: int = TTS_MAX_QUEUE,
+                 max_jobs_per_worker: int = TTS_MAX_JOBS_PER_WORKER, max_chars: int = TTS_MAX_CHARS):
+        self.workers = max(1, workers)
+        self.torch_threads = max(1, torch_threads)
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_chars = max_chars
+        self._ctx = mp.get_context("spawn")
+        self._in = self._ctx.Queue(maxsize=max_queue)
+        # SimpleQueue writes straight to the pipe: a Queue's feeder thread would lose the
+        # messages a worker sent just before crashing
+        self._out = self._ctx.SimpleQueue()
+        self._procs: Dict[int, "mp.Process"] = {}
+        self._futures: Dict[int, Future] = {}
+        self._inflight: Dict[int, List[int]] = {}  # worker pid -> job ids it took
+        self._crashes = 0  # worker deaths since the last result
+        self._broken = False
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {"scripts": 0, "failed": 0, "audio_seconds": 0.0, "synth_seconds": 0.0}
+        self._first_submit: Optional[float] = None
+        self._last_result: Optional[float] = None
+        self._closed = False
+        for _ in range(self.workers):
+            self._spawn()
+        self._collector = threading.Thread(target=self._collect, name="tts-collector", daemon=True)
+        self._collector.start()
+
+    def _spawn(self):
+        p = self._ctx.Process(target=_worker_main, daemon=True, args=(
+            self.backend, self.torch_threads, self.max_jobs_per_worker, self.max_chars, self._in, self._out))
+        p.start()
+        self._procs[p.pid] = p
+
+    def _retire(self, pid: int, crashed: bool):
+        """Drop a worker that exited (or died); fail the jobs it held and start a replacement."""
+        with self._lock:
+            proc = self._procs.pop(pid, None)
+            if proc is None:  # already handled (an "exit" message after the death was seen)
+                return
+            lost = [self._futures.pop(j, None) for j in self._inflight.pop(pid, [])]
+            if crashed:
+                self._crashes += 1
+                self._stats["failed"] += sum(1 for f in lost if f is not None)
+                if self._crashes >= self.MAX_CRASHES and not self._broken:
+                    self._broken = True
+                    lost += list(self._futures.values())
+                    self._futures.clear()
+            if not self._closed and not self._broken:
+                self._spawn()
+            broken = self._broken
+        if crashed:
+            logger.warning(f"TTS worker {pid} died (exit code {proc.exitcode}); "
+                           f"{sum(1 for f in lost if f is not None)} job(s) failed")
+            if broken and self._crashes == self.MAX_CRASHES:
+                logger.error(f"TTS workers died {self.MAX_CRASHES} times in a row; TTS disabled for this process")
+        for fut in lost:
+            if fut is not None and not fut.done():
+                fut.set_result(None)
+        proc.join(timeout=5)
+
+    def _check_workers(self):
+        with self._lock:
+            dead = [pid for pid, p in self._procs.items() if not p.is_alive()]
+        for pid in dead:
+            self._retire(pid, crashed=True)
+
+    def _next_message(self) -> Optional[tuple]:
+        """The next worker message, or None after LIVENESS_INTERVAL without one."""
+        deadline = time.monotonic() + self.LIVENESS_INTERVAL
+        while self._out.empty():
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.02)
+        return self._out.get()
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while True:
+            msg = self._next_message()
+            kind, key, path, audio_s, synth_s, error = msg or (None, None, None, 0.0, 0.0, "")
+            if time.monotonic() - last_check >= self.LIVENESS_INTERVAL or kind is None:
+                if not self._closed:
+                    self._check_workers()
+                last_check = time.monotonic()
+            if kind is None:
+                continue
+            if kind == "stop":
+                return
+            if kind == "take":
+                with self._lock:
+                    self._inflight.setdefault(key, []).extend(path)
+                continue
+            if kind == "exit":
+                self._retire(key, crashed=False)
+                continue
+            with self._lock:
+                self._crashes = 0
+                for ids in self._inflight.values():
+                    if key in ids:
+                        ids.remove(key)
+                        break
+                fut = self._futures.pop(key, None)
+                self._stats["scripts"] += 1
+                self._stats["audio_seconds"] += audio_s
+                self._stats["synth_seconds"] += synth_s
+                if error:
+                    self._stats["failed"] += 1
+                self._last_result = time.perf_counter()
+            if error:
+                logger.warning(f"TTS job {key} failed: {error}")
+            if fut is not None:
+                fut.set_result(Path(path) if path else None)
+
+    def submit(self, items: Sequence[Tuple[str, Path]]) -> List[Future]:
+        """Queue (script, wav_path) pairs; each future resolves to the wav Path or None."""
+        futures, jobs = [], []
+        with self._lock:
+            if self._broken:
+                for _ in items:
+                    fut = Future()
+                    fut.set_result(None)
+                    futures.append(fut)
+                return futures
+            if self._first_submit is None:
+                self._first_submit = time.perf_counter()
+            for text, path in items:
+                fut = Future()
+                self._futures[self._next_id] = fut
+                jobs.append((self._next_id, text, str(path)))
+                futures.append(fut)
+                self._next_id += 1
+        for i in range(0, len(jobs), self.batch_size):
+            # blocks while the queue is full; gives up once the pool is broken (the
+            # futures were already resolved to None then)
+            while not self._broken:
+                try:
+                    self._in.put(jobs[i:i + self.batch_size], timeout=self.LIVENESS_INTERVAL)
+                    break
+                except queue.Full:
+                    pass
+        return futures
+
+    def synthesize(self, items: Sequence[Tuple[str, Path]], timeout: float = TTS_TIMEOUT) -> List[Optional[Path]]:
+        """Blocking submit(); `timeout` bounds the whole batch, not each script."""
+        deadline = time.monotonic() + timeout
+        out = []
+        for fut in self.submit(items):
+            try:
+                out.append(fut.result(timeout=max(0.0, deadline - time.monotonic())))
+            except Exception:
+                out.append(None)
+        return out
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            s = dict(self._stats)
+            wall = (self._last_result - self._first_submit) if self._first_submit and self._last_result else 0.0
+        s["wall_seconds"] = wall
+        s["audio_per_wall_second"] = s["audio_seconds"] / wall if wall else 0.0
+        return s
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            procs = list(self._procs.values())
+        for _ in procs:
+            try:
+                self._in.put_nowait(None)
+            except queue.Full:  # workers still busy with queued batches are terminated below
+                break
+        for p in procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+        self._out.put(("stop", None, None, 0.0, 0.0, ""))
+
+
+_pool: Optional[TTSPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_tts_pool() -> TTSPool:
+    """Process-wide pool, started on first use and kept warm until interpreter exit."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = TTSPool()
+                atexit.register(_pool.close)
+    return _pool
@@ -0,0 +1,238 @@
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import D_ID_BASE_URL, D_ID_DOWNLOAD_WORKERS, D_ID_KEY, D_ID_MAX_WAIT
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AVATARS = [
+    "amy-jBaWBj6FYr",
+    "mark-vwX6VXB4Kk",
+    "sarah-Lm8XnQ3jKp",
+]
+
+
+class _Job:
+    def __init__(self, job_id: int, talk_id: str, video_path: Path, deadline: float):
+        self.id = job_id
+        self.talk_id = talk_id
+        self.video_path = video_path
+        self.deadline = deadline
+        self.submitted = time.monotonic()
+        self.interval = 3.0
+        self.next_poll = time.monotonic() + self.interval
+        self.result: Optional[Path] = None
+        self.done = threading.Event()
+
+
+class VideoJobScheduler:
+    """Submit D-ID talks up front and let one background poller finish them.
+
+    Jobs are tracked in the video_jobs table. The poller checks every pending talk on
+    its own adaptive interval (3s, growing 1.2x to 10s) and hands finished videos to a
+    small download pool that streams them to disk in 1 MB chunks. Callers submit() as
+    they go and wait() once at the end, so total time tracks the slowest render.
+
+    Every job ends in done/error/timeout: a failing status check or download (bad
+    body, missing field, any exception) finishes that job as an error and the poller
+    keeps going, and wait() never blocks past a job's deadline plus its download.
+    """
+    DOWNLOAD_TIMEOUT = 60.0
+    def __init__(self, storage, api_key: Optional[str] = D_ID_KEY, base_url: str = D_ID_BASE_URL,
+                 max_wait: float = D_ID_MAX_WAIT, download_workers: int = D_ID_DOWNLOAD_WORKERS):
+        self.storage = storage
+        self.api_key = api_key
+        self.talks_url = base_url.rstrip("/") + "/talks"
+        self.max_wait = max_wait
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=download_workers + 1))
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=download_workers + 1))
+        self._downloads = ThreadPoolExecutor(max_workers=download_workers)
+        self._jobs: Dict[int, _Job] = {}     # still being polled
+        self._handles: Dict[int, _Job] = {}  # every job submitted through this scheduler
+        self._cond = threading.Condition()
+        self._poller: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "authorization": f"Basic {self.api_key}"
+        }
+
+    def _payload(self, script: str) -> Dict:
+        clean_script = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', script[:350])
+        source_url = ("https://create-images-results.d-id.com/DefaultPresenters/"
+                      f"{random.choice(DEFAULT_AVATARS)}/image.jpeg")
+        return {
+            "script": {
+                "type": "text",
+                "input": clean_script,
+                "provider": {
+                    "type": "microsoft",
+                    "voice_id": "en-US-GuyNeural"
+                }
+            },
+            "source_url": source_url,
+            "config": {
+                "result_format": "mp4",
+                "fluent": True,
+                "pad_audio": 0.2,
+                "stitch": True
+            }
+        }
+
+    def submit(self, script: str, video_path: Path, signal_url: str = "") -> Optional[int]:
+        """POST the talk and queue it for polling; returns the video_jobs id (None if not submitted)."""
+        if not self.api_key:
+            logger.warning("D-ID API key not configured - skipping AI avatar")
+            return None
+        try:
+            with METRICS.timer("gtm_did_seconds", phase="submit"):
+                response = self.session.post(self.talks_url, json=self._payload(script), headers=self._headers,
+                                             timeout=30)
+        except requests.RequestException as e:
+            logger.error(f"D-ID request failed: {e}")
+            return None
+        if response.status_code != 201:
+            logger.error(f"D-ID request failed: {response.status_code} - {response.text}")
+            self.storage.insert_video_job(signal_url, "", str(video_path), status="error",
+                                          error=f"HTTP {response.status_code}")
+            return None
+
+        talk_id = response.json()['id']
+        job_id = self.storage.insert_video_job(signal_url, talk_id, str(video_path))
+        logger.info(f"D-ID video creation started: {talk_id}")
+        with self._cond:
+            job = _Job(job_id, talk_id, Path(video_path), time.monotonic() + self.max_wait)
+            self._jobs[job_id] = self._handles[job_id] = job
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll_loop, name="d-id-poller", daemon=True)
+                self._poller.start()
+            self._cond.notify()
+        return job_id
+
+    @property
+    def job_timeout(self) -> float:
+        """Longest a job can take from submit() to a finished download."""
+        return self.max_wait + self.DOWNLOAD_TIMEOUT
+
+    def _finish(self, job: _Job, status: str, path: Optional[Path] = None, error: str = ""):
+        job.result = path
+        try:
+            if status != "done":  # "done" is recorded per phase as render + download
+                METRICS.observe("gtm_did_seconds", time.monotonic() - job.submitted, phase=status)
+            self.storage.update_video_job(job.id, status=status, error=error)
+        except Exception:
+            logger.exception(f"D-ID job {job.id}: could not record status {status}")
+        finally:
+            job.done.set()
+
+    def _download(self, job: _Job, video_url: str):
+        try:
+            logger.info(f"Downloading D-ID video to {job.video_path}")
+            with METRICS.timer("gtm_did_seconds", phase="download"), \
+                    self.session.get(video_url, stream=True, timeout=self.DOWNLOAD_TIMEOUT) as r:
+                r.raise_for_status()
+                with open(job.video_path, 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+            logger.info(f"D-ID video completed: {job.video_path}")
+        except Exception as e:
+            logger.error(f"D-ID video download failed: {e!r}")
+            self._finish(job, "error", error=repr(e))
+            return
+        self._finish(job, "done", job.video_path)
+
+    def _check(self, job: _Job) -> bool:
+        """Poll one talk; returns True once the job has left the polling set."""
+        try:
+            status_response = self.session.get(f"{self.talks_url}/{job.talk_id}", headers=self._headers,
+                                               timeout=10)
+        except requests.RequestException as e:
+            logger.warning(f"D-ID status check failed: {e}")
+            return False
+        if status_response.status_code != 200:
+            return False
+        status_data = status_response.json()  # ValueError on a non-JSON body: see _poll_loop
+        if not isinstance(status_data, dict):
+            raise ValueError(f"unexpected status body: {status_data!r:.200}")
+        status = status_data.get('status')
+        if status == 'done':
+            result_url = status_data.get('result_url')
+            if not result_url:
+                raise ValueError("talk is done but has no result_url")
+            METRICS.observe("gtm_did_seconds", time.monotonic() - job.submitted, phase="render")
+            self.storage.update_video_job(job.id, status="downloading", result_url=result_url)
+            self._downloads.submit(self._download, job, result_url)
+            return True
+        if status == 'error':
+            error = status_data.get('error')
+            error_msg = (error.get('message') if isinstance(error, dict) else error) or 'Unknown error'
+            logger.error(f"D-ID video failed: {error_msg}")
+            self._finish(job, "error", error=error_msg)
+            return True
+        return False
+
+    def _poll_loop(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._jobs:
+                    return
+                now = time.monotonic()
+                due = [j for j in self._jobs.values() if j.next_poll <= now]
+                if not due:
+                    self._cond.wait(min(j.next_poll for j in self._jobs.values()) - now)
+                    continue
+            for job in due:
+                try:
+                    finished = self._check(job)
+                except Exception as e:  # never let one bad response kill the poller
+                    logger.error(f"D-ID status check for {job.talk_id} failed: {e!r}")
+                    self._finish(job, "error", error=repr(e))
+                    finished = True
+                if not finished and time.monotonic() >= job.deadline:
+                    logger.warning("D-ID video timed out")
+                    self._finish(job, "timeout")
+                    finished = True
+                with self._cond:
+                    if finished:
+                        self._jobs.pop(job.id, None)
+                    else:
+                        job.interval = min(job.interval * 1.2, 10.0)
+                        job.next_poll = time.monotonic() + job.interval
+
+    def wait(self, job_ids: Iterable[Optional[int]], timeout: Optional[float] = None) -> Dict[int, Optional[Path]]:
+        """Block until the given jobs finish (or `timeout`); maps job id -> video path or None.
+
+        Never waits past a job's own deadline plus DOWNLOAD_TIMEOUT, timeout or not.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            jobs = [self._handles[j] for j in job_ids if j is not None and j in self._handles]
+        for job in jobs:
+            until = job.deadline + self.DOWNLOAD_TIMEOUT
+            if deadline is not None:
+                until = min(until, deadline)
+            job.done.wait(max(0.0, until - time.monotonic()))
+        return {job.id: job.result for job in jobs}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._downloads.shutdown(wait=True)
@@ -1,16 +1,48 @@
-from typing import Dict, Optional
-import requests, re
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import re, threading, time
 
-from config import TECH_HINTS
+from config import AUTH_KEYWORDS, HOST_MAX_CONNECTIONS, HOST_MIN_INTERVAL, TECH_HINTS
+from httpclient import get_client
 
-def http_get(url: str, headers: Optional[Dict[str, str]] = None, timeout: int = 15) -> Optional[str]:
-    try:
-        r = requests.get(url, headers=headers or {}, timeout=timeout)
-        if r.status_code == 200:
-            return r.text
-    except Exception:
-        return None
-    return None
+
+class HostLimiter:
+    """Per-host politeness: caps in-flight requests and spaces out request starts."""
+    def __init__(self, max_connections: int = HOST_MAX_CONNECTIONS, min_interval: float = HOST_MIN_INTERVAL):
+        self.max_connections = max(1, max_connections)
+        self.min_interval = max(0.0, min_interval)
+        self._lock = threading.Lock()
+        self._sems: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @contextmanager
+    def slot(self, host: str):
+        with self._lock:
+            sem = self._sems.setdefault(host, threading.BoundedSemaphore(self.max_connections))
+        with sem:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, 0.0))
+                self._next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+HOST_LIMITER = HostLimiter()
+
+
+def http_fetch(url: str, headers: Optional[Dict[str, str]] = None, timeout: int = 15,
+               max_bytes: Optional[int] = None) -> Optional[Tuple[bytes, str]]:
+    """Politely GET `url`; (body, encoding) or None."""
+    # pooling, retries, body cap and conditional caching live in httpclient.HttpClient
+    with HOST_LIMITER.slot(extract_domain(url)):
+        return get_client().fetch(url, headers=headers, timeout=timeout, max_bytes=max_bytes)
+
+
+def http_get_bytes(url: str, headers: Optional[Dict[str, str]] = None, timeout: int = 15) -> Optional[bytes]:
+    res = http_fetch(url, headers=headers, timeout=timeout)
+    return res[0] if res else None
 
 _def_dom_re = re.compile(r"https?://([^/]+)/?")
 
@@ -18,16 +50,194 @@ def extract_domain(url: str) -> str:
     m = _def_dom_re.match(url)
     return m.group(1).lower() if m else ""
 
+_LITERAL_CHARS = set("abcdefghijklmnopqrstuvwxyz0123456789 _-:/@'\"<>=,;!%&~`#")
+
+
+def literal_prefixes(pattern: str, min_len: int = 2) -> Optional[List[str]]:
+    """Lower-cased literal text every match of `pattern` starts with, one per top-level
+    alternative ("okta|okta\\.com" -> ["okta", "okta.com"]); None when some alternative
+    has no literal prefix of at least `min_len` characters (it must then be searched)."""
+    alts, depth, cls, start, i = [], 0, False, 0, 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 1
+        elif cls:
+            cls = c != "]"
+        elif c == "[":
+            cls = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            alts.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    alts.append(pattern[start:])
+    out = []
+    for alt in alts:
+        lit, i = "", 0
+        while i < len(alt):
+            c = alt[i]
+            if c == "\\" and i + 1 < len(alt) and not alt[i + 1].isalnum():
+                ch, step = alt[i + 1], 2
+            elif c.lower() in _LITERAL_CHARS:
+                ch, step = c.lower(), 1
+            else:
+                break
+            if i + step < len(alt) and alt[i + step] in "?*{":  # optional: not part of every match
+                break
+            lit += ch.lower()
+            i += step
+            if i < len(alt) and alt[i] == "+":
+                break
+        if len(lit) < min_len:
+            return None
+        out.append(lit)
+    return out
+
+
+def _trie_regex(words: List[str]) -> str:
+    """Alternation of literal `words` with shared prefixes factored out, so the regex
+    engine tries a handful of branches per position, not one per word."""
+    trie: Dict[str, dict] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, dict]) -> str:
+        end = "" in node
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if end:
+            body = "(?:" + body + ")?"
+        return body
+    return emit(trie)
+
+
+class TechDetector:
+    """Every TECH_HINTS vendor found in one pass, with counts and offsets.
+
+    A literal prefilter finds the offsets in the lower-cased page where the text some
+    vendor's matches must start with occurs (str.find per literal for a few literals,
+    a prefix-factored alternation for many); each candidate is confirmed with that vendor's own compiled pattern at
+    the offset. Results equal running every pattern's finditer on its own: vendors
+    may overlap each other, and one vendor's matches never overlap. Vendors whose
+    pattern has no literal prefix are searched separately. Works on str or raw bytes.
+    """
+    FIND_MAX_LITERALS = 16  # above this one regex pass beats a str.find pass per literal
+
+    def __init__(self, hints: Dict[str, str], prefix: str = ""):
+        self.names = list(hints)
+        # `prefix` goes in front of every pattern (e.g. a shared r"\b")
+        self._str_rx = [re.compile(prefix + f"(?:{p})", re.IGNORECASE) for p in hints.values()]
+        self._bytes_rx = [re.compile((prefix + f"(?:{p})").encode("utf-8"), re.IGNORECASE) for p in hints.values()]
+        self._anchors: Dict[str, List[tuple]] = {}  # first 2 chars -> [(literal, vendor index)]
+        self._unanchored: List[int] = []
+        for i, pattern in enumerate(hints.values()):
+            lits = literal_prefixes(pattern)
+            if lits is None:
+                self._unanchored.append(i)
+                continue
+            for lit in dict.fromkeys(lits):
+                self._anchors.setdefault(lit[:2], []).append((lit, i))
+        # a literal that starts with another one adds no candidates, only the shorter is searched
+        lits = sorted({lit for cands in self._anchors.values() for lit, _ in cands})
+        words = [w for k, w in enumerate(lits) if k == 0 or not any(w.startswith(o) for o in lits[:k])]
+        self._str_words = words
+        self._bytes_words = [w.encode("utf-8") for w in words]
+        alt = _trie_regex(words) if words else r"(?!)"
+        self._str_pre = re.compile(alt)
+        self._bytes_pre = re.compile(alt.encode("utf-8"))
+        self._bytes_anchors = {k.encode("utf-8"): [(lit.encode("utf-8"), i) for lit, i in v]
+                               for k, v in self._anchors.items()}
+
+    @staticmethod
+    def _candidates(low, words, pre):
+        """Ascending offsets in `low` where one of `words` starts, overlapping ones included."""
+        if len(words) <= TechDetector.FIND_MAX_LITERALS:
+            found = set()
+            for w in words:
+                at = low.find(w)
+                while at >= 0:
+                    found.add(at)
+                    at = low.find(w, at + 1)
+            yield from sorted(found)
+            return
+        pos, search = 0, pre.search
+        while True:
+            m = search(low, pos)
+            if m is None:
+                return
+            yield m.start()
+            pos = m.start() + 1
+
+    def _hits(self, page: Union[str, bytes]):
+        """(vendor index, offset) per match, prefiltered vendors in page order."""
+        low = page.lower()
+        if isinstance(page, (bytes, bytearray)):
+            words, pre, anchors, rxs = self._bytes_words, self._bytes_pre, self._bytes_anchors, self._bytes_rx
+        else:
+            words, pre, anchors, rxs = self._str_words, self._str_pre, self._anchors, self._str_rx
+        prefiltered = len(low) == len(page)  # else lower() moved some offsets; search every vendor
+        if prefiltered:
+            ends = [0] * len(self.names)  # a vendor's next match may not start before this
+            for at in self._candidates(low, words, pre):
+                for lit, i in anchors.get(low[at:at + 2], ()):
+                    if at >= ends[i] and low.startswith(lit, at):
+                        v = rxs[i].match(page, at)
+                        if v is not None:
+                            ends[i] = max(v.end(), at + 1)
+                            yield i, at
+        for i in (self._unanchored if prefiltered else range(len(self.names))):
+            for v in rxs[i].finditer(page):
+                yield i, v.start()
+
+    def scan(self, page: Union[str, bytes]) -> Dict[str, List[int]]:
+        """Map tech name -> sorted match offsets (each vendor's matches non-overlapping)."""
+        hits: Dict[str, List[int]] = {}
+        for i, at in self._hits(page):
+            hits.setdefault(self.names[i], []).append(at)
+        if self._unanchored:
+            for pos in hits.values():
+                pos.sort()
+        return hits
+
+    def counts(self, page: Union[str, bytes]) -> Dict[str, int]:
+        return {tech: len(pos) for tech, pos in self.scan(page).items()}
+
+    def matches(self, page: Union[str, bytes]) -> bool:
+        return next(self._hits(page), None) is not None
+
+
+TECH_DETECTOR = TechDetector(TECH_HINTS)
+
+
+def keyword_regex(keyword: str) -> str:
+    """Token-prefix pattern for a keyword (use after r"\b"); matches what Storage's FTS5 phrase-prefix query matches."""
+    return r"[^a-z0-9]+".join(re.escape(t) for t in re.findall(r"[a-z0-9]+", keyword.lower()))
+
+
+# in-memory twin of Storage.keyword_hits, for text that isn't in the FTS index
+AUTH_KEYWORD_DETECTOR = TechDetector({kw: keyword_regex(kw) for kw in AUTH_KEYWORDS}, prefix=r"\b")
+
 # Simple website scan for tech hints
 
-def scan_website_for_tech(domain: str) -> Dict[str, int]:
+TECH_PATHS = ["", "/login", "/auth", "/.well-known/openid-configuration", "/.well-known/apple-app-site-association"]
+
+
+def scan_website_for_tech(domain: str, get_page: Callable[[str], Optional[bytes]] = http_get_bytes) -> Dict[str, int]:
+    # value = number of scanned pages the tech shows up on; get_page may read a CrawlPlan instead
     tech_counts: Dict[str, int] = {}
-    for path in ["", "/login", "/auth", "/.well-known/openid-configuration", "/.well-known/apple-app-site-association"]:
-        html = http_get(f"https://{domain}{path}")
-        if not html:
+    for path in TECH_PATHS:
+        page = get_page(f"https://{domain}{path}")
+        if not page:
             continue
-        txt = html.lower()
-        for tech, pattern in TECH_HINTS.items():
-            if re.search(pattern, txt):
-                tech_counts[tech] = tech_counts.get(tech, 0) + 1
+        for tech in TECH_DETECTOR.scan(page):
+            tech_counts[tech] = tech_counts.get(tech, 0) + 1
     return tech_counts